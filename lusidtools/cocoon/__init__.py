@@ -1,9 +1,15 @@
 import lusidtools.cocoon.cocoon
+import lusidtools.cocoon.concurrency
 import lusidtools.cocoon.instruments
+import lusidtools.cocoon.instrument_cache
+import lusidtools.cocoon.metrics
+import lusidtools.cocoon.payloads
+import lusidtools.cocoon.rate_governor
 import lusidtools.cocoon.properties
 import lusidtools.cocoon.systemConfiguration
 import lusidtools.cocoon.utilities
 from lusidtools.cocoon.instruments import resolve_instruments
+from lusidtools.cocoon.instrument_cache import InstrumentResolutionCache
 from lusidtools.cocoon.properties import create_property_values
 from lusidtools.cocoon.utilities import set_attributes_recursive
 from lusidtools.cocoon.cocoon import load_from_data_frame
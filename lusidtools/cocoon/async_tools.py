@@ -1,5 +1,6 @@
 import asyncio
 import functools
+import time
 from threading import Thread, enumerate
 import concurrent.futures
 
@@ -74,10 +75,16 @@ def run_in_executor(f):
     def inner(*args, **kwargs):
         loop = asyncio.get_running_loop()
 
+        def call():
+            # Record when the function starts running so that the caller can tell how long it waited for a thread
+            if kwargs.get("timings", None) is not None:
+                kwargs["timings"]["started"] = time.perf_counter()
+            return f(*args, **kwargs)
+
         return loop.run_in_executor(
             # If the function to be wrapped has been provided with a thread pool use that, otherwise create one
             kwargs.get("thread_pool", ThreadPool(5).thread_pool),
-            lambda: f(*args, **kwargs),
+            call,
         )
 
     return inner
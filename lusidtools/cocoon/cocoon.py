@@ -1,6 +1,8 @@
 import asyncio
-import concurrent
+import concurrent.futures
+import multiprocessing
 import uuid
+from time import perf_counter
 
 import lusid
 import pandas as pd
@@ -10,7 +12,11 @@ from typing import List, Tuple
 
 from lusidtools import cocoon
 from lusidtools.cocoon.async_tools import run_in_executor, ThreadPool
+from lusidtools.cocoon.concurrency import AdaptiveConcurrency, is_throttled
 from lusidtools.cocoon.dateorcutlabel import DateOrCutLabel
+from lusidtools.cocoon.instrument_cache import InstrumentResolutionCache
+from lusidtools.cocoon.metrics import BatchMetrics
+from lusidtools.cocoon.rate_governor import GovernedApiFactory, RateGovernor
 from lusidtools.cocoon.utilities import (
     checkargs,
     strip_whitespace,
@@ -24,6 +30,87 @@ import pytz
 import logging
 
 
+def _call_info(kwargs: dict) -> dict:
+    """
+    Gets the keyword argument used to capture the response headers of a call to LUSID, if a callback has been provided
+
+    Parameters
+    ----------
+    kwargs : dict
+        The keyword arguments provided to the batch loader
+
+    Returns
+    -------
+    dict
+        The call_info keyword argument to pass to the LUSID api, empty if no callback has been provided
+    """
+
+    return (
+        {"call_info": kwargs["call_info"]}
+        if kwargs.get("call_info", None) is not None
+        else {}
+    )
+
+
+def _quote_correlation_id(quote) -> str:
+    """
+    Gets the id of a quote in the request to upsert it, from the quote's instrument, instrument id type and
+    effective date
+
+    Parameters
+    ----------
+    quote : lusid.models.UpsertQuoteRequest or dict
+        The quote, either a model or its raw payload
+
+    Returns
+    -------
+    str
+        The id of the quote in the request
+    """
+
+    if isinstance(quote, dict):
+        quote_id = quote["quoteId"]
+        return "_".join(
+            [
+                quote_id["quoteSeriesId"]["instrumentId"],
+                quote_id["quoteSeriesId"]["instrumentIdType"],
+                str(quote_id["effectiveAt"]),
+            ]
+        )
+
+    return "_".join(
+        [
+            quote.quote_id.quote_series_id.instrument_id,
+            quote.quote_id.quote_series_id.instrument_id_type,
+            str(quote.quote_id.effective_at),
+        ]
+    )
+
+
+def _request_body(api, body, kwargs: dict):
+    """
+    Gets the body of a call to LUSID, raw payloads are encoded to JSON once here and sent as they are
+
+    Parameters
+    ----------
+    api : lusid.api
+        The api the call will be made with
+    body
+        The populated LUSID request models or their raw payloads
+    kwargs : dict
+        The keyword arguments provided to the batch loader
+
+    Returns
+    -------
+    The body to pass to the LUSID api, the raw payloads encoded to JSON if raw_payloads is set
+    """
+
+    if kwargs.get("raw_payloads", False):
+        return cocoon.payloads.encode_body(api, body)
+
+    return body
+
+
 class BatchLoader:
     """
     This class contains all the methods used for loading data in batches. The @run_in_executor decorator makes the
@@ -100,6 +187,7 @@ class BatchLoader:
                 ): instrument
                 for instrument in instrument_batch
             },
+            **_call_info(kwargs),
         )
 
     @staticmethod
@@ -115,7 +203,7 @@ class BatchLoader:
         api_factory : lusid.utilities.ApiClientFactory
             The api factory to use
         quote_batch : list[lusid.models.UpsertQuoteRequest]
-            The batch of quotes to upsert
+            The batch of quotes to upsert, or their raw payloads
         kwargs
             scope
 
@@ -131,18 +219,16 @@ class BatchLoader:
                 "You are trying to load quotes without a scope, please ensure that a scope is provided."
             )
 
-        return api_factory.build(lusid.api.QuotesApi).upsert_quotes(
+        quotes_api = api_factory.build(lusid.api.QuotesApi)
+
+        return quotes_api.upsert_quotes(
             scope=kwargs["scope"],
-            request_body={
-                "_".join(
-                    [
-                        quote.quote_id.quote_series_id.instrument_id,
-                        quote.quote_id.quote_series_id.instrument_id_type,
-                        str(quote.quote_id.effective_at),
-                    ]
-                ): quote
-                for quote in quote_batch
-            },
+            request_body=_request_body(
+                quotes_api,
+                {_quote_correlation_id(quote): quote for quote in quote_batch},
+                kwargs,
+            ),
+            **_call_info(kwargs),
         )
 
     @staticmethod
@@ -180,12 +266,17 @@ class BatchLoader:
                 "You are trying to load transactions without a portfolio code, please ensure that a code is provided."
             )
 
-        return api_factory.build(
+        transaction_portfolios_api = api_factory.build(
             lusid.api.TransactionPortfoliosApi
-        ).upsert_transactions(
+        )
+
+        return transaction_portfolios_api.upsert_transactions(
             scope=kwargs["scope"],
             code=kwargs["code"],
-            transaction_request=transaction_batch,
+            transaction_request=_request_body(
+                transaction_portfolios_api, transaction_batch, kwargs
+            ),
+            **_call_info(kwargs),
         )
 
     @staticmethod
@@ -240,13 +331,18 @@ class BatchLoader:
         }
 
 
-        return api_factory.build(
+        transaction_portfolios_api = api_factory.build(
             lusid.api.TransactionPortfoliosApi
-        ).batch_upsert_transactions(
+        )
+
+        return transaction_portfolios_api.batch_upsert_transactions(
             scope=kwargs["scope"],
             code=kwargs["code"],
             success_mode=kwargs["transactions_commit_mode"],
-            request_body=request_body
+            request_body=_request_body(
+                transaction_portfolios_api, request_body, kwargs
+            ),
+            **_call_info(kwargs),
         )
 
     @staticmethod
@@ -293,25 +389,33 @@ class BatchLoader:
                 """There is no mapping for effective_at in the required mapping, please add it"""
             )
 
+        transaction_portfolios_api = api_factory.build(
+            lusid.api.TransactionPortfoliosApi
+        )
+
         # If only an adjustment has been specified
         if (
                 "holdings_adjustment_only" in list(kwargs.keys())
                 and kwargs["holdings_adjustment_only"]
         ):
-            return api_factory.build(
-                lusid.api.TransactionPortfoliosApi
-            ).adjust_holdings(
+            return transaction_portfolios_api.adjust_holdings(
                 scope=kwargs["scope"],
                 code=kwargs["code"],
                 effective_at=str(DateOrCutLabel(kwargs["effective_at"])),
-                adjust_holding_request=holding_batch,
+                adjust_holding_request=_request_body(
+                    transaction_portfolios_api, holding_batch, kwargs
+                ),
+                **_call_info(kwargs),
             )
 
-        return api_factory.build(lusid.api.TransactionPortfoliosApi).set_holdings(
+        return transaction_portfolios_api.set_holdings(
             scope=kwargs["scope"],
             code=kwargs["code"],
             effective_at=str(DateOrCutLabel(kwargs["effective_at"])),
-            adjust_holding_request=holding_batch,
+            adjust_holding_request=_request_body(
+                transaction_portfolios_api, holding_batch, kwargs
+            ),
+            **_call_info(kwargs),
         )
 
     @staticmethod
@@ -333,6 +437,7 @@ class BatchLoader:
         code : str
             The code of the portfolio to create
         kwargs
+            existing_portfolios - The portfolios which already exist in the scope keyed by code, if prefetched
 
         Returns
         -------
@@ -350,9 +455,24 @@ class BatchLoader:
                 "You are trying to load transactions without a portfolio code, please ensure that a code is provided."
             )
 
+        existing_portfolios = kwargs.get("existing_portfolios", None)
+
+        # If the portfolios in the scope have been prefetched there is no need to check for this one individually
+        if existing_portfolios is not None:
+            if kwargs["code"] in existing_portfolios:
+                return existing_portfolios[kwargs["code"]]
+
+            return api_factory.build(
+                lusid.api.TransactionPortfoliosApi
+            ).create_portfolio(
+                scope=kwargs["scope"],
+                create_transaction_portfolio_request=portfolio_batch[0],
+                **_call_info(kwargs),
+            )
+
         try:
             return api_factory.build(lusid.api.PortfoliosApi).get_portfolio(
-                scope=kwargs["scope"], code=kwargs["code"]
+                scope=kwargs["scope"], code=kwargs["code"], **_call_info(kwargs)
             )
         # Add in here upsert portfolio properties if it does exist
         except lusid.exceptions.ApiException as e:
@@ -362,6 +482,7 @@ class BatchLoader:
                 ).create_portfolio(
                     scope=kwargs["scope"],
                     create_transaction_portfolio_request=portfolio_batch[0],
+                    **_call_info(kwargs),
                 )
             else:
                 return e
@@ -387,6 +508,7 @@ class BatchLoader:
         code : str
             The code of the reference portfolio to create
         kwargs
+            existing_portfolios - The portfolios which already exist in the scope keyed by code, if prefetched
 
         Returns
         -------
@@ -404,9 +526,24 @@ class BatchLoader:
                 "You are trying to load a reference portfolio without a portfolio code, please ensure that a code is provided."
             )
 
+        existing_portfolios = kwargs.get("existing_portfolios", None)
+
+        # If the portfolios in the scope have been prefetched there is no need to check for this one individually
+        if existing_portfolios is not None:
+            if kwargs["code"] in existing_portfolios:
+                return existing_portfolios[kwargs["code"]]
+
+            return api_factory.build(
+                lusid.api.ReferencePortfolioApi
+            ).create_reference_portfolio(
+                scope=kwargs["scope"],
+                create_reference_portfolio_request=reference_portfolio_batch[0],
+                **_call_info(kwargs),
+            )
+
         try:
             return api_factory.build(lusid.api.PortfoliosApi).get_portfolio(
-                scope=kwargs["scope"], code=kwargs["code"]
+                scope=kwargs["scope"], code=kwargs["code"], **_call_info(kwargs)
             )
         # TODO: Add in here upsert portfolio properties if it does exist
 
@@ -417,6 +554,7 @@ class BatchLoader:
                 ).create_reference_portfolio(
                     scope=kwargs["scope"],
                     create_reference_portfolio_request=reference_portfolio_batch[0],
+                    **_call_info(kwargs),
                 )
             else:
                 return e
@@ -438,6 +576,7 @@ class BatchLoader:
             identifiers will be resolved to a LusidInstrumentId, where an identifier resolves to more
             than one LusidInstrumentId the property will be added to all matching instruments
         kwargs
+            resolution_cache - The cache of identifier resolutions to use, if any
 
         Returns
         -------
@@ -445,6 +584,8 @@ class BatchLoader:
             the response from LUSID
         """
 
+        resolution_cache = kwargs.get("resolution_cache", None)
+
         results = []
         for request in property_batch:
             search_request = lusid.models.InstrumentSearchProperty(
@@ -452,27 +593,41 @@ class BatchLoader:
                 value=request.identifier,
             )
 
-            # find the matching instruments
-            mastered_instruments = api_factory.build(
-                lusid.api.SearchApi
-            ).instruments_search(
-                instrument_search_property=[search_request], mastered_only=True
+            luids = (
+                resolution_cache.get(search_request.key, search_request.value)
+                if resolution_cache is not None
+                else None
             )
 
-            # flat map the results to a list of luids
-            luids = [
-                luid
-                for luids in [
-                    list(
-                        map(
-                            lambda m: m.identifiers["LusidInstrumentId"].value,
-                            mastered.mastered_instruments,
+            if luids is None:
+                # find the matching instruments
+                mastered_instruments = api_factory.build(
+                    lusid.api.SearchApi
+                ).instruments_search(
+                    instrument_search_property=[search_request],
+                    mastered_only=True,
+                    **_call_info(kwargs),
+                )
+
+                # flat map the results to a list of luids
+                luids = [
+                    luid
+                    for luids in [
+                        list(
+                            map(
+                                lambda m: m.identifiers["LusidInstrumentId"].value,
+                                mastered.mastered_instruments,
+                            )
                         )
-                    )
-                    for mastered in [matches for matches in mastered_instruments]
+                        for mastered in [matches for matches in mastered_instruments]
+                    ]
+                    for luid in luids
                 ]
-                for luid in luids
-            ]
+
+                if resolution_cache is not None:
+                    resolution_cache.put(
+                        search_request.key, search_request.value, luids
+                    )
 
             if len(luids) == 0:
                 continue
@@ -489,7 +644,9 @@ class BatchLoader:
             results.append(
                 api_factory.build(
                     lusid.api.InstrumentsApi
-                ).upsert_instruments_properties(properties_request)
+                ).upsert_instruments_properties(
+                    properties_request, **_call_info(kwargs)
+                )
             )
 
         return results
@@ -500,7 +657,7 @@ class BatchLoader:
             api_factory: lusid.utilities.ApiClientFactory,
             portfolio_group_batch: list,
             **kwargs,
-    ) -> lusid.models.PortfolioGroup:
+    ) -> Tuple[lusid.models.PortfolioGroup, dict]:
         """
         Upserts a batch of portfolios to LUSID
 
@@ -515,11 +672,16 @@ class BatchLoader:
         code : str
             The code of the portfolio group to create
         kwargs
+            member_pool - The thread pool to add the portfolios to the group in, shared by every group in the load
+            thread_pool_max_workers - The maximum number of portfolios to add concurrently when there is no member_pool
 
         Returns
         -------
         lusid.models.PortfolioGroup
             The response from LUSID
+        dict
+            The lusid.models.ErrorDetail for each portfolio which could not be added to the group keyed by its
+            scope/code
         """
 
         updated_request = group_request_into_one(
@@ -542,60 +704,96 @@ class BatchLoader:
 
             current_portfolio_group = api_factory.build(
                 lusid.api.PortfolioGroupsApi
-            ).get_portfolio_group(scope=kwargs["scope"], code=kwargs["code"])
-
-            #  Capture all portfolios - the ones currently in group + the new ones to be added
-            all_portfolios_to_add = (
-                    updated_request.values + current_portfolio_group.portfolios
+            ).get_portfolio_group(
+                scope=kwargs["scope"], code=kwargs["code"], **_call_info(kwargs)
             )
 
-            current_portfolios_in_group = [
-                code
-                for code in updated_request.values
-                if code in current_portfolio_group.portfolios
-            ]
+            # Diff the membership using the (scope, code) of each portfolio
+            current_members = {
+                (resource.scope, resource.code)
+                for resource in current_portfolio_group.portfolios
+            }
+            requested_members = {
+                (resource.scope, resource.code) for resource in updated_request.values
+            }
 
-            if len(current_portfolios_in_group) > 0:
-                for code in current_portfolios_in_group:
-                    logging.info(
-                        f"The portfolio {code.code} with scope {code.scope} is already in group {current_portfolio_group.id.code}"
-                    )
+            for scope, code in sorted(requested_members & current_members):
+                logging.info(
+                    f"The portfolio {code} with scope {scope} is already in group {current_portfolio_group.id.code}"
+                )
 
             # Parse out new portfolios only
-            new_portfolios = [
-                code
-                for code in all_portfolios_to_add
-                if code not in current_portfolio_group.portfolios
-            ]
+            new_portfolios = sorted(requested_members - current_members)
 
-            for code, scope in set(
-                    [(resource.code, resource.scope) for resource in new_portfolios]
-            ):
+            portfolio_groups_api = api_factory.build(lusid.api.PortfolioGroupsApi)
+            effective_at = datetime.now(tz=pytz.UTC).isoformat()
 
+            def add_portfolio_to_group(resource):
+                scope, code = resource
                 try:
-
-                    current_portfolio_group = api_factory.build(
-                        lusid.api.PortfolioGroupsApi
-                    ).add_portfolio_to_group(
+                    portfolio_groups_api.add_portfolio_to_group(
                         scope=kwargs["scope"],
                         code=kwargs["code"],
-                        effective_at=datetime.now(tz=pytz.UTC).isoformat(),
+                        effective_at=effective_at,
                         resource_id=lusid.models.ResourceId(scope=scope, code=code),
+                        **_call_info(kwargs),
                     )
-
+                    logging.info(
+                        f"Added the portfolio {code} with scope {scope} to group {kwargs['code']}"
+                    )
+                    return None
                 except lusid.exceptions.ApiException as e:
-                    logging.error(json.loads(e.body)["title"])
+                    error = json.loads(e.body) if e.body else {}
+                    logging.error(
+                        f"Failed to add the portfolio {code} with scope {scope} to group {kwargs['code']}: "
+                        f"{error.get('title', e.reason)}"
+                    )
+                    return lusid.models.ErrorDetail(
+                        id=f"{scope}/{code}",
+                        type=error.get("name", e.reason),
+                        detail=error.get("title", e.reason),
+                    )
+
+            # Add the new portfolios concurrently, there is no bulk endpoint for adding portfolios to a group. The
+            # member pool is shared by every group in the load so that the number of threads stays bounded
+            member_pool = kwargs.get("member_pool", None)
+            if member_pool is not None:
+                errors = list(member_pool.map(add_portfolio_to_group, new_portfolios))
+            else:
+                with concurrent.futures.ThreadPoolExecutor(
+                    max_workers=kwargs.get("thread_pool_max_workers", 5)
+                ) as executor:
+                    errors = list(executor.map(add_portfolio_to_group, new_portfolios))
+
+            failed = {error.id: error for error in errors if error is not None}
 
-            return current_portfolio_group
+            if len(new_portfolios) > 0:
+                logging.info(
+                    f"Added {len(new_portfolios) - len(failed)} of {len(new_portfolios)} new portfolios to group "
+                    f"{kwargs['code']}"
+                )
+
+            # Reflect the successful additions in the group returned
+            current_portfolio_group.portfolios = current_portfolio_group.portfolios + [
+                lusid.models.ResourceId(scope=scope, code=code)
+                for (scope, code), error in zip(new_portfolios, errors)
+                if error is None
+            ]
+
+            return current_portfolio_group, failed
 
         # Add in here upsert portfolio properties if it does exist
         except lusid.exceptions.ApiException as e:
             if e.status == 404:
-                return api_factory.build(
-                    lusid.api.PortfolioGroupsApi
-                ).create_portfolio_group(
-                    scope=kwargs["scope"],
-                    create_portfolio_group_request=updated_request,
+                return (
+                    api_factory.build(
+                        lusid.api.PortfolioGroupsApi
+                    ).create_portfolio_group(
+                        scope=kwargs["scope"],
+                        create_portfolio_group_request=updated_request,
+                        **_call_info(kwargs),
+                    ),
+                    {},
                 )
             else:
                 return e
@@ -619,7 +817,8 @@ async def _load_data(
     file_type : str
         The file type e.g. instruments, portfolios etc.
     kwargs
-        arguments specific to each call e.g. effective_at for holdings
+        arguments specific to each call e.g. effective_at for holdings, metrics_hooks to call with the
+        BatchMetrics for the batch
 
     Returns
     -------
@@ -632,15 +831,298 @@ async def _load_data(
     logging.debug(f"Running load_{file_type}_batch({identifier})")
     from time import time
 
+    metrics_hooks = kwargs.get("metrics_hooks", None) or []
+
+    # Every call made for the batch goes through the rate governor, which is shared by the process unless one is given
+    api_factory = GovernedApiFactory(api_factory, kwargs.get("rate_governor", None))
+
+    # When only a summary or metrics are required capture the response headers of each call
+    response_headers = []
+    if kwargs.get("summary_only", False) or len(metrics_hooks) > 0:
+        kwargs["call_info"] = lambda headers: response_headers.append(headers)
+
+    # The thread running the batch records when it started so that the time spent queueing can be measured
+    timings = {}
+    if len(metrics_hooks) > 0:
+        kwargs["timings"] = timings
+
+    submitted = perf_counter()
+
+    # Wait until the concurrency controller, if there is one, allows another batch in flight
+    concurrency_controller = kwargs.get("concurrency_controller", None)
+    if concurrency_controller is not None:
+        started = await concurrency_controller.acquire()
+
     start = time()
-    response = await getattr(BatchLoader, f"load_{file_type}_batch")(
-        api_factory,
-        single_requests,
-        # Any specific arguments e.g. 'code' for transactions, 'effective_at' for holdings is passed in via **kwargs
-        **kwargs,
+    try:
+        response = await getattr(BatchLoader, f"load_{file_type}_batch")(
+            api_factory,
+            single_requests,
+            # Any specific arguments e.g. 'code' for transactions, 'effective_at' for holdings is passed in via **kwargs
+            **kwargs,
+        )
+    except Exception as e:
+        if concurrency_controller is not None:
+            await concurrency_controller.release(
+                started, time() - start, is_throttled(e) or api_factory.retries > 0
+            )
+        if len(metrics_hooks) > 0:
+            _report_batch_metrics(
+                file_type,
+                single_requests,
+                e,
+                response_headers,
+                submitted,
+                retries=api_factory.retries,
+                **kwargs,
+            )
+        raise
+    duration = time() - start
+    logging.debug(f"Batch completed ({identifier}) - duration: {duration}")
+
+    # Portfolio groups are returned with the portfolios which could not be added to them
+    failed = None
+    if isinstance(response, tuple):
+        response, failed = response
+
+    if concurrency_controller is not None:
+        await concurrency_controller.release(
+            started, duration, is_throttled(response) or api_factory.retries > 0
+        )
+
+    if len(metrics_hooks) > 0:
+        _report_batch_metrics(
+            file_type,
+            single_requests,
+            response,
+            response_headers,
+            submitted,
+            retries=api_factory.retries,
+            failed=failed,
+            **kwargs,
+        )
+
+    if isinstance(response, Exception):
+        return response
+
+    if not kwargs.get("summary_only", False):
+        return response if failed is None else (response, failed)
+
+    # Reduce the response to a summary as it arrives so that the full response can be garbage collected
+    return _summarise_batch_response(
+        response=response,
+        request_count=len(single_requests),
+        response_headers=response_headers,
+        latency=duration,
+        code=kwargs.get("code", None),
+        effective_at=kwargs.get("effective_at", None),
+        failed=failed,
     )
-    logging.debug(f"Batch completed ({identifier}) - duration: {time() - start}")
-    return response
+
+
+# Used only to convert requests to their JSON-ready payloads, no calls are made with it. It is created on first use
+# and shared by every batch
+_serialisation_client = None
+
+
+def _payload_bytes(single_requests: list) -> int:
+    """
+    Gets the size of the requests in a batch once serialised to JSON
+
+    Parameters
+    ----------
+    single_requests : list
+        The populated LUSID request models in the batch
+
+    Returns
+    -------
+    int
+        The size of the serialised requests in bytes
+    """
+
+    return len(cocoon.payloads.dumps(_sanitize_for_serialization(single_requests)))
+
+
+def _sanitize_for_serialization(single_requests: list) -> list:
+    """
+    Converts the requests in a batch to their JSON-ready payloads, as the SDK does before sending them
+
+    Parameters
+    ----------
+    single_requests : list
+        The populated LUSID request models in the batch
+
+    Returns
+    -------
+    list[dict]
+        The payloads for the requests keyed by the JSON names of the attributes
+    """
+
+    global _serialisation_client
+    if _serialisation_client is None:
+        _serialisation_client = lusid.ApiClient()
+
+    return _serialisation_client.sanitize_for_serialization(single_requests)
+
+
+def _report_batch_metrics(
+    file_type: str,
+    single_requests: list,
+    response,
+    response_headers: list,
+    submitted: float,
+    **kwargs,
+) -> None:
+    """
+    Calls each of the metrics hooks with the metrics for a batch, an exception raised by a hook is logged rather than
+    failing the load
+
+    Parameters
+    ----------
+    file_type : str
+        The file type of the batch
+    single_requests : list
+        The populated LUSID request models in the batch
+    response
+        The response to the batch, or the exception it raised
+    response_headers : list
+        The headers of the responses to the calls made for the batch
+    submitted : float
+        The value of time.perf_counter when the batch was submitted to the thread pool
+    kwargs
+        metrics_hooks - The hooks to call with the BatchMetrics for the batch
+        timings - The value of time.perf_counter when the batch started running, under the key "started"
+        retries - The number of times calls for the batch were retried
+        failed - The items of the batch which failed when they are not in the response e.g. for portfolio groups
+        Arguments specific to each call e.g. code for transactions
+    """
+
+    finished = perf_counter()
+    started = kwargs.get("timings", {}).get("started", submitted)
+
+    server_durations = [
+        float(headers["lusid-meta-duration"])
+        for headers in response_headers
+        if headers.get("lusid-meta-duration", None) is not None
+    ]
+
+    if isinstance(response, Exception):
+        outcome = "error"
+    elif len(kwargs.get("failed", None) or {}) > 0 or any(
+        len(getattr(single_response, "failed", None) or {}) > 0
+        for single_response in (response if isinstance(response, list) else [response])
+    ):
+        outcome = "partial_failure"
+    else:
+        outcome = "success"
+
+    metrics = BatchMetrics(
+        file_type=file_type,
+        code=kwargs.get("code", None),
+        rows=len(single_requests),
+        payload_bytes=_payload_bytes(single_requests),
+        queue_wait=started - submitted,
+        latency=finished - started,
+        # LUSID reports the duration of each call in milliseconds
+        server_duration=sum(server_durations) / 1000
+        if len(server_durations) > 0
+        else None,
+        calls=len(response_headers),
+        retries=kwargs.get("retries", 0),
+        outcome=outcome,
+        concurrency=kwargs["concurrency_controller"].level
+        if kwargs.get("concurrency_controller", None) is not None
+        else kwargs.get("thread_pool_max_workers", None),
+    )
+
+    for hook in kwargs["metrics_hooks"]:
+        try:
+            hook(metrics)
+        except Exception as e:
+            logging.warning(f"Metrics hook {hook} failed: {e}")
+
+
+def _summarise_batch_response(
+    response,
+    request_count: int,
+    response_headers: list,
+    latency: float,
+    code: str = None,
+    effective_at=None,
+    failed: dict = None,
+) -> dict:
+    """
+    Reduces the response to a batch to a compact summary
+
+    Parameters
+    ----------
+    response
+        The response from the batch loader, a single response from LUSID or a list of responses
+    request_count : int
+        The number of single requests in the batch
+    response_headers : list
+        The headers of the responses to the calls made for the batch
+    latency : float
+        The time taken to load the batch in seconds
+    code : str
+        The code of the portfolio the batch was loaded into, if any
+    effective_at
+        The effective date the batch was loaded at, if any
+    failed : dict
+        The lusid.models.ErrorDetail for each item of the batch which failed when they are not in the response e.g.
+        the portfolios which could not be added to a portfolio group
+
+    Returns
+    -------
+    dict
+        The number of successful and failed items, the ids of the successful items, the error type for each failed
+        item keyed by its id, the request ids of the calls and the latency of the batch
+    """
+
+    responses = response if isinstance(response, list) else [response]
+
+    correlation_ids = []
+    failed = {
+        failed_id: getattr(error_detail, "type", None)
+        for failed_id, error_detail in (failed or {}).items()
+    }
+    for single_response in responses:
+        values = getattr(single_response, "values", None)
+        if isinstance(values, dict):
+            correlation_ids.extend(values.keys())
+        elif getattr(single_response, "id", None) is not None:
+            # Portfolios and portfolio groups are identified by their code
+            correlation_ids.append(getattr(single_response.id, "code", None))
+
+        failed.update(
+            {
+                failed_id: getattr(error_detail, "type", None)
+                for failed_id, error_detail in (
+                    getattr(single_response, "failed", None) or {}
+                ).items()
+            }
+        )
+
+    # Responses without values e.g. set_holdings succeed or fail as a whole
+    success_count = (
+        len(correlation_ids)
+        if len(correlation_ids) > 0 or len(failed) > 0
+        else request_count
+    )
+
+    return {
+        "code": code,
+        "effective_at": effective_at,
+        "request_count": request_count,
+        "success_count": success_count,
+        "failed_count": len(failed),
+        "correlation_ids": correlation_ids,
+        "failed": failed,
+        "request_ids": [
+            headers.get("lusid-meta-requestId", None) for headers in response_headers
+        ],
+        "latency": latency,
+    }
 
 
 def _convert_batch_to_models(
@@ -687,9 +1169,25 @@ def _convert_batch_to_models(
     Returns
     -------
     single_requests : list
-         A list of populated LUSID request models
+         A list of populated LUSID request models, or their raw payloads if raw_payloads is set
     """
 
+    # Build the JSON-ready payloads directly rather than populating the models
+    if kwargs.get("raw_payloads", False):
+        return cocoon.payloads.convert_batch_to_payloads(
+            data_frame=data_frame,
+            mapping_required=mapping_required,
+            mapping_optional=mapping_optional,
+            property_columns=property_columns,
+            properties_scope=properties_scope,
+            instrument_identifier_mapping=instrument_identifier_mapping,
+            file_type=file_type,
+            domain_lookup=domain_lookup,
+            sub_holding_keys=sub_holding_keys,
+            sub_holding_keys_scope=sub_holding_keys_scope,
+            **kwargs,
+        )
+
     source_columns = [
         column.get("target", column.get("source")) for column in property_columns
     ]
@@ -789,60 +1287,91 @@ def _convert_batch_to_models(
     return single_requests
 
 
-async def _construct_batches(
-        api_factory: lusid.utilities.ApiClientFactory,
+def _convert_batch_to_payload(**kwargs) -> list:
+    """
+    Converts a batch to the JSON-ready payloads of its requests, this runs in another process so only the payloads
+    and not the LUSID models are sent back
+
+    Parameters
+    ----------
+    kwargs
+        The arguments for _convert_batch_to_models
+
+    Returns
+    -------
+    list[dict]
+        The payloads for the requests keyed by the JSON names of the attributes
+    """
+
+    single_requests = _convert_batch_to_models(**kwargs)
+
+    if kwargs.get("raw_payloads", False):
+        return single_requests
+
+    return _sanitize_for_serialization(single_requests)
+
+
+async def _load_converted_data(
+    api_factory: lusid.utilities.ApiClientFactory,
+    conversion: asyncio.Future,
+    file_type: str,
+    **kwargs,
+):
+    """
+    Waits for a batch to be converted to payloads in another process and then loads them as raw payloads
+
+    Parameters
+    ----------
+    api_factory : lusid.utilities.ApiClientFactory
+        The api factory to use
+    conversion : asyncio.Future
+        The conversion of the batch, resolving to the payloads
+    file_type : str
+        The file type e.g. instruments, portfolios etc.
+    kwargs
+        arguments specific to each call e.g. effective_at for holdings
+
+    Returns
+    -------
+    The response from the batch loader
+    """
+
+    return await _load_data(
+        api_factory=api_factory,
+        single_requests=await conversion,
+        file_type=file_type,
+        **{**kwargs, "raw_payloads": True},
+    )
+
+
+def _create_sync_batches(
         data_frame: pd.DataFrame,
         mapping_required: dict,
-        mapping_optional: dict,
-        property_columns: list,
-        properties_scope: str,
-        instrument_identifier_mapping: dict,
         batch_size: int,
         file_type: str,
         domain_lookup: dict,
-        sub_holding_keys: list,
-        sub_holding_keys_scope: str,
-        return_unmatched_items: bool,
-        **kwargs,
-):
+) -> list:
     """
-    This constructs the batches and asynchronously sends them to be loaded into LUSID
+    This partitions the DataFrame into synchronous batches, each of which contains batches that can be loaded
+    asynchronously
 
     Parameters
     ----------
-    api_factory : lusid.utilities.ApiClientFactory
-        The api factory to use
     data_frame : pd.DataFrame
         The DataFrame containing the data to load
     mapping_required : dict
         The required mapping
-    mapping_optional : dict
-        The optional mapping
-    property_columns : list
-        The property columns to add as property values
-    properties_scope : str
-        The scope to add the property values in
-    instrument_identifier_mapping : dict
-        The mapping for the identifiers
     batch_size : int
         The batch size to use
     file_type : str
         The file type to load
     domain_lookup : dict
         The domain lookup
-    sub_holding_keys : list
-        The sub holding keys to use
-    sub_holding_keys_scope : str
-        The scope to use for the sub-holding keys
-    return_unmatched_items : bool
-        Whether items with unmatched identifiers should be returned for transaction or holding upserts
-    kwargs
-        Arguments specific to each call e.g. effective_at for holdings
 
     Returns
     -------
-    dict
-        Contains the success responses and the errors (where an API exception has been raised)
+    list[dict]
+        The synchronous batches, each with its asynchronous batches and the portfolio code and effective date of each
     """
 
     # Get the different behaviours required for different entities e.g quotes can be batched without worrying about portfolios
@@ -928,22 +1457,89 @@ async def _construct_batches(
                 for code in unique_portfolios
             ]
 
-            # Inside the synchronous batch split the values for each portfolio into appropriate batch sizes
-            sync_batches = [
-                {
-                    "async_batches": [
-                        async_batch.iloc[i: i + batch_size]
-                        for async_batch in async_batches
-                    ],
-                    "codes": [str(code) for code in unique_portfolios],
-                    "effective_at": [None] * len(async_batches),
-                }
-                for i in range(
-                    0,
-                    max([len(async_batch) for async_batch in async_batches]),
-                    batch_size,
-                )
-            ]
+            # Inside the synchronous batch split the values for each portfolio into appropriate batch sizes
+            sync_batches = [
+                {
+                    "async_batches": [
+                        async_batch.iloc[i: i + batch_size]
+                        for async_batch in async_batches
+                    ],
+                    "codes": [str(code) for code in unique_portfolios],
+                    "effective_at": [None] * len(async_batches),
+                }
+                for i in range(
+                    0,
+                    max([len(async_batch) for async_batch in async_batches]),
+                    batch_size,
+                )
+            ]
+
+    return sync_batches
+
+
+async def _construct_batches(
+    api_factory: lusid.utilities.ApiClientFactory,
+    data_frame: pd.DataFrame,
+    mapping_required: dict,
+    mapping_optional: dict,
+    property_columns: list,
+    properties_scope: str,
+    instrument_identifier_mapping: dict,
+    batch_size: int,
+    file_type: str,
+    domain_lookup: dict,
+    sub_holding_keys: list,
+    sub_holding_keys_scope: str,
+    return_unmatched_items: bool,
+    **kwargs,
+):
+    """
+    This constructs the batches and asynchronously sends them to be loaded into LUSID
+
+    Parameters
+    ----------
+    api_factory : lusid.utilities.ApiClientFactory
+        The api factory to use
+    data_frame : pd.DataFrame
+        The DataFrame containing the data to load
+    mapping_required : dict
+        The required mapping
+    mapping_optional : dict
+        The optional mapping
+    property_columns : list
+        The property columns to add as property values
+    properties_scope : str
+        The scope to add the property values in
+    instrument_identifier_mapping : dict
+        The mapping for the identifiers
+    batch_size : int
+        The batch size to use
+    file_type : str
+        The file type to load
+    domain_lookup : dict
+        The domain lookup
+    sub_holding_keys : list
+        The sub holding keys to use
+    sub_holding_keys_scope : str
+        The scope to use for the sub-holding keys
+    return_unmatched_items : bool
+        Whether items with unmatched identifiers should be returned for transaction or holding upserts
+    kwargs
+        Arguments specific to each call e.g. effective_at for holdings
+
+    Returns
+    -------
+    dict
+        Contains the success responses and the errors (where an API exception has been raised)
+    """
+
+    sync_batches = _create_sync_batches(
+        data_frame=data_frame,
+        mapping_required=mapping_required,
+        batch_size=batch_size,
+        file_type=file_type,
+        domain_lookup=domain_lookup,
+    )
 
     logging.debug("Created sync batches: ")
     logging.debug(
@@ -951,29 +1547,74 @@ async def _construct_batches(
         + f"Number of items in batches: {sum([len(sync_batch['async_batches']) for sync_batch in sync_batches])}"
     )
 
-    # Asynchronously load the data into LUSID
-    responses = [
-        await asyncio.gather(
-            *[
-                _load_data(
-                    api_factory=api_factory,
-                    single_requests=_convert_batch_to_models(
-                        data_frame=async_batch,
-                        mapping_required=mapping_required,
-                        mapping_optional=mapping_optional,
-                        property_columns=property_columns,
-                        properties_scope=properties_scope,
-                        instrument_identifier_mapping=instrument_identifier_mapping,
+    conversion_pool = kwargs.get("conversion_pool", None)
+
+    if conversion_pool is None:
+        # Asynchronously load the data into LUSID
+        responses = [
+            await asyncio.gather(
+                *[
+                    _load_data(
+                        api_factory=api_factory,
+                        single_requests=_convert_batch_to_models(
+                            data_frame=async_batch,
+                            mapping_required=mapping_required,
+                            mapping_optional=mapping_optional,
+                            property_columns=property_columns,
+                            properties_scope=properties_scope,
+                            instrument_identifier_mapping=instrument_identifier_mapping,
+                            file_type=file_type,
+                            domain_lookup=domain_lookup,
+                            sub_holding_keys=sub_holding_keys,
+                            sub_holding_keys_scope=sub_holding_keys_scope,
+                            **kwargs,
+                        ),
                         file_type=file_type,
-                        domain_lookup=domain_lookup,
-                        sub_holding_keys=sub_holding_keys,
-                        sub_holding_keys_scope=sub_holding_keys_scope,
+                        code=code,
+                        effective_at=effective_at,
                         **kwargs,
+                    )
+                    for async_batch, code, effective_at in zip(
+                        sync_batch["async_batches"],
+                        sync_batch["codes"],
+                        sync_batch["effective_at"],
+                    )
+                    if not async_batch.empty
+                ],
+                return_exceptions=True,
+            )
+            for sync_batch in sync_batches
+        ]
+    else:
+        conversion_arguments = {
+            "mapping_required": mapping_required,
+            "mapping_optional": mapping_optional,
+            "property_columns": property_columns,
+            "properties_scope": properties_scope,
+            "instrument_identifier_mapping": instrument_identifier_mapping,
+            "file_type": file_type,
+            "domain_lookup": domain_lookup,
+            "sub_holding_keys": sub_holding_keys,
+            "sub_holding_keys_scope": sub_holding_keys_scope,
+            # Only the arguments used in the conversion are sent to the other processes
+            "unique_identifiers": kwargs["unique_identifiers"],
+            "full_key_format": kwargs["full_key_format"],
+            "raw_payloads": kwargs.get("raw_payloads", False),
+        }
+
+        def submit_conversions(sync_batch):
+            # Each batch is converted in another process, which returns the JSON-ready payloads
+            return [
+                (
+                    asyncio.wrap_future(
+                        conversion_pool.submit(
+                            _convert_batch_to_payload,
+                            data_frame=async_batch,
+                            **conversion_arguments,
+                        )
                     ),
-                    file_type=file_type,
-                    code=code,
-                    effective_at=effective_at,
-                    **kwargs,
+                    code,
+                    effective_at,
                 )
                 for async_batch, code, effective_at in zip(
                     sync_batch["async_batches"],
@@ -981,11 +1622,35 @@ async def _construct_batches(
                     sync_batch["effective_at"],
                 )
                 if not async_batch.empty
-            ],
-            return_exceptions=True,
-        )
-        for sync_batch in sync_batches
-    ]
+            ]
+
+        responses = []
+        conversions = submit_conversions(sync_batches[0]) if sync_batches else []
+        for i in range(len(sync_batches)):
+            # Convert the next synchronous batch while this one is being loaded
+            next_conversions = (
+                submit_conversions(sync_batches[i + 1])
+                if i + 1 < len(sync_batches)
+                else []
+            )
+            responses.append(
+                await asyncio.gather(
+                    *[
+                        _load_converted_data(
+                            api_factory=api_factory,
+                            conversion=conversion,
+                            file_type=file_type,
+                            code=code,
+                            effective_at=effective_at,
+                            **kwargs,
+                        )
+                        for conversion, code, effective_at in conversions
+                    ],
+                    return_exceptions=True,
+                )
+            )
+            conversions = next_conversions
+
     logging.debug("Flattening responses")
     responses_flattened = [
         response for responses_sub in responses for response in responses_sub
@@ -998,12 +1663,41 @@ async def _construct_batches(
         ):
             raise response
 
+    # Portfolio groups are returned with the portfolios which could not be added to them, keyed by the group
+    failed_members = {}
+    for index, response in enumerate(responses_flattened):
+        if isinstance(response, tuple):
+            group, failed = response
+            responses_flattened[index] = group
+            if len(failed) > 0:
+                failed_members[f"{group.id.scope}/{group.id.code}"] = failed
+
     # Collects the exceptions as failures and successful calls as values
     returned_response = {
         "errors": [r for r in responses_flattened if isinstance(r, Exception)],
         "success": [r for r in responses_flattened if not isinstance(r, Exception)],
     }
 
+    if file_type == "portfolio_group" and not kwargs.get("summary_only", False):
+        returned_response["failed_members"] = failed_members
+
+    # Present the batch summaries as a single columnar frame with one row per batch
+    if kwargs.get("summary_only", False):
+        returned_response["success"] = pd.DataFrame(
+            returned_response["success"],
+            columns=[
+                "code",
+                "effective_at",
+                "request_count",
+                "success_count",
+                "failed_count",
+                "correlation_ids",
+                "failed",
+                "request_ids",
+                "latency",
+            ],
+        )
+
     # For successful transactions or holdings file types, optionally return unmatched identifiers with the responses
     if check_for_unmatched_items(
             flag=return_unmatched_items,
@@ -1023,6 +1717,212 @@ async def _construct_batches(
     return returned_response
 
 
+def _batch_endpoints(file_type: str, single_requests: list, **kwargs) -> dict:
+    """
+    This estimates the number of calls to each LUSID endpoint required to load a batch
+
+    Parameters
+    ----------
+    file_type : str
+        The file type to load
+    single_requests : list
+        The populated LUSID request models in the batch
+    kwargs
+        Arguments specific to each call e.g. holdings_adjustment_only for holdings, code and existing_portfolios
+        for portfolios
+
+    Returns
+    -------
+    dict
+        The number of calls keyed by the name of the endpoint
+    """
+
+    if file_type == "instrument":
+        return {"upsert_instruments": 1}
+    elif file_type == "quote":
+        return {"upsert_quotes": 1}
+    elif file_type == "transaction":
+        return {"upsert_transactions": 1}
+    elif file_type == "transactions_with_commit_mode":
+        return {"batch_upsert_transactions": 1}
+    elif file_type == "holding":
+        return (
+            {"adjust_holdings": 1}
+            if kwargs.get("holdings_adjustment_only", False)
+            else {"set_holdings": 1}
+        )
+    elif file_type in ("portfolio", "reference_portfolio"):
+        # Portfolios which are known to exist already are returned without a call
+        existing_portfolios = kwargs.get("existing_portfolios", None)
+        if (
+            existing_portfolios is not None
+            and kwargs.get("code") in existing_portfolios
+        ):
+            return {}
+        return {f"create_{file_type}": 1}
+    elif file_type == "instrument_property":
+        # Each identifier is resolved and its properties upserted separately
+        return {
+            "instruments_search": len(single_requests),
+            "upsert_instruments_properties": len(single_requests),
+        }
+    elif file_type == "portfolio_group":
+        # The group is created if it does not exist, otherwise each new member is added to it
+        return {
+            "get_portfolio_group": 1,
+            "create_portfolio_group": 1,
+            "add_portfolio_to_group": sum(
+                len(request.values or []) for request in single_requests
+            ),
+        }
+    return {}
+
+
+def _explain_batches(
+    data_frame: pd.DataFrame,
+    mapping_required: dict,
+    mapping_optional: dict,
+    property_columns: list,
+    properties_scope: str,
+    instrument_identifier_mapping: dict,
+    batch_size: int,
+    file_type: str,
+    domain_lookup: dict,
+    sub_holding_keys: list,
+    sub_holding_keys_scope: str,
+    **kwargs,
+) -> dict:
+    """
+    This constructs the batches and the requests in each of them as _construct_batches would, but rather than sending
+    them to LUSID describes the load they would make
+
+    Parameters
+    ----------
+    data_frame : pd.DataFrame
+        The DataFrame containing the data to load
+    mapping_required : dict
+        The required mapping
+    mapping_optional : dict
+        The optional mapping
+    property_columns : list
+        The property columns to add as property values
+    properties_scope : str
+        The scope to add the property values in
+    instrument_identifier_mapping : dict
+        The mapping for the identifiers
+    batch_size : int
+        The batch size to use
+    file_type : str
+        The file type to load
+    domain_lookup : dict
+        The domain lookup
+    sub_holding_keys : list
+        The sub holding keys to use
+    sub_holding_keys_scope : str
+        The scope to use for the sub-holding keys
+    kwargs
+        Arguments specific to each call e.g. effective_at for holdings
+
+    Returns
+    -------
+    dict
+        The number of synchronous and asynchronous batches, the number of calls to each endpoint, the estimated
+        payload size in bytes, the longest chain of batches for a single portfolio, the expected concurrency and a
+        DataFrame describing each batch
+    """
+
+    sync_batches = _create_sync_batches(
+        data_frame=data_frame,
+        mapping_required=mapping_required,
+        batch_size=batch_size,
+        file_type=file_type,
+        domain_lookup=domain_lookup,
+    )
+
+    batches = []
+    requests_per_endpoint = {}
+    for sync_batch_number, sync_batch in enumerate(sync_batches):
+        for async_batch, code, effective_at in zip(
+            sync_batch["async_batches"],
+            sync_batch["codes"],
+            sync_batch["effective_at"],
+        ):
+            if async_batch.empty:
+                continue
+
+            single_requests = _convert_batch_to_models(
+                data_frame=async_batch,
+                mapping_required=mapping_required,
+                mapping_optional=mapping_optional,
+                property_columns=property_columns,
+                properties_scope=properties_scope,
+                instrument_identifier_mapping=instrument_identifier_mapping,
+                file_type=file_type,
+                domain_lookup=domain_lookup,
+                sub_holding_keys=sub_holding_keys,
+                sub_holding_keys_scope=sub_holding_keys_scope,
+                **kwargs,
+            )
+
+            for endpoint, calls in _batch_endpoints(
+                file_type, single_requests, code=code, **kwargs
+            ).items():
+                requests_per_endpoint[endpoint] = (
+                    requests_per_endpoint.get(endpoint, 0) + calls
+                )
+
+            batches.append(
+                {
+                    "sync_batch": sync_batch_number,
+                    "code": code,
+                    "effective_at": effective_at,
+                    "rows": len(async_batch),
+                    "requests": len(single_requests),
+                    "payload_bytes": _payload_bytes(single_requests),
+                }
+            )
+
+    batches = pd.DataFrame(
+        batches,
+        columns=[
+            "sync_batch",
+            "code",
+            "effective_at",
+            "rows",
+            "requests",
+            "payload_bytes",
+        ],
+    )
+    async_batches_per_sync_batch = batches.groupby("sync_batch").size()
+
+    widest_sync_batch = (
+        int(async_batches_per_sync_batch.max()) if len(batches) > 0 else 0
+    )
+
+    return {
+        "file_type": file_type,
+        "batch_size": batch_size,
+        "sync_batches": len(sync_batches),
+        "async_batches": len(batches),
+        "requests_per_endpoint": requests_per_endpoint,
+        "estimated_payload_bytes": int(batches["payload_bytes"].sum()),
+        "largest_payload_bytes": int(batches["payload_bytes"].max())
+        if len(batches) > 0
+        else 0,
+        "widest_sync_batch": widest_sync_batch,
+        # Batches for the same portfolio are always loaded one after another
+        "longest_portfolio_chain": int(
+            batches.groupby("code", dropna=False).size().max()
+        )
+        if len(batches) > 0
+        else 0,
+        "expected_concurrency": min(
+            widest_sync_batch, kwargs.get("thread_pool_max_workers", 5)
+        ),
+        "batches": batches,
+    }
+
+
 def check_for_unmatched_items(flag, file_type):
     """
     This method contains the conditional logic to determine whether the unmatched_items validation should be run.
@@ -1352,6 +2252,124 @@ def return_unmatched_holdings(
     ]
 
 
+def list_existing_portfolios(
+    api_factory: lusid.utilities.ApiClientFactory, scope: str, page_size: int = 5000
+):
+    """
+    Lists all the portfolios which exist in a scope, so that loading portfolios does not need to check for each one
+    individually.
+
+    Multiple pages of responses for the list_portfolios_for_scope api call are handled.
+
+    Parameters
+    ----------
+    api_factory : lusid.utilities.ApiClientFactory api_factory
+        The api factory to use
+    scope : str
+        The scope to list the portfolios in
+    page_size : int
+        The number of portfolios to request per page
+
+    Returns
+    -------
+    dict
+        The portfolios in the scope keyed by their code, None if the portfolios could not be listed
+    """
+    portfolios_api = api_factory.build(lusid.api.PortfoliosApi)
+    next_page = None
+    existing_portfolios = {}
+
+    while True:
+        kwargs = {"scope": scope, "limit": page_size}
+
+        if next_page is not None:
+            kwargs["page"] = next_page
+
+        try:
+            response = portfolios_api.list_portfolios_for_scope(**kwargs)
+        except lusid.exceptions.ApiException as e:
+            logging.warning(
+                f"Unable to list the portfolios in scope {scope}, each portfolio will be checked individually: "
+                f"{e.status} {e.reason}"
+            )
+            return None
+
+        existing_portfolios.update(
+            {portfolio.id.code: portfolio for portfolio in response.values}
+        )
+
+        next_page = response.next_page
+        if next_page is None:
+            return existing_portfolios
+
+
+def add_sub_holding_keys_to_portfolios(
+    api_factory: lusid.utilities.ApiClientFactory,
+    scope: str,
+    codes: list,
+    sub_holding_keys: list,
+    max_workers: int = 5,
+):
+    """
+    Sets the sub-holding keys on the portfolios which do not already have them. The details of the portfolios are read
+    and the required patches applied concurrently.
+
+    Parameters
+    ----------
+    api_factory : lusid.utilities.ApiClientFactory api_factory
+        The api factory to use
+    scope : str
+        The scope of the portfolios
+    codes : list[str]
+        The codes of the portfolios to set the sub-holding keys on
+    sub_holding_keys : list[str]
+        The full property keys of the sub-holding keys
+    max_workers : int
+        The maximum number of requests to make concurrently
+
+    Returns
+    -------
+    list[str]
+        The codes of the portfolios which were patched
+    """
+    transaction_portfolio_api = api_factory.build(lusid.api.TransactionPortfoliosApi)
+
+    def get_sub_holding_keys(code):
+        try:
+            details = transaction_portfolio_api.get_details(scope=scope, code=code)
+            return details.sub_holding_keys or []
+        # If the details can not be read attempt the patch anyway so that any error is raised from it
+        except lusid.exceptions.ApiException:
+            return None
+
+    def patch_sub_holding_keys(code):
+        return transaction_portfolio_api.patch_portfolio_details(
+            scope,
+            code,
+            [{"value": sub_holding_keys, "path": "/subHoldingKeys", "op": "add"}],
+        )
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        current_sub_holding_keys = dict(
+            zip(codes, executor.map(get_sub_holding_keys, codes))
+        )
+
+        codes_to_patch = [
+            code
+            for code in codes
+            if current_sub_holding_keys[code] is None
+            or set(current_sub_holding_keys[code]) != set(sub_holding_keys)
+        ]
+
+        logging.debug(
+            f"Setting sub-holding keys on {len(codes_to_patch)} of {len(codes)} portfolios"
+        )
+
+        list(executor.map(patch_sub_holding_keys, codes_to_patch))
+
+    return codes_to_patch
+
+
 @checkargs
 def load_from_data_frame(
         api_factory: lusid.utilities.ApiClientFactory,
@@ -1373,6 +2391,14 @@ def load_from_data_frame(
         sub_holding_keys_scope: str = None,
         return_unmatched_items: bool = False,
         instrument_scope: str = None,
+        resolution_cache: InstrumentResolutionCache = None,
+        summary_only: bool = False,
+        explain: bool = False,
+        metrics_hooks: list = None,
+        rate_governor: RateGovernor = None,
+        concurrency_controller: AdaptiveConcurrency = None,
+        conversion_processes: int = None,
+        raw_payloads: bool = False,
 ):
     """
 
@@ -1419,11 +2445,48 @@ def load_from_data_frame(
         transactions or holdings
     instrument_scope : str
         The scope to upsert to when upseting instrument
+    resolution_cache : InstrumentResolutionCache
+        A cache of identifier to LusidInstrumentId resolutions, used when resolving the instruments to add properties
+        to for file_type="instrument_property"
+    summary_only : bool
+        Whether to reduce the response to each batch to a compact summary as it arrives rather than keeping the full
+        responses from LUSID, the successes are then returned as a DataFrame with one row per batch containing the
+        request, success and failure counts, the ids of the successful items, the error type of each failed item,
+        the request ids and the latency of the batch
+    explain : bool
+        Whether to validate the data and construct the batches and requests without loading anything into LUSID,
+        the response then describes the load: the number of synchronous and asynchronous batches, the calls to each
+        endpoint, the estimated payload size, the longest chain of batches for a single portfolio and the expected
+        concurrency. Lookups needed for validation (and name enrichment if requested) are still made, but no
+        property definitions are created and no portfolios are updated
+    metrics_hooks : list[callable]
+        Functions to call with the lusidtools.cocoon.metrics.BatchMetrics for each batch once it has been loaded e.g.
+        a lusidtools.cocoon.metrics.HistogramAggregator, the metrics include the row count, the serialised size, the
+        time spent queueing for a thread, the latency, the duration reported by LUSID and the outcome
+    rate_governor : lusidtools.cocoon.rate_governor.RateGovernor
+        The rate governor every call to LUSID made by the batches goes through, defaults to the one shared by the
+        process (see lusidtools.cocoon.rate_governor.set_rate_governor) which honours Retry-After when throttled
+    concurrency_controller : lusidtools.cocoon.concurrency.AdaptiveConcurrency
+        Tunes the number of batches in flight while loading rather than relying on thread_pool_max_workers alone,
+        increasing it while batches are healthy and backing off when they are throttled or the latency rises. The
+        thread pool is sized to allow its max_limit and the level chosen is reported in the batch metrics
+    conversion_processes : int
+        The number of processes to convert the rows of the DataFrame in, by default they are converted in this
+        process. Converting in other processes uses more than one core for large loads, each synchronous batch is
+        converted while the one before it is being loaded. The processes return the JSON-ready payloads of the
+        requests, which are sent as raw payloads, so this is only supported for transactions, holdings and quotes
+    raw_payloads : bool
+        Whether to build the JSON-ready request payloads directly from the DataFrame rather than populating LUSID
+        models which the SDK then converts back to JSON. The payloads are encoded to JSON once, with orjson if it is
+        installed, and sent as they are. The only checks are that every required attribute of the models is mapped
+        and that each row has a value for them, the types of the values are not validated. This is only supported
+        for transactions, holdings and quotes
 
     Returns
     -------
     responses: dict
-        The responses from loading the data into LUSID
+        The responses from loading the data into LUSID. For portfolio groups the portfolios which could not be added
+        to each group are under failed_members, keyed by the scope/code of the group and then of the portfolio
 
     Examples
     --------
@@ -1548,6 +2611,21 @@ def load_from_data_frame(
         .value
     )
 
+    if raw_payloads and file_type not in cocoon.payloads.RAW_PAYLOAD_FILE_TYPES:
+        raise ValueError(
+            f"Raw payloads are only supported for the file types {cocoon.payloads.RAW_PAYLOAD_FILE_TYPES}, "
+            f"you supplied '{file_type}' instead."
+        )
+
+    if (
+        conversion_processes is not None
+        and file_type not in cocoon.payloads.RAW_PAYLOAD_FILE_TYPES
+    ):
+        raise ValueError(
+            f"Conversion processes are only supported for the file types {cocoon.payloads.RAW_PAYLOAD_FILE_TYPES}, "
+            f"you supplied '{file_type}' instead."
+        )
+
     # Ensures that it is a single index dataframe
     Validator(data_frame.index, "data_frame_index").check_is_not_instance(pd.MultiIndex)
 
@@ -1637,8 +2715,13 @@ def load_from_data_frame(
         exempt_attributes=["identifiers", "properties", "instrument_identifiers"],
     )
 
-    # Create the thread pool to use with the async_tools.run_in_executor decorator to make sync functions awaitable
-    thread_pool = ThreadPool(thread_pool_max_workers).thread_pool
+    # Create the thread pool to use with the async_tools.run_in_executor decorator to make sync functions awaitable,
+    # when the concurrency is tuned adaptively the thread pool must allow the most batches it can allow in flight
+    thread_pool = ThreadPool(
+        max(thread_pool_max_workers, concurrency_controller.max_limit)
+        if concurrency_controller is not None
+        else thread_pool_max_workers
+    ).thread_pool
 
     if instrument_name_enrichment:
         loop = cocoon.async_tools.start_event_loop_new_thread()
@@ -1650,6 +2733,7 @@ def load_from_data_frame(
                 instrument_identifier_mapping=identifier_mapping,
                 mapping_required=mapping_required,
                 constant_prefix="$",
+                max_concurrent_searches=thread_pool_max_workers,
                 **{"thread_pool": thread_pool},
             ),
             loop,
@@ -1743,16 +2827,23 @@ def load_from_data_frame(
         )
 
         # Check for and create missing property definitions for the sub-holding-keys
-        data_frame = cocoon.properties.create_missing_property_definitions_from_file(
-            api_factory=api_factory,
-            properties_scope=sub_holding_keys_scope,
-            domain="Transaction",
-            data_frame=data_frame,
-            property_columns=[{"source": key} for key in sub_holding_keys],
-        )
+        if not explain:
+            data_frame = cocoon.properties.create_missing_property_definitions_from_file(
+                api_factory=api_factory,
+                properties_scope=sub_holding_keys_scope,
+                domain="Transaction",
+                data_frame=data_frame,
+                property_columns=[{"source": key} for key in sub_holding_keys],
+            )
 
     # Check for and create missing property definitions for the properties
-    if domain_lookup[file_type]["domain"] is not None:
+    if explain:
+        # No property definitions are created when explaining the load, only the target columns are added
+        for column in property_columns:
+            data_frame.loc[:, column.get("target", column["source"])] = data_frame[
+                column["source"]
+            ]
+    elif domain_lookup[file_type]["domain"] is not None:
         data_frame = cocoon.properties.create_missing_property_definitions_from_file(
             api_factory=api_factory,
             properties_scope=properties_scope,
@@ -1776,35 +2867,28 @@ def load_from_data_frame(
             key if "/" not in key else key.split("/")[2] for key in sub_holding_keys
         ]
 
-        # Check for and create missing property definitions for the sub-holding-keys
-        data_frame = cocoon.properties.create_missing_property_definitions_from_file(
-            api_factory=api_factory,
-            properties_scope=properties_scope,
-            domain="Transaction",
-            data_frame=data_frame,
-            property_columns=[{"source": key} for key in sub_holding_keys_codes],
-        )
-
-        transaction_portfolio_api = api_factory.build(
-            lusid.api.TransactionPortfoliosApi
-        )
+        # The portfolios and property definitions are left untouched when explaining the load
+        if not explain:
+            # Check for and create missing property definitions for the sub-holding-keys
+            data_frame = cocoon.properties.create_missing_property_definitions_from_file(
+                api_factory=api_factory,
+                properties_scope=properties_scope,
+                domain="Transaction",
+                data_frame=data_frame,
+                property_columns=[{"source": key} for key in sub_holding_keys_codes],
+            )
 
-        # Add subholding keys to the portfolios we are going to apply the transactions to
-        for code in set(data_frame[mapping_required["code"]]):
-            transaction_portfolio_api.patch_portfolio_details(
-                scope,
-                code,
-                [
-                    {
-                        "value": cocoon.properties._infer_full_property_keys(
-                            partial_keys=sub_holding_keys,
-                            properties_scope=properties_scope,
-                            domain="Transaction",
-                        ),
-                        "path": "/subHoldingKeys",
-                        "op": "add",
-                    }
-                ],
+            # Add subholding keys to the portfolios we are going to apply the transactions to
+            add_sub_holding_keys_to_portfolios(
+                api_factory=api_factory,
+                scope=scope,
+                codes=list(set(data_frame[mapping_required["code"]])),
+                sub_holding_keys=cocoon.properties._infer_full_property_keys(
+                    partial_keys=sub_holding_keys,
+                    properties_scope=properties_scope,
+                    domain="Transaction",
+                ),
+                max_workers=thread_pool_max_workers,
             )
 
         # Add sub-holding keys to the properties, so it is created for each transaction.
@@ -1813,9 +2897,6 @@ def load_from_data_frame(
             for sub_holding_key in sub_holding_keys_codes
         ]
 
-    # Start a new event loop in a new thread, this is required to run inside a Jupyter notebook
-    loop = cocoon.async_tools.start_event_loop_new_thread()
-
     # Keyword arguments to be used in requests to the LUSID API
     keyword_arguments = {
         "scope": scope,
@@ -1830,31 +2911,94 @@ def load_from_data_frame(
         "holdings_adjustment_only": holdings_adjustment_only,
         "thread_pool": thread_pool,
         "instrument_scope": instrument_scope,
+        "resolution_cache": resolution_cache,
+        "thread_pool_max_workers": thread_pool_max_workers,
+        "summary_only": summary_only,
+        "metrics_hooks": metrics_hooks,
+        "rate_governor": rate_governor,
+        "concurrency_controller": concurrency_controller,
+        "raw_payloads": raw_payloads,
     }
 
-    # Get the responses from LUSID
-    logging.debug("constructing batches...")
-    responses = asyncio.run_coroutine_threadsafe(
-        _construct_batches(
-            api_factory=api_factory,
-            data_frame=data_frame,
-            mapping_required=mapping_required,
-            mapping_optional=mapping_optional,
-            property_columns=property_columns,
-            properties_scope=properties_scope,
-            instrument_identifier_mapping=identifier_mapping,
-            batch_size=batch_size,
-            file_type=file_type,
-            domain_lookup=domain_lookup,
-            sub_holding_keys=sub_holding_keys,
-            sub_holding_keys_scope=sub_holding_keys_scope,
-            return_unmatched_items=return_unmatched_items,
-            **keyword_arguments,
-        ),
-        loop,
-    ).result()
+    # Fetch the portfolios which already exist in the scope once, so that only the missing ones need a request
+    if file_type in ("portfolio", "reference_portfolio"):
+        keyword_arguments["existing_portfolios"] = list_existing_portfolios(
+            api_factory=api_factory, scope=scope
+        )
+
+    # Describe the load rather than sending it to LUSID
+    if explain:
+        logging.debug("explaining batches...")
+        return {
+            file_type
+            + "s": _explain_batches(
+                data_frame=data_frame,
+                mapping_required=mapping_required,
+                mapping_optional=mapping_optional,
+                property_columns=property_columns,
+                properties_scope=properties_scope,
+                instrument_identifier_mapping=identifier_mapping,
+                batch_size=batch_size,
+                file_type=file_type,
+                domain_lookup=domain_lookup,
+                sub_holding_keys=sub_holding_keys,
+                sub_holding_keys_scope=sub_holding_keys_scope,
+                **keyword_arguments,
+            )
+        }
+
+    # Convert the DataFrame to payloads in a pool of processes if requested. The processes are spawned rather than
+    # forked as this process is running the threads of the thread pool and event loop
+    conversion_pool = (
+        concurrent.futures.ProcessPoolExecutor(
+            max_workers=conversion_processes,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        if conversion_processes is not None
+        else None
+    )
+    keyword_arguments["conversion_pool"] = conversion_pool
 
-    # Stop the additional event loop
-    cocoon.async_tools.stop_event_loop_new_thread(loop)
+    # The portfolios are added to portfolio groups one at a time, in a pool shared by all of the groups
+    member_pool = (
+        concurrent.futures.ThreadPoolExecutor(max_workers=thread_pool_max_workers)
+        if file_type == "portfolio_group"
+        else None
+    )
+    keyword_arguments["member_pool"] = member_pool
+
+    try:
+        # Start a new event loop in a new thread, this is required to run inside a Jupyter notebook
+        loop = cocoon.async_tools.start_event_loop_new_thread()
+
+        # Get the responses from LUSID
+        logging.debug("constructing batches...")
+        responses = asyncio.run_coroutine_threadsafe(
+            _construct_batches(
+                api_factory=api_factory,
+                data_frame=data_frame,
+                mapping_required=mapping_required,
+                mapping_optional=mapping_optional,
+                property_columns=property_columns,
+                properties_scope=properties_scope,
+                instrument_identifier_mapping=identifier_mapping,
+                batch_size=batch_size,
+                file_type=file_type,
+                domain_lookup=domain_lookup,
+                sub_holding_keys=sub_holding_keys,
+                sub_holding_keys_scope=sub_holding_keys_scope,
+                return_unmatched_items=return_unmatched_items,
+                **keyword_arguments,
+            ),
+            loop,
+        ).result()
+
+        # Stop the additional event loop
+        cocoon.async_tools.stop_event_loop_new_thread(loop)
+    finally:
+        if conversion_pool is not None:
+            conversion_pool.shutdown()
+        if member_pool is not None:
+            member_pool.shutdown()
 
     return {file_type + "s": responses}
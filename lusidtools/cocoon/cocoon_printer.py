@@ -1,9 +1,42 @@
+import os
+
 import pandas as pd
-import numpy as np
 from lusidtools.cocoon import checkargs
 from lusid.exceptions import ApiException
 from flatten_json import flatten
 
+# The fields extracted from the items in each type of response, named as they would be by flattening the item
+RESPONSE_SCHEMAS = {
+    "instruments": [
+        "lusid_instrument_id",
+        "scope",
+        "name",
+        "state",
+        "asset_class",
+        "dom_ccy",
+        "version.as_at_date",
+    ],
+    "quotes": [
+        "quote_id.quote_series_id.provider",
+        "quote_id.quote_series_id.price_source",
+        "quote_id.quote_series_id.instrument_id",
+        "quote_id.quote_series_id.instrument_id_type",
+        "quote_id.quote_series_id.quote_type",
+        "quote_id.quote_series_id.field",
+        "quote_id.effective_at",
+        "metric_value.value",
+        "metric_value.unit",
+        "lineage",
+        "cut_label",
+        "uploaded_by",
+        "as_at",
+        "scale_factor",
+    ],
+}
+
+# The fields extracted from the items LUSID failed to upsert
+ERROR_DETAIL_SCHEMA = ["id", "type", "detail"]
+
 
 class CocoonPrinter:
     VALID_KEYS = [
@@ -16,7 +49,11 @@ class CocoonPrinter:
     ]
 
     def __init__(
-        self, response, extended_error_details=False, data_entity_details=False
+        self,
+        response,
+        extended_error_details=False,
+        data_entity_details=False,
+        columns=None,
     ):
         self.validate(response)
 
@@ -24,6 +61,7 @@ class CocoonPrinter:
         self.file_type = list(response.keys())[0]
         self.extended_error_details = extended_error_details
         self.data_entity_details = data_entity_details
+        self.columns = columns
 
     def validate(self, response):
         if len(response.keys()) == 0:
@@ -47,6 +85,7 @@ class CocoonPrinter:
             self.response,
             extended_error_details=self.extended_error_details,
             data_entity_details=self.data_entity_details,
+            columns=self.columns,
         )
 
     def format_portfolios_response(self):
@@ -61,7 +100,9 @@ class CocoonPrinter:
 
     def format_quotes_response(self):
         return format_quotes_response(
-            self.response, extended_error_details=self.extended_error_details,
+            self.response,
+            extended_error_details=self.extended_error_details,
+            columns=self.columns,
         )
 
     def format_holdings_response(self):
@@ -77,6 +118,11 @@ class CocoonPrinter:
     def format_response(self):
         return getattr(CocoonPrinter, f"format_{self.file_type}_response")(self)
 
+    def write_response(self, directory, file_format="csv"):
+        return write_formatted_response(
+            self.format_response(), directory, self.file_type, file_format
+        )
+
 
 @checkargs
 def check_dict_for_required_keys(
@@ -133,25 +179,66 @@ def get_errors_from_response(
                 f" Unexpected Error in response. Expected instance of ApiException, but got: {repr(i)}"
             )
 
-    # get status and reason for each batch
-    status = [item.status for item in list_of_API_exceptions]
-    reason = [item.reason for item in list_of_API_exceptions]
-
-    items_list = [reason, status]
-    column_names = ["error_items", "status"]
+    # get status and reason for each batch as columns
+    columns = {
+        "error_items": [item.reason for item in list_of_API_exceptions],
+        "status": [item.status for item in list_of_API_exceptions],
+    }
 
     if extended_error_details:
-        request_id = [
+        columns["request_id"] = [
             item.headers.get("lusid-meta-requestId") for item in list_of_API_exceptions
         ]
-        error_body = [item.body for item in list_of_API_exceptions]
-        items_list.extend([request_id, error_body])
-        column_names.extend(["request_id", "error_body"])
+        columns["error_body"] = [item.body for item in list_of_API_exceptions]
 
-    # transpose list of lists for insertion to dataframe
-    items_error = np.array(items_list).T.tolist()
+    return pd.DataFrame(columns, columns=list(columns.keys()))
 
-    return pd.DataFrame(items_error, columns=column_names)
+
+def get_field(item, path: str):
+    """
+    This function gets the value of a nested attribute of a response item
+
+    Parameters
+    ----------
+    item
+        The item from the response e.g. a lusid.models.Instrument
+    path : str
+        The path to the attribute with the names of nested attributes separated by "." e.g. quote_id.effective_at
+
+    Returns
+    -------
+    The value of the attribute, None if the item or any attribute along the path does not have it
+    """
+
+    for attribute in path.split("."):
+        if item is None:
+            return None
+        item = getattr(item, attribute, None)
+
+    return item
+
+
+def extract_columns(items: list, schema: list) -> pd.DataFrame:
+    """
+    This function extracts the fields in a schema from a list of response items directly into columns
+
+    Parameters
+    ----------
+    items : list
+        The items from the response e.g. a list of lusid.models.Instrument
+    schema : list[str]
+        The paths of the fields to extract, these are used as the column names
+
+    Returns
+    -------
+    pd.DataFrame
+        A DataFrame with a row for each item and a column for each field in the schema
+    """
+
+    return pd.DataFrame(
+        {column: [get_field(item, column) for item in items] for column in schema},
+        columns=schema,
+    )
 
 
 def get_portfolio_from_href(href: list, file_type: str):
@@ -177,38 +264,41 @@ def get_portfolio_from_href(href: list, file_type: str):
 
 
 @checkargs
-def get_non_href_response(response: dict, file_type: str, data_entity_details=False):
-    dict_items_success = [
-        (key, value)
-        for batch in response[file_type]["success"]
-        for (key, value) in batch.values.items()
-    ]
-    dict_items_failed = [
-        (key, value)
-        for batch in response[file_type]["success"]
-        for (key, value) in batch.failed.items()
-    ]
+def get_non_href_response(
+    response: dict, file_type: str, data_entity_details=False, schema: list = None
+):
+    keys_success, items_success, keys_failed, items_failed = [], [], [], []
+    for batch in response[file_type]["success"]:
+        keys_success.extend(batch.values.keys())
+        items_success.extend(batch.values.values())
+        keys_failed.extend(batch.failed.keys())
+        items_failed.extend(batch.failed.values())
 
-    def extract_value_details_from_success_request(data_entity_dict):
-        return pd.DataFrame(
-            flatten(value[1].to_dict(), ".") for value in data_entity_dict
-        )
+    def extract_value_details_from_success_request(items):
+        return pd.DataFrame(flatten(item.to_dict(), ".") for item in items)
 
-    def extract_key_details_from_success_request(data_entity_dict):
-        return pd.DataFrame(value[0] for value in data_entity_dict)
+    def extract_key_details_from_success_request(keys):
+        return pd.DataFrame(key for key in keys)
 
-    if data_entity_details:
+    if schema is not None:
 
         return (
-            extract_value_details_from_success_request(dict_items_success),
-            extract_value_details_from_success_request(dict_items_failed),
+            extract_columns(items_success, schema),
+            extract_columns(items_failed, ERROR_DETAIL_SCHEMA),
+        )
+
+    elif data_entity_details:
+
+        return (
+            extract_value_details_from_success_request(items_success),
+            extract_value_details_from_success_request(items_failed),
         )
 
     else:
 
         return (
-            extract_key_details_from_success_request(dict_items_success),
-            extract_key_details_from_success_request(dict_items_failed),
+            extract_key_details_from_success_request(keys_success),
+            extract_key_details_from_success_request(keys_failed),
         )
 
 
@@ -216,6 +306,7 @@ def format_instruments_response(
     response: dict,
     extended_error_details: bool = False,
     data_entity_details: bool = False,
+    columns: list = None,
 ) -> (pd.DataFrame, pd.DataFrame, pd.DataFrame):
     """
     This function unpacks a response from instrument requests and returns successful, failed and errored statuses for
@@ -228,6 +319,9 @@ def format_instruments_response(
         A flag that determines whether the errors returned will have extended details (request id, error body)
     data_entity_details : bool
         A flag that determines whether the fields from the response will all be extracted
+    columns : list[str]
+        The fields to extract from the response e.g. RESPONSE_SCHEMAS["instruments"], these are read directly from
+        each instrument which is much faster than extracting all of the fields with data_entity_details
     Returns
     -------
     success : pd.DataFrame
@@ -245,7 +339,7 @@ def format_instruments_response(
 
     # get success and failures
     items_success, items_failed = get_non_href_response(
-        response, file_type, data_entity_details
+        response, file_type, data_entity_details, columns
     )
 
     return (
@@ -380,7 +474,7 @@ def format_holdings_response(
 
 
 def format_quotes_response(
-    response: dict, extended_error_details: bool = False,
+    response: dict, extended_error_details: bool = False, columns: list = None,
 ) -> (pd.DataFrame, pd.DataFrame, pd.DataFrame):
     """
     This function unpacks a response from quotes requests and returns successful, failed and errored statuses for
@@ -392,6 +486,9 @@ def format_quotes_response(
         response from Lusid-python-tools
     extended_error_details : bool
         A flag that determines whether the errors returned will have extended details (request id, error body)
+    columns : list[str]
+        The fields to extract from the response e.g. RESPONSE_SCHEMAS["quotes"], by default all of the fields are
+        extracted
 
     Returns
     -------
@@ -409,7 +506,7 @@ def format_quotes_response(
         response[file_type], f"Response from {file_type} request", ["errors", "success"]
     )
     items_success, items_failed = get_non_href_response(
-        response, file_type, data_entity_details=True
+        response, file_type, data_entity_details=True, schema=columns
     )
 
     return (
@@ -453,3 +550,46 @@ def format_reference_portfolios_response(
     )
 
     return (pd.DataFrame(items_success, columns=["successful items"]), errors)
+
+
+def write_formatted_response(
+    formatted_response: tuple, directory: str, file_type: str, file_format: str = "csv"
+) -> list:
+    """
+    This function writes the DataFrames from formatting a response to files, one for each DataFrame
+
+    Parameters
+    ----------
+    formatted_response : tuple
+        The success, error and (where there is one) failed DataFrames returned by a format function
+    directory : str
+        The directory to write the files to
+    file_type : str
+        The type of the response e.g. instruments, used to name the files
+    file_format : str
+        The format of the files, either "csv" or "parquet" (which requires pyarrow or fastparquet)
+
+    Returns
+    -------
+    list[str]
+        The paths of the files written
+    """
+
+    if file_format not in ["csv", "parquet"]:
+        raise ValueError(
+            f"Unsupported file format {file_format}, must be either 'csv' or 'parquet'"
+        )
+
+    os.makedirs(directory, exist_ok=True)
+
+    paths = []
+    for name, data_frame in zip(["success", "errors", "failed"], formatted_response):
+        path = os.path.join(directory, f"{file_type}_{name}.{file_format}")
+        if file_format == "csv":
+            data_frame.to_csv(path, index=False)
+        else:
+            # Parquet requires string column names
+            data_frame.rename(columns=str).to_parquet(path, index=False)
+        paths.append(path)
+
+    return paths
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import threading
+import time
+
+
+class AdaptiveConcurrency:
+    """
+    Limits the number of batches in flight, tuning the limit with additive increase and multiplicative decrease (AIMD).
+
+    The limit grows by roughly additive_increase for each limit's worth of batches which complete without being
+    throttled and without the smoothed latency rising above latency_tolerance times the lowest smoothed latency seen.
+    When a batch is throttled (429), fails with a server error (5xx) or the latency rises, the limit is multiplied by
+    decrease_factor. Batches which started before the last decrease do not decrease it again.
+    """
+
+    def __init__(
+        self,
+        initial: int = 5,
+        min_limit: int = 1,
+        max_limit: int = 50,
+        additive_increase: float = 1.0,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 2.0,
+        smoothing: float = 0.2,
+    ):
+        """
+        Parameters
+        ----------
+        initial : int
+            The number of batches allowed in flight to start with
+        min_limit : int
+            The fewest batches allowed in flight
+        max_limit : int
+            The most batches allowed in flight
+        additive_increase : float
+            The increase in the limit for each limit's worth of healthy batches
+        decrease_factor : float
+            The factor the limit is multiplied by when a batch is throttled or the latency rises
+        latency_tolerance : float
+            How many times the lowest smoothed latency the smoothed latency can rise to before the limit is decreased
+        smoothing : float
+            The weight given to each new latency in the exponentially weighted moving average of the latency
+        """
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial, min_limit), max_limit))
+        self.additive_increase = additive_increase
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+
+        self.in_flight = 0
+        self.smoothed_latency = None
+        self.baseline_latency = None
+
+        self._lock = threading.Lock()
+        self._last_decrease = 0.0
+        self._condition = None
+        self._loop = None
+
+    @property
+    def level(self) -> int:
+        """
+        The number of batches currently allowed in flight
+        """
+
+        return max(self.min_limit, int(self.limit))
+
+    def _get_condition(self) -> asyncio.Condition:
+        # The condition is bound to the event loop it is used on, so create a new one for each load's event loop
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self) -> float:
+        """
+        Waits until another batch is allowed in flight
+
+        Returns
+        -------
+        float
+            The time the batch was allowed to start, to pass to release
+        """
+
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < self.level)
+            self.in_flight += 1
+        return time.monotonic()
+
+    async def release(self, started: float, latency: float, throttled: bool) -> None:
+        """
+        Signals that a batch has completed and tunes the limit from its outcome
+
+        Parameters
+        ----------
+        started : float
+            The time returned by acquire when the batch started
+        latency : float
+            The time in seconds the batch took
+        throttled : bool
+            Whether the batch was throttled or failed with a server error
+        """
+
+        self.record(started, latency, throttled)
+
+        condition = self._get_condition()
+        async with condition:
+            self.in_flight -= 1
+            condition.notify_all()
+
+    def record(self, started: float, latency: float, throttled: bool) -> None:
+        """
+        Tunes the limit from the outcome of a batch
+
+        Parameters
+        ----------
+        started : float
+            The time the batch started
+        latency : float
+            The time in seconds the batch took
+        throttled : bool
+            Whether the batch was throttled or failed with a server error
+        """
+
+        with self._lock:
+            if not throttled:
+                self.smoothed_latency = (
+                    latency
+                    if self.smoothed_latency is None
+                    else self.smoothing * latency
+                    + (1 - self.smoothing) * self.smoothed_latency
+                )
+                self.baseline_latency = (
+                    self.smoothed_latency
+                    if self.baseline_latency is None
+                    else min(self.baseline_latency, self.smoothed_latency)
+                )
+
+            latency_rising = (
+                self.smoothed_latency is not None
+                and self.smoothed_latency
+                > self.latency_tolerance * self.baseline_latency
+            )
+
+            if throttled or latency_rising:
+                # Only decrease once for the batches which were in flight together
+                if started >= self._last_decrease:
+                    self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                    self._last_decrease = time.monotonic()
+                    logging.debug(
+                        f"Decreased concurrency to {self.level}, throttled: {throttled}, "
+                        f"latency rising: {latency_rising}"
+                    )
+                    # Start measuring the baseline again at the lower concurrency
+                    if latency_rising:
+                        self.baseline_latency = self.smoothed_latency
+            else:
+                self.limit = min(
+                    self.max_limit, self.limit + self.additive_increase / self.limit
+                )
+
+
+def is_throttled(response) -> bool:
+    """
+    Checks whether a response is an error from being throttled (429) or a server error (5xx)
+
+    Parameters
+    ----------
+    response
+        The response, or the exception raised
+
+    Returns
+    -------
+    bool
+        Whether the response is a throttling or server error
+    """
+
+    if not isinstance(response, Exception):
+        return False
+
+    try:
+        status = int(getattr(response, "status", None))
+    except (TypeError, ValueError):
+        return False
+
+    return status == 429 or status >= 500
@@ -0,0 +1,254 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+
+class InstrumentResolutionCache:
+    """
+    A persistent cache of the LusidInstrumentIds that instrument identifiers resolve to, backed by SQLite.
+
+    Each entry is keyed by the identifier's property key, its value and the effective date of the resolution. An
+    identifier which resolved to no instruments is cached as an empty list so that it is not searched for again until
+    its (shorter) negative time to live has passed.
+    """
+
+    default_path = os.path.join(
+        os.path.expanduser("~"), ".lusidtools", "instrument_resolution_cache.sqlite"
+    )
+
+    def __init__(
+        self,
+        path: str = None,
+        ttl_seconds: int = 86400,
+        negative_ttl_seconds: int = 3600,
+    ):
+        """
+        Parameters
+        ----------
+        path : str
+            The path of the SQLite database file, use ":memory:" for a cache which only lives as long as the process
+        ttl_seconds : int
+            How long an identifier which resolved to at least one instrument is cached for
+        negative_ttl_seconds : int
+            How long an identifier which resolved to no instruments is cached for
+        """
+
+        self.path = path if path is not None else self.default_path
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+
+        if self.path != ":memory:" and os.path.dirname(self.path) != "":
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        # The connection is shared by the threads resolving instruments, access to it is serialised by the lock
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+
+        with self._lock, self._connection:
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS instrument_resolution (
+                    identifier_key TEXT NOT NULL,
+                    identifier_value TEXT NOT NULL,
+                    effective_at TEXT NOT NULL,
+                    luids TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (identifier_key, identifier_value, effective_at)
+                )
+                """
+            )
+
+    @staticmethod
+    def _normalise_key(identifier_key: str) -> str:
+        """
+        Converts an identifier to its full property key e.g. Figi to Instrument/default/Figi
+
+        Parameters
+        ----------
+        identifier_key : str
+            The identifier's code or full property key
+
+        Returns
+        -------
+        str
+            The full property key of the identifier
+        """
+
+        if "/" not in identifier_key:
+            return f"Instrument/default/{identifier_key}"
+
+        domain, scope, code = identifier_key.split("/", 2)
+        if domain.lower() == "instrument":
+            return f"Instrument/{scope}/{code}"
+        return identifier_key
+
+    def get(self, identifier_key: str, identifier_value, effective_at: str = None):
+        """
+        Gets the cached resolution of a single identifier
+
+        Parameters
+        ----------
+        identifier_key : str
+            The identifier's code or full property key e.g. Figi or Instrument/default/Figi
+        identifier_value
+            The value of the identifier
+        effective_at : str
+            The effective date of the resolution, None for the latest
+
+        Returns
+        -------
+        list[str] or None
+            The LusidInstrumentIds the identifier resolves to, an empty list if it is known not to resolve or None if
+            there is no live entry for it in the cache
+        """
+
+        return self.get_many(identifier_key, [identifier_value], effective_at).get(
+            str(identifier_value)
+        )
+
+    def get_many(
+        self, identifier_key: str, identifier_values: list, effective_at: str = None
+    ) -> dict:
+        """
+        Gets the cached resolutions of many values of the same identifier
+
+        Parameters
+        ----------
+        identifier_key : str
+            The identifier's code or full property key e.g. Figi or Instrument/default/Figi
+        identifier_values : list
+            The values of the identifier
+        effective_at : str
+            The effective date of the resolutions, None for the latest
+
+        Returns
+        -------
+        dict
+            The LusidInstrumentIds each value resolves to keyed by the value as a string, values without a live entry
+            in the cache are omitted
+        """
+
+        values = [str(value) for value in identifier_values]
+        found = {}
+
+        with self._lock:
+            # Query in chunks to stay inside SQLite's limit on the number of bound parameters
+            for i in range(0, len(values), 500):
+                chunk = values[i : i + 500]
+                rows = self._connection.execute(
+                    f"""
+                    SELECT identifier_value, luids FROM instrument_resolution
+                    WHERE identifier_key = ? AND effective_at = ? AND expires_at > ?
+                    AND identifier_value IN ({",".join("?" * len(chunk))})
+                    """,
+                    [
+                        self._normalise_key(identifier_key),
+                        effective_at or "",
+                        time.time(),
+                    ]
+                    + chunk,
+                ).fetchall()
+                found.update({value: json.loads(luids) for value, luids in rows})
+
+        logging.debug(
+            f"Instrument resolution cache hits for {identifier_key}: {len(found)} of {len(values)}"
+        )
+
+        return found
+
+    def put(
+        self,
+        identifier_key: str,
+        identifier_value,
+        luids: list,
+        effective_at: str = None,
+    ) -> None:
+        """
+        Caches the resolution of a single identifier
+
+        Parameters
+        ----------
+        identifier_key : str
+            The identifier's code or full property key e.g. Figi or Instrument/default/Figi
+        identifier_value
+            The value of the identifier
+        luids : list[str]
+            The LusidInstrumentIds the identifier resolves to, an empty list if it does not resolve
+        effective_at : str
+            The effective date of the resolution, None for the latest
+        """
+
+        self.put_many(identifier_key, {identifier_value: luids}, effective_at)
+
+    def put_many(
+        self, identifier_key: str, resolutions: dict, effective_at: str = None
+    ) -> None:
+        """
+        Caches the resolutions of many values of the same identifier
+
+        Parameters
+        ----------
+        identifier_key : str
+            The identifier's code or full property key e.g. Figi or Instrument/default/Figi
+        resolutions : dict
+            The LusidInstrumentIds each value resolves to keyed by the value, an empty list if it does not resolve
+        effective_at : str
+            The effective date of the resolutions, None for the latest
+        """
+
+        now = time.time()
+
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO instrument_resolution VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        self._normalise_key(identifier_key),
+                        str(value),
+                        effective_at or "",
+                        json.dumps(list(luids)),
+                        now
+                        + (
+                            self.ttl_seconds
+                            if len(luids) > 0
+                            else self.negative_ttl_seconds
+                        ),
+                    )
+                    for value, luids in resolutions.items()
+                ],
+            )
+
+    def purge_expired(self) -> int:
+        """
+        Removes the expired entries from the cache
+
+        Returns
+        -------
+        int
+            The number of entries removed
+        """
+
+        with self._lock, self._connection:
+            return self._connection.execute(
+                "DELETE FROM instrument_resolution WHERE expires_at <= ?",
+                [time.time()],
+            ).rowcount
+
+    def clear(self) -> None:
+        """
+        Removes all entries from the cache
+        """
+
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM instrument_resolution")
+
+    def close(self) -> None:
+        """
+        Closes the connection to the underlying database
+        """
+
+        with self._lock:
+            self._connection.close()
@@ -8,7 +8,9 @@ import pandas as pd
 import logging
 import re
 from lusidtools.cocoon.async_tools import run_in_executor
+from lusidtools.cocoon.instrument_cache import InstrumentResolutionCache
 import asyncio
+import concurrent.futures
 from typing import Callable
 
 
@@ -131,10 +133,18 @@ def resolve_instruments(
     api_factory: lusid.utilities.ApiClientFactory,
     data_frame: pd.DataFrame,
     identifier_mapping: dict,
+    max_workers: int = 5,
+    max_attempts: int = 3,
+    backoff_seconds: int = 1,
+    resolution_cache: InstrumentResolutionCache = None,
+    effective_at: str = None,
 ):
     """
     This function attempts to resolve each row of the file to an instrument in LUSID
 
+    Rows with identical identifier values are resolved with a single search, the searches for the distinct sets of
+    identifiers are run concurrently.
+
     Parameters
     ----------
     api_factory : lusid.utilities.ApiClientFactory
@@ -143,6 +153,16 @@ def resolve_instruments(
         The DataFrame containing the transactions or holdings to resolve to unique instruments
     identifier_mapping : dict
         The column mapping between allowable identifiers in LUSID and identifier columns in the dataframe
+    max_workers : int
+        The maximum number of searches to run concurrently
+    max_attempts : int
+        The number of times to attempt a search before giving up on it
+    backoff_seconds : int
+        The time to wait before the first retry of a failed search, this doubles with each subsequent retry
+    resolution_cache : InstrumentResolutionCache
+        A cache of identifier resolutions to read from and fill, identifiers found in it are not searched for again
+    effective_at : str
+        The effective datetime or cut label to resolve the instruments at, None for the current datetime
 
     Returns
     -------
@@ -187,114 +207,185 @@ def resolve_instruments(
     # Copy the data_frame to ensure the original isn't modified
     _data_frame = data_frame.copy(deep=True)
 
-    # Set up the result Pandas Series to track resolution
-    found_with = pd.Series(index=_data_frame.index, dtype=np.dtype(object))
-    resolvable = pd.Series(index=_data_frame.index, dtype=np.dtype(bool))
-    luid = pd.Series(index=_data_frame.index, dtype=np.dtype(object))
-    comment = pd.Series(index=_data_frame.index, dtype=np.dtype(object))
-    logging.info("Beginning instrument resolution process")
-    # Iterate over each row in the DataFrame
-    for index, row in _data_frame.iterrows():
-
-        if index % 10 == 0:
-            logging.info(f"Up to row {index}")
-        # Initialise list to hold the identifiers used to resolve
-        found_with_current = []
-        # Initialise a value of False for the row's resolvability to an instrument in LUSID
-        resolvable_current = False
-        # Initialise the LUID value
-        luid_current = None
-        # Initialise the comment value
-        comment_current = "No instruments found for the given identifiers"
-        # Takes the currency resolution function and applies it
-        currency = row[identifier_mapping["Instrument/default/Currency"]]
-
-        if not pd.isna(currency):
-            resolvable_current = True
-            found_with_current.append(currency)
-            luid_current = currency
-            comment_current = "Resolved as cash with a currency"
-
-        search_requests = [
-            models.InstrumentSearchProperty(
-                key=f"Instrument/default/{identifier_lusid}"
-                if "Instrument/" not in identifier_lusid
-                else identifier_lusid,
-                value=str(row[identifier_dataframe]),
-            )
-            for identifier_lusid, identifier_dataframe in identifier_mapping.items()
-            if not pd.isnull(row[identifier_dataframe])
+    identifier_keys = [
+        f"Instrument/default/{identifier_lusid}"
+        if "Instrument/" not in identifier_lusid
+        else identifier_lusid
+        for identifier_lusid in identifier_mapping.keys()
+    ]
+
+    # Collect the identifier values of each row, using None for missing values so that identical rows compare equal
+    identifier_values = _data_frame.loc[:, list(identifier_mapping.values())].astype(
+        object
+    )
+    identifier_values = identifier_values.where(identifier_values.notna(), None)
+
+    # Collapse the rows with identical identifiers so that each distinct instrument is only searched for once
+    row_codes, unique_identifier_values = pd.factorize(
+        pd.Series(
+            list(identifier_values.itertuples(index=False, name=None)),
+            index=_data_frame.index,
+            dtype=np.dtype(object),
+        )
+    )
+
+    logging.info(
+        f"Beginning instrument resolution process for {len(unique_identifier_values)} unique instruments "
+        f"across {len(_data_frame)} rows"
+    )
+
+    def resolve(values: tuple) -> tuple:
+        return _resolve_instrument(
+            api_factory=api_factory,
+            identifiers=dict(zip(identifier_keys, values)),
+            max_attempts=max_attempts,
+            backoff_seconds=backoff_seconds,
+            resolution_cache=resolution_cache,
+            effective_at=effective_at,
+        )
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(resolve, unique_identifier_values))
+
+    # Broadcast the result for each distinct instrument back to the rows which share its identifiers
+    resolved = pd.DataFrame.from_records(
+        results, columns=["resolvable", "foundWith", "LusidInstrumentId", "comment"]
+    )
+
+    for column in resolved.columns:
+        _data_frame[column] = resolved[column].to_numpy(dtype=np.dtype(object))[
+            row_codes
         ]
 
-        # Call LUSID to search for instruments
-        attempts = 0
-
-        if len(search_requests) > 0:
-            while attempts < 3:
-                try:
-                    response = api_factory.build(SearchApi).instruments_search(
-                        instrument_search_property=search_requests, mastered_only=True
-                    )
-                    break
-                except lusid.exceptions.ApiException as error_message:
-                    attempts += 1
-                    comment_current = f"Failed to find instrument due to LUSID error during search due to status {error_message.status} with reason {error_message.reason}"
-                    time.sleep(5)
-
-            if attempts == 3:
-                # Update the luid series
-                luid.iloc[index] = luid_current
-                # Update the found with series
-                found_with.iloc[index] = found_with_current
-                # Update the resolvable series
-                resolvable.iloc[index] = resolvable_current
-                # Update the comment series
-                comment.iloc[index] = comment_current
+    _data_frame["resolvable"] = _data_frame["resolvable"].astype(bool)
+
+    return _data_frame
+
+
+def _resolve_instrument(
+    api_factory: lusid.utilities.ApiClientFactory,
+    identifiers: dict,
+    max_attempts: int,
+    backoff_seconds: int,
+    resolution_cache: InstrumentResolutionCache = None,
+    effective_at: str = None,
+) -> tuple:
+    """
+    Attempts to resolve a single instrument in LUSID from its identifiers
+
+    Parameters
+    ----------
+    api_factory : lusid.utilities.ApiClientFactory
+        An instance of the Lusid Api Factory
+    identifiers : dict
+        The value of each identifier keyed by its full property key, missing identifiers have a value of None
+    max_attempts : int
+        The number of times to attempt the search before giving up
+    backoff_seconds : int
+        The time to wait before the first retry of a failed search, this doubles with each subsequent retry
+    resolution_cache : InstrumentResolutionCache
+        The cache of identifier resolutions to read from and fill, if any
+    effective_at : str
+        The effective datetime or cut label to resolve the instrument at, None for the current datetime
+
+    Returns
+    -------
+    tuple
+        Whether the instrument is resolvable, the identifiers it was found with, its LUID and a comment
+    """
+
+    # Initialise list to hold the identifiers used to resolve
+    found_with = []
+    # Initialise a value of False for the instrument's resolvability to an instrument in LUSID
+    resolvable = False
+    # Initialise the LUID value
+    luid = None
+    # Initialise the comment value
+    comment = "No instruments found for the given identifiers"
+
+    currency = identifiers["Instrument/default/Currency"]
+
+    if currency is not None:
+        resolvable = True
+        found_with.append(currency)
+        luid = currency
+        comment = "Resolved as cash with a currency"
+
+    search_requests = [
+        models.InstrumentSearchProperty(key=key, value=str(value))
+        for key, value in identifiers.items()
+        if value is not None
+    ]
+
+    if len(search_requests) == 0:
+        return resolvable, found_with, luid, comment
+
+    # The LUIDs each search request resolves to, taken from the cache where possible
+    resolutions = [
+        resolution_cache.get(search_request.key, search_request.value, effective_at)
+        if resolution_cache is not None
+        else None
+        for search_request in search_requests
+    ]
+
+    uncached_requests = [
+        search_request
+        for search_request, resolution in zip(search_requests, resolutions)
+        if resolution is None
+    ]
+
+    if len(uncached_requests) > 0:
+        # Call LUSID to search for instruments, backing off exponentially between attempts
+        for attempt in range(max_attempts):
+            try:
+                response = api_factory.build(SearchApi).instruments_search(
+                    instrument_search_property=uncached_requests,
+                    mastered_effective_at=effective_at,
+                    mastered_only=True,
+                )
+                break
+            except lusid.exceptions.ApiException as error_message:
+                comment = f"Failed to find instrument due to LUSID error during search due to status {error_message.status} with reason {error_message.reason}"
+                if attempt < max_attempts - 1:
+                    time.sleep(backoff_seconds * 2 ** attempt)
+        else:
+            return resolvable, found_with, luid, comment
+
+        searched = iter(response)
+        for index, resolution in enumerate(resolutions):
+            if resolution is not None:
                 continue
 
-            search_request_number = -1
-
-            for result in response:
-
-                search_request_number += 1
-                # If there are matches
-                if len(result.mastered_instruments) == 1:
-                    # Add the identifier responsible for the successful search request to the list
-                    found_with_current.append(
-                        search_requests[search_request_number].key.split("/")[2]
-                    )
-                    comment_current = (
-                        "Uniquely resolved to an instrument in the securities master"
-                    )
-                    resolvable_current = True
-                    luid_current = (
-                        result.mastered_instruments[0]
-                        .identifiers["LusidInstrumentId"]
-                        .value
-                    )
-                    break
-
-                elif len(result.mastered_instruments) > 1:
-                    comment_current = f'Multiple instruments found for the instrument using identifier {search_requests[search_request_number].key.split("/")[2]}'
-                    resolvable_current = False
-                    luid_current = np.NaN
-
-        # Update the luid series
-        luid.iloc[index] = luid_current
-        # Update the found with series
-        found_with.iloc[index] = found_with_current
-        # Update the resolvable series
-        resolvable.iloc[index] = resolvable_current
-        # Update the comment series
-        comment.iloc[index] = comment_current
-
-    # Add the series to the dataframe
-    _data_frame["resolvable"] = resolvable
-    _data_frame["foundWith"] = found_with
-    _data_frame["LusidInstrumentId"] = luid
-    _data_frame["comment"] = comment
+            resolutions[index] = [
+                instrument.identifiers["LusidInstrumentId"].value
+                for instrument in next(searched).mastered_instruments
+            ]
 
-    return _data_frame
+            if resolution_cache is not None:
+                resolution_cache.put(
+                    search_requests[index].key,
+                    search_requests[index].value,
+                    resolutions[index],
+                    effective_at,
+                )
+
+    for search_request, luids in zip(search_requests, resolutions):
+
+        # If there are matches
+        if len(luids) == 1:
+            # Add the identifier responsible for the successful search request to the list
+            found_with.append(search_request.key.split("/")[2])
+            comment = "Uniquely resolved to an instrument in the securities master"
+            resolvable = True
+            luid = luids[0]
+            break
+
+        elif len(luids) > 1:
+            comment = f'Multiple instruments found for the instrument using identifier {search_request.key.split("/")[2]}'
+            resolvable = False
+            luid = np.NaN
+
+    return resolvable, found_with, luid, comment
 
 
 @checkargs
@@ -332,49 +423,68 @@ async def enrich_instruments(
     instrument_identifier_mapping: dict,
     mapping_required: dict,
     constant_prefix: str = "$",
+    max_concurrent_searches: int = 10,
     **kwargs,
 ):
-    search_requests_all = []
-
-    for index, row in data_frame.iterrows():
-        search_requests_instrument = [
-            lusid.models.InstrumentSearchProperty(
-                key=identifier_lusid
-                if re.findall("Instrument/default/\S+", identifier_lusid)
-                else f"Instrument/default/{identifier_lusid}",
-                value=row[identifier_column],
-            )
-            for identifier_lusid, identifier_column in instrument_identifier_mapping.items()
-            if not pd.isna(row[identifier_column])
-        ]
-
-        search_requests_all.append(search_requests_instrument)
+    """
+    Enriches the DataFrame with instrument names found by searching LUSID with the instrument identifiers
 
-    responses = await asyncio.gather(
-        *[
-            instrument_search(
-                api_factory=api_factory, search_requests=search_requests, **kwargs
-            )
-            for search_requests in search_requests_all
-        ],
-        return_exceptions=False,
-    )
+    Each distinct (identifier type, identifier value) pair is searched for only once. The identifiers are tried in
+    the order of the mapping and an instrument is only searched for with its next identifier if no name has been found
+    with the previous ones.
 
-    names = []
+    Parameters
+    ----------
+    api_factory : lusid.utilities.ApiClientFactory
+        The api factory to use
+    data_frame : pd.DataFrame
+        The DataFrame containing the instruments to enrich
+    instrument_identifier_mapping : dict
+        The mapping between LUSID instrument identifiers and identifier columns in the DataFrame
+    mapping_required : dict
+        The required mapping, updated so that the name is populated from the enriched column
+    constant_prefix : str
+        The prefix used to denote a constant value in the mapping
+    max_concurrent_searches : int
+        The maximum number of searches to have in flight at any one time
+    kwargs
+        Arguments passed through to the search e.g. the thread_pool to run the searches on
 
-    for response in responses:
-        name = np.NaN
-        for single_search in response:
-            if isinstance(single_search, Exception):
-                logging.warning(single_search)
-                continue
-            elif len(single_search[0].external_instruments) > 0:
-                name = single_search[0].external_instruments[0].name
-                break
-        names.append(name)
+    Returns
+    -------
+    data_frame : pd.DataFrame
+        The DataFrame with the enriched name column added
+    mapping_required : dict
+        The updated required mapping
+    """
 
     enriched_column_name = "LUSID.Name.Enriched"
 
+    semaphore = asyncio.Semaphore(max_concurrent_searches)
+    names = pd.Series(np.NaN, index=data_frame.index, dtype=np.dtype(object))
+
+    for identifier_lusid, identifier_column in instrument_identifier_mapping.items():
+
+        # Only search for the instruments which have a value for this identifier and are still without a name
+        pending = data_frame.loc[
+            names.isna() & data_frame[identifier_column].notna(), identifier_column
+        ]
+
+        if pending.empty:
+            continue
+
+        found_names = await _search_instrument_names(
+            api_factory=api_factory,
+            identifier_key=identifier_lusid
+            if re.findall("Instrument/default/\S+", identifier_lusid)
+            else f"Instrument/default/{identifier_lusid}",
+            identifier_values=list(pending.unique()),
+            semaphore=semaphore,
+            **kwargs,
+        )
+
+        names.loc[pending.index] = pending.map(found_names)
+
     data_frame[enriched_column_name] = names
 
     # Missing mapping for name altogether
@@ -416,6 +526,60 @@ async def enrich_instruments(
     return data_frame, mapping_required
 
 
+async def _search_instrument_names(
+    api_factory: lusid.utilities.ApiClientFactory,
+    identifier_key: str,
+    identifier_values: list,
+    semaphore: asyncio.Semaphore,
+    **kwargs,
+) -> dict:
+    """
+    Searches for the name of the instrument for each of the provided values of a single identifier
+
+    Parameters
+    ----------
+    api_factory : lusid.utilities.ApiClientFactory
+        The api factory to use
+    identifier_key : str
+        The full property key of the identifier e.g. Instrument/default/Figi
+    identifier_values : list
+        The unique values of the identifier to search for
+    semaphore : asyncio.Semaphore
+        The semaphore limiting the number of searches in flight
+    kwargs
+        Arguments passed through to the search e.g. the thread_pool to run the searches on
+
+    Returns
+    -------
+    dict
+        The name of the instrument keyed by the identifier value, values without a match are omitted
+    """
+
+    async def search(value):
+        async with semaphore:
+            try:
+                return await instrument_search_single(
+                    api_factory,
+                    lusid.models.InstrumentSearchProperty(
+                        key=identifier_key, value=value
+                    ),
+                    **kwargs,
+                )
+            except lusid.exceptions.ApiException as e:
+                logging.warning(e)
+                return None
+
+    responses = await asyncio.gather(
+        *[search(value) for value in identifier_values], return_exceptions=False
+    )
+
+    return {
+        value: response[0].external_instruments[0].name
+        for value, response in zip(identifier_values, responses)
+        if response and len(response[0].external_instruments) > 0
+    }
+
+
 async def instrument_search(
     api_factory: lusid.utilities.ApiClientFactory, search_requests: list, **kwargs
 ) -> list:
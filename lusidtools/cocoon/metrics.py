@@ -0,0 +1,282 @@
+import bisect
+import threading
+
+import pandas as pd
+
+# The upper bounds in seconds of the histogram buckets used for the batch timings
+DEFAULT_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120]
+
+
+class BatchMetrics:
+    """
+    The metrics for a single batch loaded into LUSID by load_from_data_frame
+    """
+
+    def __init__(
+        self,
+        file_type: str,
+        code: str = None,
+        rows: int = 0,
+        payload_bytes: int = 0,
+        queue_wait: float = 0.0,
+        latency: float = 0.0,
+        server_duration: float = None,
+        calls: int = 0,
+        retries: int = 0,
+        outcome: str = "success",
+        concurrency: int = None,
+    ):
+        """
+        Parameters
+        ----------
+        file_type : str
+            The file type of the batch e.g. transaction
+        code : str
+            The code of the portfolio the batch was loaded into, None if the file type is not portfolio specific
+        rows : int
+            The number of rows of the DataFrame in the batch
+        payload_bytes : int
+            The size of the serialised requests in the batch
+        queue_wait : float
+            The time in seconds the batch waited for a thread before being sent
+        latency : float
+            The time in seconds taken to send the batch and receive the response
+        server_duration : float
+            The time in seconds LUSID reported spending on the calls for the batch (lusid-meta-duration), None if it
+            was not reported
+        calls : int
+            The number of calls to LUSID made for the batch
+        retries : int
+            The number of times calls for the batch were retried
+        outcome : str
+            One of "success", "partial_failure" where some of the items in the batch failed or "error" where the
+            batch raised an exception
+        concurrency : int
+            The number of batches allowed in flight when the batch completed
+        """
+
+        self.file_type = file_type
+        self.code = code
+        self.rows = rows
+        self.payload_bytes = payload_bytes
+        self.queue_wait = queue_wait
+        self.latency = latency
+        self.server_duration = server_duration
+        self.calls = calls
+        self.retries = retries
+        self.outcome = outcome
+        self.concurrency = concurrency
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+    def __repr__(self):
+        return (
+            f"BatchMetrics({', '.join(f'{k}={v!r}' for k, v in self.__dict__.items())})"
+        )
+
+
+class HistogramAggregator:
+    """
+    A metrics hook which aggregates the metrics for each batch into histograms of the timings and totals of the counts,
+    grouped by file type and outcome. It is safe to call from many threads.
+    """
+
+    timings = ["queue_wait", "latency", "server_duration"]
+    counters = ["rows", "payload_bytes", "calls", "retries"]
+
+    def __init__(self, buckets: list = None):
+        """
+        Parameters
+        ----------
+        buckets : list[float]
+            The upper bounds in seconds of the histogram buckets, defaults to DEFAULT_BUCKETS
+        """
+
+        self.buckets = sorted(buckets if buckets is not None else DEFAULT_BUCKETS)
+        self._lock = threading.Lock()
+        self._series = {}
+        self._concurrency = {}
+
+    def __call__(self, metrics: BatchMetrics) -> None:
+        """
+        Adds the metrics for a batch to the aggregates
+
+        Parameters
+        ----------
+        metrics : BatchMetrics
+            The metrics for the batch
+        """
+
+        with self._lock:
+            series = self._series.setdefault(
+                (metrics.file_type, metrics.outcome),
+                {
+                    "batches": 0,
+                    **{counter: 0 for counter in self.counters},
+                    **{
+                        timing: {
+                            # The last bucket counts the values above every upper bound
+                            "buckets": [0] * (len(self.buckets) + 1),
+                            "sum": 0.0,
+                            "count": 0,
+                        }
+                        for timing in self.timings
+                    },
+                },
+            )
+
+            series["batches"] += 1
+            if metrics.concurrency is not None:
+                self._concurrency[metrics.file_type] = metrics.concurrency
+            for counter in self.counters:
+                series[counter] += getattr(metrics, counter)
+
+            for timing in self.timings:
+                value = getattr(metrics, timing)
+                if value is None:
+                    continue
+                histogram = series[timing]
+                histogram["buckets"][bisect.bisect_left(self.buckets, value)] += 1
+                histogram["sum"] += value
+                histogram["count"] += 1
+
+    def series(self) -> dict:
+        """
+        Gets a copy of the aggregates
+
+        Returns
+        -------
+        dict
+            The aggregates keyed by (file type, outcome), each with the number of batches, the totals of the counters
+            and for each timing the (non-cumulative) count of values in each bucket, their sum and their count
+        """
+
+        with self._lock:
+            return {
+                key: {
+                    name: (
+                        {**value, "buckets": list(value["buckets"])}
+                        if isinstance(value, dict)
+                        else value
+                    )
+                    for name, value in series.items()
+                }
+                for key, series in self._series.items()
+            }
+
+    def concurrency(self) -> dict:
+        """
+        Gets the latest concurrency reported for each file type
+
+        Returns
+        -------
+        dict
+            The number of batches allowed in flight keyed by the file type
+        """
+
+        with self._lock:
+            return dict(self._concurrency)
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Summarises the aggregates
+
+        Returns
+        -------
+        pd.DataFrame
+            A row for each file type and outcome with the number of batches, the totals of the counters and the mean
+            of each timing
+        """
+
+        return pd.DataFrame(
+            [
+                {
+                    "file_type": file_type,
+                    "outcome": outcome,
+                    "batches": series["batches"],
+                    **{counter: series[counter] for counter in self.counters},
+                    **{
+                        f"mean_{timing}": series[timing]["sum"]
+                        / series[timing]["count"]
+                        if series[timing]["count"] > 0
+                        else None
+                        for timing in self.timings
+                    },
+                }
+                for (file_type, outcome), series in self.series().items()
+            ],
+            columns=["file_type", "outcome", "batches"]
+            + self.counters
+            + [f"mean_{timing}" for timing in self.timings],
+        )
+
+    def reset(self) -> None:
+        """
+        Removes all of the aggregates
+        """
+
+        with self._lock:
+            self._series = {}
+            self._concurrency = {}
+
+
+def to_prometheus_text(
+    aggregator: HistogramAggregator, prefix: str = "lusidtools_cocoon"
+) -> str:
+    """
+    Exports the aggregates in the Prometheus text exposition format
+
+    Parameters
+    ----------
+    aggregator : HistogramAggregator
+        The aggregator to export
+    prefix : str
+        The prefix for the metric names
+
+    Returns
+    -------
+    str
+        The metrics in the Prometheus text exposition format
+    """
+
+    series = aggregator.series()
+    lines = []
+
+    def labels(file_type, outcome, **extra):
+        pairs = {"file_type": file_type, "outcome": outcome, **extra}
+        return "{" + ",".join(f'{k}="{v}"' for k, v in pairs.items()) + "}"
+
+    for counter in ["batches"] + aggregator.counters:
+        name = f"{prefix}_{counter}_total"
+        lines.append(f"# TYPE {name} counter")
+        for (file_type, outcome), values in series.items():
+            lines.append(f"{name}{labels(file_type, outcome)} {values[counter]}")
+
+    for timing in aggregator.timings:
+        name = f"{prefix}_batch_{timing}_seconds"
+        lines.append(f"# TYPE {name} histogram")
+        for (file_type, outcome), values in series.items():
+            histogram = values[timing]
+            cumulative = 0
+            for upper_bound, count in zip(
+                [str(bucket) for bucket in aggregator.buckets] + ["+Inf"],
+                histogram["buckets"],
+            ):
+                cumulative += count
+                lines.append(
+                    f"{name}_bucket{labels(file_type, outcome, le=upper_bound)} {cumulative}"
+                )
+            lines.append(f"{name}_sum{labels(file_type, outcome)} {histogram['sum']}")
+            lines.append(
+                f"{name}_count{labels(file_type, outcome)} {histogram['count']}"
+            )
+
+    concurrency = aggregator.concurrency()
+    if len(concurrency) > 0:
+        name = f"{prefix}_concurrency"
+        lines.append(f"# TYPE {name} gauge")
+        for file_type, level in concurrency.items():
+            lines.append(f'{name}{{file_type="{file_type}"}} {level}')
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,556 @@
+import functools
+import json
+import threading
+from urllib.parse import urlencode
+
+import lusid
+import pandas as pd
+import urllib3
+from lusid.exceptions import ApiException
+from lusid.rest import RESTClientObject, RESTResponse
+
+from lusidtools import cocoon
+from lusidtools.cocoon.dateorcutlabel import DateOrCutLabel
+from lusidtools.cocoon.properties import (
+    global_constants,
+    invalid_columns_error_message,
+)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# The file types which can be loaded from raw payloads rather than LUSID models
+RAW_PAYLOAD_FILE_TYPES = [
+    "transaction",
+    "transactions_with_commit_mode",
+    "holding",
+    "quote",
+]
+
+# The attributes populated outside of the mapping, see cocoon.utilities.set_attributes_recursive
+ADDITIONAL_ATTRIBUTES = [
+    "instrument_identifiers",
+    "properties",
+    "sub_holding_keys",
+    "identifiers",
+]
+
+# Guards swapping the REST client of an api client for an EncodedRESTClient
+_rest_client_lock = threading.Lock()
+
+
+class _CompiledField:
+    """
+    An attribute of a model compiled from the mapping, with everything needed to populate it from a row
+    """
+
+    __slots__ = [
+        "attribute",
+        "json_key",
+        "column",
+        "required",
+        "is_date",
+        "is_list",
+        "nested",
+    ]
+
+    def __init__(self, attribute, json_key, column, required, is_date, is_list, nested):
+        self.attribute = attribute
+        self.json_key = json_key
+        self.column = column
+        self.required = required
+        self.is_date = is_date
+        self.is_list = is_list
+        self.nested = nested
+
+
+class CompiledMapping:
+    """
+    A mapping between the columns of a DataFrame and a LUSID model compiled against the model's schema, used to
+    build the JSON-ready payload for the model directly from each row without constructing the model
+    """
+
+    def __init__(self, model_object, mapping: dict):
+        """
+        Parameters
+        ----------
+        model_object : lusid.models
+            The model object the mapping populates
+        mapping : dict
+            The expanded mapping between the model's attributes and the columns of the DataFrame
+        """
+
+        if getattr(model_object, "discriminator_value_class_map", None):
+            raise ValueError(
+                f"The model {model_object.__name__} is polymorphic, which is not supported by raw payloads"
+            )
+
+        self.model_object = model_object
+        self.fields = []
+
+        # Only the attributes which exist on the model are populated, as in set_attributes_recursive
+        for attribute in model_object.openapi_types:
+            if (
+                attribute not in mapping
+                or attribute in ADDITIONAL_ATTRIBUTES
+                or mapping[attribute] is None
+            ):
+                continue
+
+            attribute_type = model_object.openapi_types[attribute]
+            nested = None
+
+            if isinstance(mapping[attribute], dict):
+                (
+                    nested_model_name,
+                    nested_type,
+                ) = cocoon.utilities.extract_lusid_model_from_attribute_type(
+                    attribute_type
+                )
+                nested = CompiledMapping(
+                    getattr(lusid.models, nested_model_name), mapping[attribute]
+                )
+                is_list = nested_type == "list"
+            else:
+                is_list = "list" in attribute_type
+
+            self.fields.append(
+                _CompiledField(
+                    attribute=attribute,
+                    json_key=model_object.attribute_map[attribute],
+                    column=mapping[attribute] if nested is None else None,
+                    required=model_object.required_map[attribute] == "required",
+                    is_date="date" in attribute
+                    or "created" in attribute
+                    or "effective_at" in attribute,
+                    is_list=is_list,
+                    nested=nested,
+                )
+            )
+
+        # Check once that every required attribute is mapped rather than for every row, the types are not checked
+        unmapped = [
+            attribute
+            for attribute, required in model_object.required_map.items()
+            if required == "required"
+            and attribute not in ADDITIONAL_ATTRIBUTES
+            and attribute not in [field.attribute for field in self.fields]
+        ]
+        if len(unmapped) > 0:
+            raise ValueError(
+                f"The required attributes {unmapped} of {model_object.__name__} have not been mapped"
+            )
+
+    def build(self, row: dict):
+        """
+        Builds the payload for the model from a row
+
+        Parameters
+        ----------
+        row : dict
+            The row of the DataFrame keyed by column
+
+        Returns
+        -------
+        dict or None
+            The payload keyed by the JSON names of the attributes, None if the row has no value for a required
+            attribute or for any of the attributes
+        """
+
+        payload = {}
+        missing = 0
+
+        for field in self.fields:
+            if field.nested is not None:
+                value = field.nested.build(row)
+                if value is None:
+                    if field.required:
+                        return None
+                    continue
+                payload[field.json_key] = [value] if field.is_list else value
+                continue
+
+            value = row[field.column]
+            if _is_missing(value):
+                if field.required:
+                    return None
+                missing += 1
+                continue
+
+            if field.is_date:
+                value = str(DateOrCutLabel(value))
+            elif field.is_list and not isinstance(value, list):
+                value = [value]
+            payload[field.json_key] = value
+
+        # Propagate None rather than an empty payload, as set_attributes_recursive does
+        if missing == len(self.fields):
+            return None
+
+        return payload
+
+
+@functools.lru_cache(maxsize=64)
+def _compile_mapping(model_object_name: str, mapping: str) -> CompiledMapping:
+    return CompiledMapping(
+        getattr(lusid.models, model_object_name),
+        cocoon.utilities.expand_dictionary(json.loads(mapping)),
+    )
+
+
+def compile_mapping(
+    model_object_name: str, mapping_required: dict, mapping_optional: dict
+) -> CompiledMapping:
+    """
+    Compiles the mapping for a model, the compiled mapping is cached so that it is only compiled once for a load
+
+    Parameters
+    ----------
+    model_object_name : str
+        The name of the model object in lusid.models e.g. TransactionRequest
+    mapping_required : dict
+        The required mapping between the model attributes and the DataFrame columns
+    mapping_optional : dict
+        The optional mapping between the model attributes and the DataFrame columns
+
+    Returns
+    -------
+    CompiledMapping
+        The compiled mapping
+    """
+
+    if getattr(lusid.models, model_object_name, None) is None:
+        raise TypeError("The provided model_object is not a lusid.model object")
+
+    mapping = dict(mapping_required)
+    cocoon.utilities.update_dict(mapping, mapping_optional)
+
+    return _compile_mapping(model_object_name, json.dumps(mapping, sort_keys=True))
+
+
+def _is_missing(value) -> bool:
+    return not isinstance(value, list) and pd.isna(value)
+
+
+def _compile_property_columns(
+    dtypes: pd.Series, column_to_scope: dict, scope: str, domain: str
+) -> list:
+    """
+    Gets the property key and LUSID data type for each property column, see cocoon.properties.create_property_values
+
+    Parameters
+    ----------
+    dtypes : pd.Series
+        The data types of each column to create property values for
+    column_to_scope : dict {str, str}
+        The scope for a column name
+    scope : str
+        The default scope of the properties
+    domain : str
+        The domain of the properties
+
+    Returns
+    -------
+    list[tuple]
+        The column name, property key and whether the property is a number for each column
+    """
+
+    actual_data_types = set([str(data_type) for data_type in dtypes])
+    allowed_data_types = set(global_constants["data_type_mapping"])
+
+    # Ensure that all data types in the file have been mapped
+    if not (actual_data_types <= allowed_data_types):
+        unmapped_data_types = actual_data_types - allowed_data_types
+        unmapped_columns = dtypes[dtypes.isin(unmapped_data_types)]
+        raise TypeError(
+            invalid_columns_error_message(unmapped_columns, allowed_data_types)
+        )
+
+    return [
+        (
+            column_name,
+            f"{domain}/{column_to_scope.get(column_name, scope)}/{cocoon.utilities.make_code_lusid_friendly(column_name)}",
+            global_constants["data_type_mapping"][str(data_type)] == "number",
+        )
+        for column_name, data_type in dtypes.items()
+    ]
+
+
+def _property_values(row: dict, property_columns: list) -> dict:
+    properties = {}
+
+    for column_name, property_key, is_number in property_columns:
+        value = row[column_name]
+        if pd.isna(value):
+            continue
+        properties[property_key] = {
+            "key": property_key,
+            "value": {"metricValue": {"value": value}}
+            if is_number
+            else {"labelValue": value},
+        }
+
+    return properties
+
+
+def convert_batch_to_payloads(
+    data_frame: pd.DataFrame,
+    mapping_required: dict,
+    mapping_optional: dict,
+    property_columns: list,
+    properties_scope: str,
+    instrument_identifier_mapping: dict,
+    file_type: str,
+    domain_lookup: dict,
+    sub_holding_keys: list,
+    sub_holding_keys_scope: str,
+    **kwargs,
+) -> list:
+    """
+    Builds the JSON-ready payloads for a batch directly from a DataFrame. This is the raw payload equivalent of
+    cocoon.cocoon._convert_batch_to_models, the payloads are what the SDK would send for the models it populates.
+
+    Parameters
+    ----------
+    data_frame : pd.DataFrame
+        The DataFrame containing the data to load
+    mapping_required : dict
+        The required mapping
+    mapping_optional : dict
+        The optional mapping
+    property_columns : list
+        The property columns to add as property values
+    properties_scope : str
+        The scope to add the property values in
+    instrument_identifier_mapping : dict
+        The mapping for the identifiers
+    file_type : str
+        The file type to load, one of RAW_PAYLOAD_FILE_TYPES
+    domain_lookup : dict
+        The domain lookup
+    sub_holding_keys : list
+        The sub holding keys to use
+    sub_holding_keys_scope : str
+        The scope to use for the sub holding keys
+    kwargs
+        full_key_format - Whether the full key format i.e. 'Instrument/default/Figi' is required for the identifiers
+
+    Returns
+    -------
+    list[dict]
+        The payloads for the requests keyed by the JSON names of the attributes
+    """
+
+    if file_type not in RAW_PAYLOAD_FILE_TYPES:
+        raise ValueError(
+            f"Raw payloads are only supported for the file types {RAW_PAYLOAD_FILE_TYPES}, not {file_type}"
+        )
+
+    model_object_name = domain_lookup[file_type]["top_level_model"]
+    model_object = getattr(lusid.models, model_object_name)
+    compiled_mapping = compile_mapping(
+        model_object_name, mapping_required, mapping_optional
+    )
+
+    # Compile the properties, sub-holding-keys and identifiers once for the batch
+    source_columns = [
+        column.get("target", column.get("source")) for column in property_columns
+    ]
+    if (
+        domain_lookup[file_type]["domain"] is None
+        or "properties" not in model_object.openapi_types
+    ):
+        property_specs = None
+    else:
+        property_specs = _compile_property_columns(
+            dtypes=data_frame.loc[:, source_columns].dtypes,
+            column_to_scope={
+                column.get("target", column.get("source")): column.get(
+                    "scope", properties_scope
+                )
+                for column in property_columns
+            },
+            scope=properties_scope,
+            domain=domain_lookup[file_type]["domain"],
+        )
+
+    sub_holding_key_specs = None
+    sub_holding_keys_row = None
+    if "sub_holding_keys" in model_object.openapi_types:
+        if "dict" in model_object.openapi_types["sub_holding_keys"]:
+            sub_holding_key_specs = _compile_property_columns(
+                dtypes=data_frame.loc[:, sub_holding_keys].dtypes,
+                column_to_scope={},
+                scope=sub_holding_keys_scope,
+                domain="Transaction",
+            )
+        elif len(sub_holding_keys) > 0:
+            sub_holding_keys_row = cocoon.properties._infer_full_property_keys(
+                partial_keys=sub_holding_keys,
+                properties_scope=sub_holding_keys_scope,
+                domain="Transaction",
+            )
+
+    identifier_specs = None
+    if (
+        instrument_identifier_mapping
+        and "instrument_identifiers" in model_object.openapi_types
+    ):
+        identifier_specs = [
+            (
+                cocoon.instruments.prepare_key(
+                    identifier_lusid, kwargs["full_key_format"]
+                ),
+                identifier_column,
+            )
+            for identifier_lusid, identifier_column in instrument_identifier_mapping.items()
+        ]
+
+    payloads = []
+    for index, row in zip(data_frame.index, data_frame.to_dict("records")):
+        payload = compiled_mapping.build(row)
+
+        if payload is None:
+            raise ValueError(
+                f"The row at index {str(index)} has no value for at least one of the required attributes of "
+                f"{model_object_name}"
+            )
+
+        if identifier_specs is not None:
+            identifiers = {
+                key: row[column]
+                for key, column in identifier_specs
+                if not pd.isna(row[column])
+            }
+            if len(identifiers) == 0:
+                raise ValueError(
+                    f"""The row at index {str(index)} has no value for every single one of the provided
+        identifiers. Please ensure that each row has at least one identifier and try again"""
+                )
+            payload["instrumentIdentifiers"] = identifiers
+
+        if property_specs is not None:
+            payload["properties"] = _property_values(row, property_specs)
+
+        if sub_holding_key_specs is not None:
+            payload["subHoldingKeys"] = _property_values(row, sub_holding_key_specs)
+        elif sub_holding_keys_row is not None:
+            payload["subHoldingKeys"] = sub_holding_keys_row
+
+        payloads.append(payload)
+
+    return payloads
+
+
+def dumps(payload) -> bytes:
+    """
+    Serialises a payload to JSON, with orjson if it is installed as it is much faster than the json module
+
+    Parameters
+    ----------
+    payload
+        The JSON-ready payload
+
+    Returns
+    -------
+    bytes
+        The payload serialised to JSON
+    """
+
+    if orjson is not None:
+        return orjson.dumps(payload, default=str, option=orjson.OPT_SERIALIZE_NUMPY)
+
+    return json.dumps(payload, default=str, separators=(",", ":")).encode("utf-8")
+
+
+class EncodedRESTClient(RESTClientObject):
+    """
+    A REST client which sends a request body which has already been encoded to JSON by dumps as it is. The SDK's
+    REST client encodes every JSON body with the json module, so it is used for any other body
+    """
+
+    def request(
+        self,
+        method,
+        url,
+        query_params=None,
+        headers=None,
+        body=None,
+        post_params=None,
+        _preload_content=True,
+        _request_timeout=None,
+    ):
+        if not isinstance(body, bytes):
+            return super().request(
+                method,
+                url,
+                query_params=query_params,
+                headers=headers,
+                body=body,
+                post_params=post_params,
+                _preload_content=_preload_content,
+                _request_timeout=_request_timeout,
+            )
+
+        headers = headers or {}
+        if "Content-Type" not in headers:
+            headers["Content-Type"] = "application/json"
+
+        if query_params:
+            url += "?" + urlencode(query_params)
+
+        timeout = None
+        if isinstance(_request_timeout, int):
+            timeout = urllib3.Timeout(total=_request_timeout)
+        elif isinstance(_request_timeout, tuple) and len(_request_timeout) == 2:
+            timeout = urllib3.Timeout(
+                connect=_request_timeout[0], read=_request_timeout[1]
+            )
+
+        try:
+            response = self.pool_manager.request(
+                method.upper(),
+                url,
+                body=body,
+                preload_content=_preload_content,
+                timeout=timeout,
+                headers=headers,
+            )
+        except urllib3.exceptions.SSLError as e:
+            raise ApiException(status=0, reason=f"{type(e).__name__}\n{str(e)}")
+
+        if _preload_content:
+            response = RESTResponse(response)
+
+        if not 200 <= response.status <= 299:
+            raise ApiException(http_resp=response)
+
+        return response
+
+
+def encode_body(api, payload) -> bytes:
+    """
+    Encodes a raw payload with dumps to send as the body of a call made with an api, making sure that the api's
+    client sends it as it is rather than encoding it again
+
+    Parameters
+    ----------
+    api : lusid.api
+        The api the call will be made with
+    payload
+        The JSON-ready payload for the body of the call
+
+    Returns
+    -------
+    bytes
+        The payload serialised to JSON
+    """
+
+    api_client = api.api_client
+    with _rest_client_lock:
+        if not isinstance(api_client.rest_client, EncodedRESTClient):
+            api_client.rest_client = EncodedRESTClient(api_client.configuration)
+
+    return dumps(payload)
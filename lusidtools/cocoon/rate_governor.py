@@ -0,0 +1,379 @@
+import email.utils
+import logging
+import threading
+import time
+
+import lusid
+
+# The prefixes of the names of the endpoints which write to LUSID
+WRITE_PREFIXES = (
+    "upsert_",
+    "batch_upsert_",
+    "set_",
+    "adjust_",
+    "create_",
+    "add_",
+    "patch_",
+    "update_",
+    "delete_",
+    "cancel_",
+)
+
+
+def endpoint_family(endpoint: str) -> str:
+    """
+    Classifies an endpoint into the family its limits are taken from
+
+    Parameters
+    ----------
+    endpoint : str
+        The name of the endpoint e.g. upsert_instruments
+
+    Returns
+    -------
+    str
+        "search" for the search endpoints, "write" for those which write to LUSID and "read" for everything else
+    """
+
+    if "search" in endpoint:
+        return "search"
+    if endpoint.startswith(WRITE_PREFIXES):
+        return "write"
+    return "read"
+
+
+def _retry_after_seconds(error):
+    """
+    Gets the number of seconds to wait from the Retry-After header of an error response
+
+    Parameters
+    ----------
+    error
+        The exception raised by the call, an ApiException
+
+    Returns
+    -------
+    float or None
+        The number of seconds to wait, None if there is no valid Retry-After header
+    """
+
+    headers = getattr(error, "headers", None) or {}
+    retry_after = headers.get("Retry-After", None)
+
+    if retry_after is None:
+        return None
+
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        pass
+
+    # Otherwise Retry-After is an HTTP date
+    try:
+        return max(
+            email.utils.parsedate_to_datetime(retry_after).timestamp() - time.time(),
+            0.0,
+        )
+    except (TypeError, ValueError):
+        return None
+
+
+class _Family:
+    """
+    The token bucket and concurrency limit for a family of endpoints
+    """
+
+    def __init__(
+        self, rate: float = None, burst: int = None, max_concurrency: int = None
+    ):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate or 1, 1)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.semaphore = (
+            threading.BoundedSemaphore(max_concurrency)
+            if max_concurrency is not None
+            else None
+        )
+
+
+class RateGovernor:
+    """
+    Governs the rate and concurrency of the calls made to LUSID by everything in the process which goes through it.
+
+    Each family of endpoints (see endpoint_family) can be limited to a rate of calls per second with a token bucket and
+    to a number of concurrent calls. When a call is throttled (429) or LUSID is unavailable (503) every call through
+    the governor waits for the time in the Retry-After header before being made, and the throttled call is retried.
+    """
+
+    retry_statuses = (429, 503)
+
+    def __init__(
+        self,
+        limits: dict = None,
+        families: dict = None,
+        max_retries: int = 3,
+        backoff_seconds: float = 1,
+        max_retry_after: float = 60,
+    ):
+        """
+        Parameters
+        ----------
+        limits : dict
+            The limits for each family keyed by the family name, each a dict with any of "rate" (calls per second),
+            "burst" (the number of calls which can be made at once before the rate applies) and "max_concurrency",
+            families without limits are unlimited e.g. {"write": {"rate": 10, "max_concurrency": 4}}
+        families : dict
+            The family for specific endpoints keyed by the endpoint name, overriding endpoint_family
+        max_retries : int
+            The number of times a throttled call is retried before its error is raised
+        backoff_seconds : float
+            The time to wait before the first retry when there is no Retry-After header, doubled for each retry
+        max_retry_after : float
+            The longest time in seconds to honour a Retry-After header for
+        """
+
+        self.limits = limits or {}
+        self.families = families or {}
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_retry_after = max_retry_after
+
+        self._lock = threading.Lock()
+        self._families = {}
+        self._paused_until = 0.0
+
+    def _family(self, endpoint: str) -> _Family:
+        name = self.families.get(endpoint, endpoint_family(endpoint))
+        with self._lock:
+            if name not in self._families:
+                self._families[name] = _Family(**self.limits.get(name, {}))
+            return self._families[name]
+
+    def acquire(self, endpoint: str) -> None:
+        """
+        Waits until a call can be made to an endpoint, the caller must call release once the call is complete
+
+        Parameters
+        ----------
+        endpoint : str
+            The name of the endpoint to call
+        """
+
+        family = self._family(endpoint)
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._paused_until - now
+
+                if wait <= 0 and family.rate is not None:
+                    family.tokens = min(
+                        family.burst,
+                        family.tokens + (now - family.updated) * family.rate,
+                    )
+                    family.updated = now
+                    if family.tokens >= 1:
+                        family.tokens -= 1
+                    else:
+                        wait = (1 - family.tokens) / family.rate
+
+            if wait <= 0:
+                break
+            time.sleep(wait)
+
+        if family.semaphore is not None:
+            family.semaphore.acquire()
+
+    def release(self, endpoint: str) -> None:
+        """
+        Signals that a call to an endpoint is complete
+
+        Parameters
+        ----------
+        endpoint : str
+            The name of the endpoint called
+        """
+
+        family = self._family(endpoint)
+        if family.semaphore is not None:
+            family.semaphore.release()
+
+    def retry_after(self, seconds: float) -> None:
+        """
+        Pauses every call through the governor
+
+        Parameters
+        ----------
+        seconds : float
+            The time to pause for
+        """
+
+        seconds = min(seconds, self.max_retry_after)
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+        logging.warning(f"LUSID is throttling requests, pausing for {seconds} seconds")
+
+    def call(self, endpoint: str, function, on_retry=None):
+        """
+        Makes a call to an endpoint through the governor, retrying it if it is throttled
+
+        Parameters
+        ----------
+        endpoint : str
+            The name of the endpoint
+        function : callable
+            A function without arguments which makes the call
+        on_retry : callable
+            A function called with the error each time the call is retried
+
+        Returns
+        -------
+        The return value of the function
+        """
+
+        for attempt in range(self.max_retries + 1):
+            self.acquire(endpoint)
+            try:
+                return function()
+            except Exception as e:
+                if (
+                    getattr(e, "status", None) not in self.retry_statuses
+                    or attempt == self.max_retries
+                ):
+                    raise
+
+                retry_after = _retry_after_seconds(e)
+                self.retry_after(
+                    retry_after
+                    if retry_after is not None
+                    else self.backoff_seconds * 2 ** attempt
+                )
+
+                if on_retry is not None:
+                    on_retry(e)
+            finally:
+                self.release(endpoint)
+
+
+_rate_governor = RateGovernor()
+
+
+def get_rate_governor() -> RateGovernor:
+    """
+    Gets the rate governor shared by the process
+
+    Returns
+    -------
+    RateGovernor
+        The shared rate governor, by default it has no limits but honours Retry-After
+    """
+
+    return _rate_governor
+
+
+def set_rate_governor(rate_governor: RateGovernor) -> None:
+    """
+    Sets the rate governor shared by the process
+
+    Parameters
+    ----------
+    rate_governor : RateGovernor
+        The rate governor to share
+    """
+
+    global _rate_governor
+    _rate_governor = rate_governor
+
+
+class _GovernedApi:
+    """
+    Wraps a LUSID api so that each of its endpoints is called through a rate governor. The governor owns the retries,
+    so for apis built by ApiClientFactory.build the methods are called without their @lusidretry decorator
+    """
+
+    def __init__(self, api, rate_governor: RateGovernor, on_retry=None):
+        self._api = api
+        self._rate_governor = rate_governor
+        self._on_retry = on_retry
+
+    def _call(self, name, attribute, args, kwargs):
+        # Not decorated by ApiClientFactory.build e.g. a mock
+        if not hasattr(attribute, "__wrapped__"):
+            return attribute(*args, **kwargs)
+
+        # The methods call their _with_http_info method through the decorator, so call the undecorated
+        # _with_http_info method directly and pass the http info to the call_info callback as the decorator does
+        callback = kwargs.pop("call_info", None)
+        http_info_name = (
+            name if name.endswith("_with_http_info") else f"{name}_with_http_info"
+        )
+        http_info = getattr(self._api, http_info_name).__wrapped__
+
+        if callback is None:
+            if http_info_name != name:
+                kwargs["_return_http_data_only"] = True
+            return http_info(*args, **kwargs)
+
+        result = http_info(*args, **kwargs)
+        callback(result[2])
+        return result[0]
+
+    def __getattr__(self, name):
+        attribute = getattr(self._api, name)
+
+        if not callable(attribute):
+            return attribute
+
+        def governed(*args, **kwargs):
+            return self._rate_governor.call(
+                name,
+                lambda: self._call(name, attribute, args, dict(kwargs)),
+                on_retry=self._on_retry,
+            )
+
+        return governed
+
+
+class GovernedApiFactory(lusid.utilities.ApiClientFactory):
+    """
+    Wraps an api factory so that every call made with the apis it builds goes through a rate governor, counting the
+    number of retries made
+    """
+
+    def __init__(
+        self,
+        api_factory: lusid.utilities.ApiClientFactory,
+        rate_governor: RateGovernor = None,
+    ):
+        """
+        Parameters
+        ----------
+        api_factory : lusid.utilities.ApiClientFactory
+            The api factory to wrap
+        rate_governor : RateGovernor
+            The rate governor to use, defaults to the one shared by the process
+        """
+
+        self._api_factory = api_factory
+        self._rate_governor = (
+            rate_governor if rate_governor is not None else get_rate_governor()
+        )
+        self._retries_lock = threading.Lock()
+        self.retries = 0
+
+    def _count_retry(self, error) -> None:
+        with self._retries_lock:
+            self.retries += 1
+
+    def build(self, api):
+        return _GovernedApi(
+            self._api_factory.build(api), self._rate_governor, self._count_retry
+        )
+
+    def __getattr__(self, name):
+        # Guard against recursion before the wrapped api factory has been set
+        if name == "_api_factory":
+            raise AttributeError(name)
+        return getattr(self._api_factory, name)
@@ -0,0 +1,99 @@
+import csv
+import random
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Statistics of the calls made to LUSID by lse.Caller. Each call can be written
+# to a CSV file as it is made, and aggregates are kept for each endpoint with a
+# bounded sample of the timings for the percentiles, so the memory used does
+# not grow with the number of calls
+
+PERCENTILES = [50, 95, 99]
+
+
+class Endpoint:
+    def __init__(self, sample_size, rng):
+        self.sample_size = sample_size
+        self.rng = rng
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.durations = []
+        self.elapsed = []
+
+    def add(self, stats):
+        self.count += 1
+        if not 200 <= (stats.status or 0) < 300:
+            self.errors += 1
+        self.retries += stats.retries or 0
+
+        # Keep a uniform sample of the timings (reservoir sampling)
+        if self.count <= self.sample_size:
+            self.durations.append(stats.duration)
+            self.elapsed.append(stats.elapsed)
+        else:
+            i = self.rng.randrange(self.count)
+            if i < self.sample_size:
+                self.durations[i] = stats.duration
+                self.elapsed[i] = stats.elapsed
+
+
+class CallStats:
+    def __init__(self, filename=None, columns=None, sample_size=1000):
+        self.columns = columns
+        self.sample_size = sample_size
+        self.endpoints = {}
+        self.rng = random.Random(0)
+        self.lock = threading.Lock()
+        self.file = None
+        self.writer = None
+
+        if filename is not None:
+            self.file = open(filename, "w", newline="")
+            self.writer = csv.writer(self.file)
+
+    # Add the statistics of a call, a Rec as created by lse.Caller
+    def append(self, stats):
+        with self.lock:
+            endpoint = self.endpoints.get(stats.name)
+            if endpoint is None:
+                endpoint = Endpoint(self.sample_size, self.rng)
+                self.endpoints[stats.name] = endpoint
+            endpoint.add(stats)
+
+            if self.writer is not None:
+                row = stats.to_dict()
+                if self.columns is None:
+                    self.columns = list(row.keys())
+                if self.file.tell() == 0:
+                    self.writer.writerow(self.columns)
+                self.writer.writerow([row.get(c) for c in self.columns])
+
+    def __len__(self):
+        return sum(e.count for e in self.endpoints.values())
+
+    # The aggregates for each endpoint, with the percentiles of the client side
+    # duration and the duration reported by LUSID in seconds
+    def summary(self):
+        rows = []
+        with self.lock:
+            for name, e in sorted(self.endpoints.items()):
+                row = [name, e.count, e.errors, e.retries]
+                row.extend(np.percentile(e.durations, PERCENTILES))
+                row.extend(np.percentile(e.elapsed, PERCENTILES))
+                rows.append(row)
+
+        return pd.DataFrame(
+            rows,
+            columns=["name", "count", "errors", "retries"]
+            + [f"{t}_p{p}" for t in ["duration", "elapsed"] for p in PERCENTILES],
+        )
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+                self.writer = None
@@ -1,191 +1,202 @@
 import pandas as pd
-import numpy as np
-import dateutil
-import sys
-import argparse
+from lusidtools.lpt import lpt
+from lusidtools.lpt import lse
+from lusidtools.lpt import stdargs
+from lusidtools.lpt.either import Either
 
+SCOPE = "scope"
+PORTFOLIO = "portfolio"
 SDATE = "settlement_date"
-CCY = "security_uid"
+CCY = "instrument_uid"
 QTY = "units"
 TYPE = "holding_type"
-CUM = "cum"
+COMMITMENT = "commitment"
 ORDER = "sort"
-JOIN = "join"
 
 TOOLTIP = "Demo Cash-Ladder report"
 
+# The order and description of each type of cash holding in the ladder
+CASH_TYPES = {
+    "C": (2, "Trades to settle"),
+    "A": (3, "Dividends"),
+    "R": (4, "Receivables"),
+    "F": (5, "Forward Fx"),
+}
+
+
+# Get the cash holdings (everything but positions) of a portfolio on a date
+def get_cash_holdings(api, scope, portfolio, date):
+    def success(result):
+        df = lpt.to_df(
+            result,
+            [
+                "instrument_uid",
+                "holding_type",
+                "units",
+                "transaction.type",
+                "transaction.settlement_date",
+            ],
+        )
+        df.columns = [CCY, TYPE, QTY, COMMITMENT, SDATE]
+        return df[df[TYPE] != "P"]
+
+    return api.call.get_holdings(
+        scope=scope, code=portfolio, effective_at=lpt.to_date(date)
+    ).bind(success)
+
+
+# Get the cash holdings of many portfolios on a date, up to parallel at a time.
+# Holdings without a settlement date are settled on the date
+def get_all_cash_holdings(api, portfolios, date, parallel=1):
+    results = lpt.ordered_map(
+        lambda p: get_cash_holdings(api, p[0], p[1], date), portfolios, parallel
+    )
 
-def cash_ladder(api, scope, portfolio, date):
+    dfs = []
+    for (scope, portfolio), result in zip(portfolios, results):
+        if result.is_left():
+            results.close()
+            return result
+        dfs.append(result.right.assign(**{SCOPE: scope, PORTFOLIO: portfolio}))
 
-    qry_date = pd.to_datetime(date, utc=True)
+    df = pd.concat(dfs, ignore_index=True, sort=False)
+    df[SDATE] = pd.to_datetime(df[SDATE].fillna(date), utc=True).dt.date
+    return Either.Right(df)
 
-    # Function to make sure there are cash positions
-    def check_contents(df):
-        if len(df) == 0:
-            print(
-                "Portfolio {} in scope {} contains no cash on {:%Y-%m-%d}".format(
-                    portfolio, scope, start_date
-                )
-            )
-            exit()
+
+# Create the cash ladders of many portfolios from the date for a number of days,
+# or up to the last settlement date if days is 0. For each currency of each
+# portfolio there is an opening balance, the cash settling by type and a closing
+# summary on each day of the ladder
+def cash_ladders(api, portfolios, date, days=0, parallel=1):
+    qry_date = pd.to_datetime(date, utc=True)
 
     # Run one-day earlier, this gives us the beginning of day for the
     # required qry_date
     start_date = qry_date + pd.DateOffset(days=-1)
-    df = api.qry_holdings(scope, portfolio, start_date)
-    check_contents(df)
-
-    # To convert holdings data frame into cash ladder
-    # we need to filter out Position types
-    df = df[df[TYPE] != "P"].copy()
-    check_contents(df)
-
-    # Set date for current balances
-    df[SDATE] = pd.to_datetime(df[SDATE].fillna(start_date), utc=True).dt.date
-
-    # Consolidate
-    df = df[[CCY, SDATE, TYPE, QTY]].groupby([CCY, SDATE, TYPE], as_index=False).sum()
-
-    # Populate BOD/EOD records
-
-    start_date = start_date.date()  # change form for working with frame data
-    # Get unique list of dates, but make sure it includes the qry_date
-    dates = pd.concat(
-        [df[[SDATE]], pd.DataFrame({SDATE: [qry_date.date()]})], ignore_index=True
-    ).drop_duplicates()
-    dates = dates[dates[SDATE] > start_date]
-    ccys = df[[CCY]].drop_duplicates()
-
-    ccys[JOIN] = 1
-    dates[JOIN] = 1
-    dates[QTY] = 0
-    dates[ORDER] = 1
-    dates[TYPE] = "Opening Cash Balance"
-    bod = ccys.merge(dates, on=JOIN)
-    eod = bod.copy()
-    eod[ORDER] = 6
-    eod[TYPE] = eod[CCY].str.slice(4) + " Summary"
-
-    df[ORDER] = df[TYPE].map({"C": 2, "A": 3, "R": 4, "F": 5})
-    df[TYPE] = df[TYPE].map(
-        {
-            "C": "Trades to settle",
-            "R": "Receivables",
-            "A": "Dividends",
-            "F": "Forward Fx",
-        }
-    )
-
-    df = (
-        pd.concat([bod, eod, df], ignore_index=True)
-        .sort_values([CCY, SDATE, ORDER])
-        .reset_index(drop=True)
-    )
-
-    # Calculate cumulative quantity
-    df[CUM] = df[[CCY, QTY]].groupby([CCY], as_index=False).cumsum()[QTY]
-
-    # Put cumulative balance onto BOD/EOD records
-    subset = df[df[ORDER].isin([1, 6])]
-    df.loc[subset.index, QTY] = subset[CUM]
-
-    # Filter out T-1 balances (just used to provide BOD balance)
-
-    df = df[df[SDATE] > start_date]
+    keys = [SCOPE, PORTFOLIO, CCY]
 
-    # Pivot the data
-    data = df.set_index([CCY, ORDER, TYPE, SDATE], drop=True).unstack(fill_value=0)
+    def ladder(df):
+        if len(df) == 0:
+            return pd.DataFrame(
+                index=pd.MultiIndex.from_tuples([], names=keys + [ORDER, TYPE])
+            )
 
-    return data[QTY]
+        first = qry_date.date()
+        if days > 0:
+            dates = list(pd.date_range(first, periods=days).date)
+        else:
+            dates = sorted(set(df[SDATE][df[SDATE] > first]) | {first})
+
+        # Consolidate
+        flows = df.groupby(keys + [SDATE, TYPE], as_index=False)[QTY].sum()
+        opening = flows[flows[SDATE] < first].groupby(keys)[QTY].sum()
+        flows = flows[(flows[SDATE] >= first) & (flows[SDATE] <= dates[-1])]
+
+        # The net cash settling for every currency on every day
+        grid = (
+            df[keys].drop_duplicates().merge(pd.DataFrame({SDATE: dates}), how="cross")
+        )
+        grid[QTY] = (
+            flows.groupby(keys + [SDATE])[QTY]
+            .sum()
+            .reindex(pd.MultiIndex.from_frame(grid[keys + [SDATE]]), fill_value=0)
+            .values
+        )
+
+        # The cumulative balances at the end of each day
+        eod = (
+            grid.groupby(keys)[QTY].cumsum()
+            + opening.reindex(pd.MultiIndex.from_frame(grid[keys]), fill_value=0).values
+        )
+
+        rows = grid[keys + [SDATE]]
+        types = flows[TYPE].map(lambda t: CASH_TYPES.get(t, (5, t)))
+        df = pd.concat(
+            [
+                rows.assign(
+                    **{ORDER: 1, TYPE: "Opening Cash Balance", QTY: eod - grid[QTY]}
+                ),
+                flows.assign(**{ORDER: types.str[0], TYPE: types.str[1]}),
+                rows.assign(
+                    **{ORDER: 6, TYPE: grid[CCY].str.slice(4) + " Summary", QTY: eod}
+                ),
+            ],
+            ignore_index=True,
+        )
+
+        # Pivot the data
+        return df.set_index(keys + [ORDER, TYPE, SDATE])[QTY].unstack(fill_value=0)
+
+    return get_all_cash_holdings(api, portfolios, start_date, parallel).bind(ladder)
+
+
+# The cash ladder of a single portfolio
+def cash_ladder(api, scope, portfolio, date, days=0):
+    return cash_ladders(api, [(scope, portfolio)], date, days).bind(
+        lambda df: df.droplevel([SCOPE, PORTFOLIO])
+    )
 
 
-def alt_cash_ladder(api, scope, portfolio, date):
+# The cash holdings of many portfolios with the running balance of each currency
+def alt_cash_ladders(api, portfolios, date, parallel=1):
     qry_date = pd.to_datetime(date, utc=True)
-    # Run one-day earlier, this gives us the beginning of day for the
-    # required qry_date
-    start_date = qry_date + pd.DateOffset(days=-1)
-    df = api.qry_holdings(scope, portfolio, start_date)
-
-    # filter out Position types
-    df = df[df["holding_type"] != "P"]
-
-    df["settlement_date"] = pd.to_datetime(
-        df["settlement_date"].fillna(qry_date), utc=True
-    ).dt.date
-    df = df.sort_values(["security_uid", "settlement_date"])
-    df["balance"] = (
-        df[["security_uid", "units"]]
-        .groupby(["security_uid"], as_index=False)
-        .cumsum()["units"]
-    )
 
-    columns = [
-        "security_uid",
-        "settlement_date",
-        "commitment",
-        "holding_type",
-        "commitment_security_uid",
-        "units",
-        "balance",
-    ]
-
-    df = df[columns].rename(
-        columns={
-            "security_uid": "Currency",
-            "settlement_date": "Cash Date",
-            "commitment": "Transaction Type",
-            "holding_type": "Cash Type",
-            "units": "Local Cash Amount",
-        }
+    def balances(df):
+        df = df.sort_values(
+            [SCOPE, PORTFOLIO, CCY, SDATE], kind="stable", ignore_index=True
+        )
+        df["balance"] = df.groupby([SCOPE, PORTFOLIO, CCY])[QTY].cumsum()
+
+        return df[
+            [SCOPE, PORTFOLIO, CCY, SDATE, COMMITMENT, TYPE, QTY, "balance"]
+        ].rename(
+            columns={
+                CCY: "Currency",
+                SDATE: "Cash Date",
+                COMMITMENT: "Transaction Type",
+                TYPE: "Cash Type",
+                QTY: "Local Cash Amount",
+            }
+        )
+
+    return get_all_cash_holdings(api, portfolios, qry_date, parallel).bind(balances)
+
+
+def parse(extend=None, args=None):
+    return (
+        stdargs.Parser(
+            "Cash Ladder",
+            ["scope", "portfolio", "portfolios", "date", "filename", "parallel"],
+        )
+        .add("--days", type=int, default=0, help="number of days in the ladder")
+        .add("-a", "--alternative", action="store_true", help="alternative view")
+        .extend(extend)
+        .parse(args)
     )
-    return df
 
 
-def parse(extend=None):
-    parser = argparse.ArgumentParser(description="Get Transactions")
-    parser.add_argument("scope", help="Scope")
-    parser.add_argument("portfolio", help="Portfolio id")
-    parser.add_argument("date", metavar="YYYY-MM-DD", help="date")
-    parser.add_argument(
-        "-f", "--filename", metavar="filename.csv", help="write to this file"
-    )
-    parser.add_argument(
-        "-a", "--alternative", action="store_true", help="alternative view"
-    )
-    parser.add_argument(
-        "--secrets-file",
-        dest="secrets",
-        default="secrets.json",
-        help="path to secrets file",
+def process_args(api, args):
+    selected = lpt.selected_portfolios(api, args) or Either.Right(
+        [(args.scope, args.portfolio)]
     )
-    if extend:
-        extend(parser)
-    return parser.parse_args()
 
+    def display(df):
+        if len(df) == 0:
+            return "No cash holdings"
+        return df.rename(columns=str).rename_axis(columns=None).reset_index()
 
-def process_args(args):
-    api = lse.api(args.secrets)
-    if args.alternative:
-        df = alt_cash_ladder(api, args.scope, args.portfolio, args.date)
-    else:
-        df = cash_ladder(api, args.scope, args.portfolio, args.date)
-
-    if args.filename:
-        df.to_csv(args.filename)
-    else:
-        pd.set_option("display.width", None)
-        pd.options.display.float_format = "{:,.2f}".format
-        pd.set_option("display.max_rows", 1000)
-        print(df)
-
+    def report(portfolios):
+        if args.alternative:
+            return alt_cash_ladders(api, portfolios, args.date, args.parallel)
 
-def main():
-    process_args(parse())
+        return cash_ladders(api, portfolios, args.date, args.days, args.parallel).bind(
+            display
+        )
 
+    return selected.bind(report)
 
-if __name__ == "__main__":
-    import lse
 
-    main()
-else:
-    from . import lse
+# Standalone tool
+def main(parse=parse, display_df=lpt.display_df):
+    return lpt.standard_flow(parse, lse.connect, process_args, display_df)
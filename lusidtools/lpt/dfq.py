@@ -2,6 +2,7 @@ import argparse
 import re
 import pandas as pd
 import numpy as np
+from lusidtools.lpt import formats
 
 
 def parse(with_inputs=True, args=None):
@@ -9,7 +10,9 @@ def parse(with_inputs=True, args=None):
         description="DataFrame Query Tool", fromfile_prefix_chars="@"
     )
     if with_inputs:
-        parser.add_argument("input", nargs="+", help="source csv file")
+        parser.add_argument(
+            "input", nargs="+", help="source csv, excel, parquet or feather file"
+        )
     parser.add_argument("-c", "--columns", action="store_true", help="display columns")
     parser.add_argument(
         "-s", "--select", nargs="*", metavar="column", help="fields to select"
@@ -104,9 +107,7 @@ def apply_args(args, given_df):
         reader_args["encoding"] = "latin-1"
 
     def load_frame(path):
-        if path.endswith(".pk"):
-            return pd.read_pickle(path)
-        elif ".xls" in path.lower():
+        if ".xls" in path.lower():
             s = path.split(":")
             if len(s) == 2:
                 return pd.read_excel(
@@ -114,7 +115,7 @@ def apply_args(args, given_df):
                 )
             return pd.read_excel(path, engine="openpyxl", **reader_args)
         else:
-            return pd.read_csv(path, **reader_args)
+            return formats.read_frame(path, **reader_args)
 
     if given_df is not None:
         dfs = [("Given", given_df)]
@@ -294,10 +295,8 @@ def dfq(args, given_df=None):
                 filename = args.filename
             if filename.lower().endswith(".xlsx"):
                 df.to_excel(filename, index=False, freeze_panes=(1, 0))
-            elif filename.lower().endswith(".pk"):
-                df.to_pickle(filename)
             else:
-                df.to_csv(filename, index=False)
+                formats.write_frame(df, filename)
         else:
             if subset:
                 print("{} {}".format(subset, len(df)))
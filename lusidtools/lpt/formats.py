@@ -0,0 +1,65 @@
+import os
+import pandas as pd
+
+# The formats of the files that DataFrames are written to and read from, chosen
+# by the extension of the file name. Parquet and Feather (Arrow IPC) files keep
+# the types of the columns and need pyarrow. CSV files are compressed when the
+# name ends with a compression extension e.g. .csv.gz or .csv.zst
+
+columnar_formats = {
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather",
+    ".ipc": "feather",
+}
+
+
+# Get the format of a file from its name
+def file_format(path):
+    lower = path.lower()
+    if ".xls" in lower:
+        return "excel"
+    if lower.endswith(".pk"):
+        return "pickle"
+    return columnar_formats.get(os.path.splitext(lower)[1], "csv")
+
+
+# Write a DataFrame to a file in the format of its name
+def write_frame(df, path):
+    fmt = file_format(path)
+    if fmt == "excel":
+        df.to_excel(path, index=False)
+    elif fmt == "pickle":
+        df.to_pickle(path)
+    elif fmt == "parquet":
+        df.to_parquet(path, index=False)
+    elif fmt == "feather":
+        # Feather files cannot store an index
+        df.reset_index(drop=True).to_feather(path)
+    else:
+        # The compression is inferred from the name
+        df.to_csv(path, index=False)
+
+
+# Read a DataFrame from a file which is not an Excel workbook. The kwargs are
+# passed to read_csv, for the columnar formats only usecols, nrows and dtype
+# are used
+def read_frame(path, **kwargs):
+    fmt = file_format(path)
+    if fmt == "pickle":
+        return pd.read_pickle(path)
+    if fmt == "csv":
+        return pd.read_csv(path, **kwargs)
+
+    reader = pd.read_parquet if fmt == "parquet" else pd.read_feather
+    usecols = kwargs.get("usecols")
+    df = reader(path, columns=list(usecols) if usecols is not None else None)
+    if kwargs.get("nrows") is not None:
+        df = df.head(kwargs["nrows"])
+
+    # Convert the types as read_csv would, leaving missing values missing
+    dtype = kwargs.get("dtype")
+    if dtype is not None:
+        df = df.astype(dtype).where(df.notna())
+    return df
@@ -1,12 +1,60 @@
+import argparse
+import itertools
 import re
+import sys
 import pandas as pd
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
 from functools import reduce
 from .record import Rec
 from .either import Either
 from . import back_compat
+from . import formats
 
 type_re = re.compile(r"(.*)\((.*),(.*)\)")
+date_range_re = re.compile(r"^(\d{4}-\d{2}-\d{2}):(\d{4}-\d{2}-\d{2})(?::(\w+))?$")
+list_type_re = re.compile(r"list\[(.*)\]")
+
+
+# Get the value of a property, None if it has no value
+def property_value(p):
+    value = p.value if p is not None else None
+    if value is None:
+        return None
+    if value.label_value is not None:
+        return value.label_value
+    return value.metric_value.value if value.metric_value is not None else None
+
+
+# Index the properties (or sub-holding keys) of an object by key, they are either
+# a dict or a list of properties. The first property with a key is used
+def index_properties(obj, attribute):
+    props = getattr(obj, attribute, None)
+    if type(props) == list:
+        index = {}
+        for p in props:
+            index.setdefault(p.key, p)
+        return index
+    return props if isinstance(props, dict) else None
+
+
+# Compile a column into a function which accesses it on an object
+# traversing dot notation to flatten sub-objects
+def compile_accessor(col):
+    fields = [
+        (True, fld[4:]) if fld.startswith("KEY:") else (False, fld)
+        for fld in col.split(".")
+    ]
+
+    def access(obj):
+        for is_key, fld in fields:
+            if not obj:
+                return None
+            obj = obj.get(fld) if is_key else getattr(obj, fld)
+        return obj
+
+    return access
 
 
 # Convert an iterable dataset to a DataFrame
@@ -14,52 +62,132 @@ def to_df(data, columns):
     if isinstance(data, Rec):
         data = data.content
 
-    # Create record by accessing each column
-    def to_record(obj):
-        return {col: access(obj, col) for col in columns}
-
-    def property_value(p):
-        return p.metric_value.value if p.label_value is None else p.label_value
-
-    # traverse dot notation to flatten sub-objects
-    def access(obj, col):
-        if col.startswith("P:"):
-            try:
-                props = getattr(obj, "properties")
-                if type(props) == list:
-                    return property_value(
-                        [p.value for p in props if p.key == col[2:]][0]
-                    )
-                return property_value(props[col[2:]].value)
-            except:
-                return None
-
-        if col.startswith("SHK:"):
-            try:
-                props = getattr(obj, "sub_holding_keys")
-                return property_value(props[col[4:]].value)
-            except:
-                return None
-
-        for fld in col.split("."):
-            if fld.startswith("KEY:"):
-                obj = obj.get(fld[4:]) if obj else None
-            else:
-                obj = getattr(obj, fld) if obj else None
-        return obj
-
     # Try standard representations
     try:
         iterator = iter(data)
     except:
         iterator = iter(data.values)
 
-    records = [to_record(o) for o in iterator]
+    objects = list(iterator)
 
-    if len(records) == 0:
+    if len(objects) == 0:
         return pd.DataFrame({col: [] for col in columns})[columns]
 
-    return pd.DataFrame.from_records(records)[columns]
+    # Index the properties and sub-holding keys of each object once for all columns
+    indexes = {}
+    for prefix, attribute in [("P:", "properties"), ("SHK:", "sub_holding_keys")]:
+        if any(col.startswith(prefix) for col in columns):
+            indexes[prefix] = [index_properties(o, attribute) for o in objects]
+
+    # Collect the values column by column
+    values = {}
+    for col in columns:
+        if col in values:
+            continue
+        prefix = next((p for p in indexes if col.startswith(p)), None)
+        if prefix is not None:
+            key = col[len(prefix) :]
+            values[col] = [
+                property_value(index.get(key)) if index else None
+                for index in indexes[prefix]
+            ]
+        else:
+            access = compile_accessor(col)
+            values[col] = [access(o) for o in objects]
+
+    return pd.DataFrame(values)[columns]
+
+
+# Get the model type of an attribute, or of the values of a dict/list attribute
+def attribute_model(attribute_type, complex_types):
+    if attribute_type is None:
+        return None
+    dict_type = type_re.findall(attribute_type)
+    if dict_type:
+        attribute_type = dict_type[0][2]
+    list_type = list_type_re.findall(attribute_type)
+    if list_type:
+        attribute_type = list_type[0]
+    return complex_types.get(attribute_type.strip())
+
+
+# Create an accessor for a column of the JSON of a response, using the same notation as to_df.
+# The attribute names are translated to the JSON names using the schema of the record type.
+# Returns the accessor and the type of the column
+def json_accessor(col, record_type, complex_types):
+    def property_value(p):
+        value = (p or {}).get("value") or {}
+        if value.get("labelValue") is not None:
+            return value["labelValue"]
+        return (value.get("metricValue") or {}).get("value")
+
+    def property_accessor(attribute, key):
+        def access(obj):
+            props = obj.get(attribute)
+            if type(props) == list:
+                return property_value(next((p for p in props if p["key"] == key), None))
+            return property_value(props.get(key)) if props else None
+
+        return access
+
+    if col.startswith("P:"):
+        return property_accessor("properties", col[2:]), None
+
+    if col.startswith("SHK:"):
+        return property_accessor("subHoldingKeys", col[4:]), None
+
+    path = []
+    model = record_type
+    attribute_type = None
+    for fld in col.split("."):
+        if fld.startswith("KEY:"):
+            path.append(fld[4:])
+            continue
+        openapi_types = getattr(model, "openapi_types", {})
+        if fld in openapi_types:
+            path.append(model.attribute_map[fld])
+            attribute_type = openapi_types[fld]
+            model = attribute_model(attribute_type, complex_types)
+        else:
+            # Not in the schema, assume the usual camel case JSON name
+            path.append(re.sub(r"_([a-z0-9])", lambda m: m.group(1).upper(), fld))
+            attribute_type = None
+            model = None
+
+    def access(obj):
+        for key in path:
+            obj = obj.get(key) if obj else None
+        return obj
+
+    return access, attribute_type
+
+
+# Convert the JSON of a response read with raw=True directly to columns (a dict of lists)
+# without deserialising it into models
+def json_to_columns(data, columns, record_type, complex_types):
+    if isinstance(data, Rec):
+        data = data.content
+    if isinstance(data, dict):
+        data = data.get("values", [])
+
+    accessors = [json_accessor(col, record_type, complex_types)[0] for col in columns]
+    items = data if isinstance(data, list) else list(data)
+
+    return {col: [access(o) for o in items] for col, access in zip(columns, accessors)}
+
+
+# Convert the JSON of a response read with raw=True to a DataFrame, see to_df
+def json_to_df(data, columns, record_type, complex_types):
+    df = pd.DataFrame(
+        json_to_columns(data, columns, record_type, complex_types), columns=columns
+    )
+
+    # Dates are strings in the JSON, convert them as the SDK would
+    for col in columns:
+        if json_accessor(col, record_type, complex_types)[1] == "datetime":
+            df[col] = to_date(df[col])
+
+    return df
 
 
 # Utilities to convert YYYY-MM-DD strings to and from UTC dates.
@@ -75,6 +203,49 @@ def add_days(date, days):
     return to_date(date) + pd.Timedelta("{} days".format(days))
 
 
+# Expand any date ranges in a list of dates. A range is start:end with an
+# optional pandas frequency e.g. 2020-01-01:2020-12-31:BM, the default is daily
+def expand_dates(dates):
+    expanded = []
+    for date in dates:
+        match = date_range_re.match(date)
+        if match:
+            start, end, freq = match.groups()
+            expanded.extend(
+                from_date(d) for d in pd.date_range(start, end, freq=freq or "D")
+            )
+        else:
+            expanded.append(date)
+    return expanded
+
+
+# Call fn with each of the items on up to parallel threads, generating the
+# results in the order of the items. Calls are only made up to parallel items
+# ahead of the result being consumed, so stopping early does not make the rest
+def ordered_map(fn, items, parallel=1):
+    items = iter(items)
+
+    if parallel <= 1:
+        for item in items:
+            yield fn(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+
+        def submit(count):
+            return [executor.submit(fn, i) for i in itertools.islice(items, count)]
+
+        futures = deque(submit(parallel))
+        try:
+            while len(futures) > 0:
+                result = futures.popleft().result()
+                futures.extend(submit(1))
+                yield result
+        finally:
+            for future in futures:
+                future.cancel()
+
+
 # Display a dataframe with no cropping
 def display_df(df, decimals=2):
     fmt = "{:,." + str(decimals) + "f}"
@@ -91,6 +262,8 @@ def display_df(df, decimals=2):
 
 
 # Create API objects from a dataframe
+# The types, property and complex column builders are resolved once and the
+# objects are built from the column arrays rather than row by row
 def from_df(
     df, record_type, complex_types, related=None, columns=None, date_fields=None
 ):
@@ -120,49 +293,73 @@ def from_df(
         else:
             simple_columns.append(col)
 
-    def build_complex_type(row, col, fields):
-        d = {f: row["{}.{}".format(col, f)] for f in fields}
+    # The values of each column used, as python objects
+    def column_values(col):
+        return df[col].tolist()
+
+    # Build the values of each complex column
+    def build_complex_column(col, fields):
         col_type = complex_types[record_type.openapi_types[col]]
-        return col_type(**d)
+        values = [column_values("{}.{}".format(col, f)) for f in fields]
+        return [col_type(**dict(zip(fields, row))) for row in zip(*values)]
 
-    def build_properties(row):
+    # Build the properties of each object
+    def build_properties():
         ptype_tpl = type_re.findall(record_type.openapi_types["properties"])[0]
 
         ptype = complex_types[ptype_tpl[2].strip()]
+        property_value_type = complex_types["PropertyValue"]
+        metric_value_type = complex_types["MetricValue"]
 
         def prop_builder(property_key, value):
             if isinstance(value, str):
                 return ptype(
-                    key=property_key,
-                    value=complex_types["PropertyValue"](label_value=value),
+                    key=property_key, value=property_value_type(label_value=value),
                 )
             elif pd.isna(value) == False:
                 return ptype(
                     key=property_key,
-                    value=complex_types["PropertyValue"](
-                        metric_value=complex_types["MetricValue"](value)
-                    ),
+                    value=property_value_type(metric_value=metric_value_type(value)),
                 )
             else:
                 return None
 
+        values = [column_values("P:{}".format(col)) for col in properties]
         props = [
-            (col, prop_builder(col, row["P:{}".format(col)])) for col in properties
+            [(col, prop_builder(col, value)) for col, value in zip(properties, row)]
+            for row in zip(*values)
         ]
-        d = dict([p for p in props if p[1] != None])
-        return d
-
-    def to_type(i, row):
-        fields = {col: row[col] for col in simple_columns}
-        fields.update(
-            {
-                col: build_complex_type(row, col, fields)
-                for col, fields in complex_columns.items()
-            }
-        )
+        return [dict([p for p in row if p[1] != None]) for row in props]
+
+    n = len(df)
+    columns_values = {col: column_values(col) for col in simple_columns}
+    columns_values.update(
+        {
+            col: build_complex_column(col, fields)
+            for col, fields in complex_columns.items()
+        }
+    )
+
+    if "properties" in record_type.openapi_types and len(properties) > 0:
+        columns_values["properties"] = build_properties()
+
+    # Quick and dirty instrument_uid handling
+    # This should change to allow the full
+    # instrument resolution logic to apply
+    identifiers = (
+        to_instrument_identifiers_list(columns_values["instrument_uid"])
+        if "instrument_uid" in columns_values
+        else None
+    )
+
+    # The rows are only needed by a callable related
+    rows = (row for (_, row) in df.iterrows()) if callable(related) else [None] * n
+
+    # Remove any 'noise' from the dataframe
+    allowed = set(record_type.openapi_types.keys())
 
-        if "properties" in record_type.openapi_types and len(properties) > 0:
-            fields["properties"] = build_properties(row)
+    def to_type(pos, i, row):
+        fields = {col: values[pos] for col, values in columns_values.items()}
 
         if related != None:
             if callable(related):
@@ -171,22 +368,56 @@ def from_df(
                 # Dict type
                 fields.update(related.get(i, {}))
 
-        # Quick and dirty instrument_uid handling
-        # This should change to allow the full
-        # instrument resolution logic to apply
         if "instrument_uid" in fields.keys():
-            fields["instrument_identifiers"] = to_instrument_identifiers(
-                fields["instrument_uid"]
-            )
-            del fields["instrument_uid"]
+            uid = fields.pop("instrument_uid")
+            # Use the converted column unless related has replaced the value
+            if identifiers is not None and uid is columns_values["instrument_uid"][pos]:
+                fields["instrument_identifiers"] = identifiers[pos]
+            else:
+                fields["instrument_identifiers"] = to_instrument_identifiers(uid)
 
-        # Remove any 'noise' from the dataframe
-        allowed = set(record_type.openapi_types.keys())
         trimmed = dict([tpl for tpl in fields.items() if tpl[0] in allowed])
 
         return record_type(**trimmed)
 
-    return [to_type(i, row) for (i, row) in df.iterrows()]
+    return [to_type(pos, i, row) for pos, (i, row) in enumerate(zip(df.index, rows))]
+
+
+# Prefixes of instrument_uid values and the identifiers they map to
+instrument_uid_prefixes = [
+    ("CCY_", "Instrument/default/Currency"),
+    ("Ccy:", "Instrument/default/Currency"),
+    ("Currency:", "Instrument/default/Currency"),
+    ("ClientInternal:", "Instrument/default/ClientInternal"),
+    ("Figi:", "Instrument/default/Figi"),
+    ("RIC:", "Instrument/default/RIC"),
+]
+
+
+# Convert many instrument_uid values to identifiers with vectorised string operations,
+# see to_instrument_identifiers
+def to_instrument_identifiers_list(uids):
+    if not all(isinstance(uid, str) for uid in uids):
+        return [to_instrument_identifiers(uid) for uid in uids]
+
+    uids = pd.Series(uids, dtype=object)
+    keys = pd.Series("Instrument/default/LusidInstrumentId", index=uids.index)
+    values = uids.copy()
+    remaining = pd.Series(True, index=uids.index)
+
+    for prefix, key in instrument_uid_prefixes:
+        match = remaining & uids.str.startswith(prefix)
+        keys[match] = key
+        values[match] = uids[match].str[len(prefix) :]
+        remaining &= ~match
+
+    # Otherwise an identifier given as Instrument/scope/code:value
+    parts = uids.str.split(":")
+    match = remaining & (parts.str.len() == 2) & uids.str.startswith("Instrument")
+    keys[match] = parts[match].str[0]
+    values[match] = parts[match].str[1]
+
+    return [{k: v} for k, v in zip(keys, values)]
 
 
 def to_instrument_identifiers(uid):
@@ -219,16 +450,6 @@ def chunk(seq, size):
     return (seq[pos : pos + size] for pos in range(0, len(seq), size))
 
 
-# Write statistics out
-def dump_stats(filename, stats, columns):
-    if len(stats) > 0:
-        df = records_to_df(stats)[columns]
-        if filename == "-":
-            display_df(df.drop(["startTime", "endTime"], axis=1))
-        else:
-            df.to_csv(filename, index=False)
-
-
 # Limit the length of DataFrame
 def trim_df(df, limit, **kwargs):
     if kwargs.get("sort", None) != None:
@@ -236,6 +457,115 @@ def trim_df(df, limit, **kwargs):
     return df[:limit] if 0 < limit < len(df) else df
 
 
+# Get the (scope, code) of each of the portfolios selected by the portfolio
+# argument of a tool. It is a comma separated list of codes, * for every
+# portfolio in the scope, group:<code> for the portfolios of a group and its
+# sub-groups or file:<filename> with a code or scope/code per line. None if
+# it is a single portfolio
+def selected_portfolios(api, args):
+    portfolio = args.portfolio or ""
+
+    if portfolio.startswith("file:"):
+        with open(portfolio[5:]) as f:
+            lines = [line.strip() for line in f]
+        return Either.Right(
+            [
+                tuple(line.split("/", 1)) if "/" in line else (args.scope, line)
+                for line in lines
+                if line and not line.startswith("#")
+            ]
+        )
+
+    if portfolio == "*":
+        from .pager import page_all_results
+
+        def fetch_page(page):
+            return api.call.list_portfolios_for_scope(args.scope, limit=2000, page=page)
+
+        def got_page(result):
+            return pd.DataFrame(
+                [(p.id.scope, p.id.code) for p in result.content.values],
+                columns=["scope", "code"],
+            )
+
+        return Either(page_all_results(fetch_page, got_page)).bind(
+            lambda df: list(df.itertuples(index=False, name=None))
+        )
+
+    if portfolio.startswith("group:"):
+        portfolios = []
+        members = set()
+        groups = [(args.scope, portfolio[6:])]
+        seen = set()
+        while len(groups) > 0:
+            group = groups.pop(0)
+            if group in seen:
+                continue
+            seen.add(group)
+
+            result = api.call.get_portfolio_group(*group)
+            if result.is_left():
+                return result
+            for p in result.right.content.portfolios:
+                if (p.scope, p.code) not in members:
+                    members.add((p.scope, p.code))
+                    portfolios.append((p.scope, p.code))
+            groups.extend((g.scope, g.code) for g in result.right.content.sub_groups)
+
+        return Either.Right(portfolios)
+
+    if "," in portfolio:
+        codes = [code.strip() for code in portfolio.split(",")]
+        return Either.Right([(args.scope, code) for code in codes if code])
+
+    return None
+
+
+# Wrap the executor of a tool to run it for each of the portfolios selected by
+# its portfolio argument, up to args.parallel at a time. The results are
+# concatenated with the scope and code of the portfolio. Errors for a portfolio
+# are displayed and the others carry on
+def for_each_portfolio(executor):
+    def run(api, args):
+        selected = selected_portfolios(api, args)
+        if selected is None:
+            return executor(api, args)
+        if selected.is_left():
+            return selected
+
+        def run_portfolio(portfolio):
+            # Every portfolio is written to the output together
+            portfolio_args = argparse.Namespace(**vars(args))
+            portfolio_args.scope, portfolio_args.portfolio = portfolio
+            portfolio_args.stream = False
+            # The portfolios are already run in parallel
+            portfolio_args.parallel = 1
+            return Either(executor(api, portfolio_args))
+
+        dfs = []
+        errors = []
+        results = ordered_map(
+            run_portfolio, selected.right, getattr(args, "parallel", 1)
+        )
+        for (scope, code), result in zip(selected.right, results):
+            if result.is_left():
+                with redirect_stdout(sys.stderr):
+                    print(f"{scope}/{code}:")
+                    display_error(result.left)
+                errors.append(result)
+            elif isinstance(result.right, pd.DataFrame):
+                df = result.right.copy()
+                df.insert(0, "Portfolio", code)
+                df.insert(0, "Scope", scope)
+                dfs.append(df)
+
+        if len(dfs) == 0:
+            return errors[0] if len(errors) > 0 else None
+        return pd.concat(dfs, ignore_index=True, sort=False)
+
+    return run
+
+
 # Template 'program'
 def standard_flow(parser, connector, executor, display_df=display_df):
     args = parser()
@@ -249,12 +579,7 @@ def standard_flow(parser, connector, executor, display_df=display_df):
         if df is not None:
             fn = args.__dict__.get("filename", None)
             if fn is not None:
-                if ".xls" in fn.lower():
-                    df.to_excel(fn, index=False)
-                elif fn.endswith(".pk"):
-                    df.to_pickle(fn)
-                else:
-                    df.to_csv(fn, index=False)
+                formats.write_frame(df, fn)
             else:
                 if "dfq" in args and args.dfq:
                     from . import dfq
@@ -307,7 +632,7 @@ def read_input(path, frame_type=None, mappings=None, **kwargs):
     if ".xls" in path.lower():
         df = pd.read_excel(path, sheet_name=sheet, engine="openpyxl", **kwargs)
     else:
-        df = pd.read_csv(path, **kwargs)
+        df = formats.read_frame(path, **kwargs)
 
     if mappings is not None:
         df = df.rename(columns=mappings)
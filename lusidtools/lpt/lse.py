@@ -4,7 +4,9 @@ import inspect
 import json
 import os
 
+from lusidtools.cocoon.rate_governor import get_rate_governor
 from . import lpt
+from .call_stats import CallStats
 from .either import Either
 from .record import Rec
 
@@ -35,8 +37,26 @@ class ExtendedAPI:
         self.api = ApiConverter(api, lusid)
         self.models = lusid.models
         self.lusid = lusid
-        self.stats_file = config.get("stats", "")
-        self.stats = [] if self.stats_file != "" else None
+        # Statistics are only collected with --stats, the calls are written to
+        # the file as they are made
+        self.stats_file = config.get("stats") or ""
+        self.stats = (
+            CallStats(
+                self.stats_file if self.stats_file != "-" else None,
+                [
+                    "startTime",
+                    "endTime",
+                    "name",
+                    "requestId",
+                    "duration",
+                    "elapsed",
+                    "status",
+                    "retries",
+                ],
+            )
+            if self.stats_file != ""
+            else None
+        )
 
         # See if the api contains the ErrorResponseException
 
@@ -52,21 +72,18 @@ class ExtendedAPI:
     def from_df(self, df, model, related=None):
         return lpt.from_df(df, model, self.models.__dict__, related)
 
+    # Create a DataFrame from the JSON of a response read with raw=True
+    def json_to_df(self, data, columns, model):
+        if isinstance(model, str):
+            model = getattr(self.models, model)
+        return lpt.json_to_df(data, columns, model, self.models.__dict__)
+
+    # Display the summary of the statistics for each endpoint
     def dump_stats(self):
         if self.stats != None:
-            lpt.dump_stats(
-                self.stats_file,
-                self.stats,
-                [
-                    "startTime",
-                    "endTime",
-                    "name",
-                    "requestId",
-                    "duration",
-                    "elapsed",
-                    "status",
-                ],
-            )
+            self.stats.close()
+            if len(self.stats) > 0:
+                lpt.display_df(self.stats.summary(), decimals=3)
 
 
 # Wrapper class to call an API function returning the stats
@@ -83,20 +100,35 @@ class Caller:
 
         # Function that will call the target function
         # returns an Either
-        def callApiFn(*args, **kwargs):
+        # With raw=True the content is the JSON of the response rather than models
+        def callApiFn(*args, raw=False, **kwargs):
             # Add the ' parameter and custom headers
             # adjKwargs = dict(raw=True,custom_headers=self.custom_headers)
             # adjKwargs.update(kwargs)
             adjKwargs = dict([v for v in dict(kwargs).items() if v[1] != None])
 
+            # Skip deserialising the response into models
+            if raw:
+                adjKwargs["_preload_content"] = False
+
             # Add the as_at parameter if provided and valid
             if self.as_at:  # and signature(fn).parameters.get('as_at'):
                 adjKwargs.update({"as_at": lpt.to_date(self.as_at)})
 
             # Measure execution time of the call
             startTime = datetime.datetime.now()
+            retries = []
             try:
-                result = fn(*args, **(adjKwargs))
+                # Go through the rate governor shared with everything else in the process
+                result = get_rate_governor().call(
+                    name, lambda: fn(*args, **(adjKwargs)), on_retry=retries.append
+                )
+                if raw:
+                    result = (
+                        json.loads(result.data) if result.data else None,
+                        result.status,
+                        result.headers,
+                    )
                 request_id = result[2].get("lusid-meta-requestId", "n/a")
             except self.exceptionClass as err:
                 data = {} if err.body == "" or err.body == b"" else json.loads(err.body)
@@ -119,17 +151,26 @@ class Caller:
                     err.status,
                     {},
                 ]
+                headers = err.headers or {}
+            else:
+                headers = result[2]
 
             endTime = datetime.datetime.now()
+            duration = (endTime - startTime).total_seconds()
+
+            # The time LUSID took to handle the call, or the time the client
+            # took if LUSID did not report it e.g. a failure before reaching it
+            elapsed = headers.get("lusid-meta-duration")
 
             statistics = Rec(
                 name=name,
                 startTime=startTime,
                 endTime=endTime,
-                duration=(endTime - startTime).total_seconds(),
-                elapsed=float(result[2].get("lusid-meta-duration", 0)) / 1000,
+                duration=duration,
+                elapsed=float(elapsed) / 1000 if elapsed is not None else duration,
                 status=result[1],
                 requestId=request_id,
+                retries=len(retries),
             )
 
             if self.stats != None:
@@ -6,6 +6,7 @@ from lusidtools.lpt import lpt
 from lusidtools.lpt import lse
 from lusidtools.lpt import stdargs
 from lusidtools.lpt.either import Either
+from lusidtools.cocoon.instrument_cache import InstrumentResolutionCache
 
 mapping_prefixes = {"Figi": "FIGI", "ClientInternal": "INT", "QuotePermId": "QPI"}
 
@@ -23,6 +24,11 @@ def parse(extend=None, args=None):
             default="instrument_uid",
             help="column name for instrument column",
         )
+        .add(
+            "--cache",
+            metavar="cache.sqlite",
+            help="persistent instrument resolution cache to read from and update",
+        )
         .extend(extend)
         .parse(args)
     )
@@ -51,14 +57,21 @@ def process_args(api, args):
     df.columns = ["FROM"]
     df["TO"] = df["FROM"]
 
-    return map_instruments(api, df, "TO")
+    if not args.cache:
+        return map_instruments(api, df, "TO")
+
+    resolution_cache = InstrumentResolutionCache(args.cache)
+    try:
+        return map_instruments(api, df, "TO", resolution_cache)
+    finally:
+        resolution_cache.close()
 
 
 def main():
     lpt.standard_flow(parse, lse.connect, process_args)
 
 
-def map_instruments(api, df, column):
+def map_instruments(api, df, column, resolution_cache=None):
     WORKING = "__:::__"  # temporary column name
 
     # Apply any known mappings to avoid unecessary i/o
@@ -70,10 +83,23 @@ def map_instruments(api, df, column):
             df.loc[srs.index, column] = srs
 
     # updates the mappings table
-    def update_mappings(src, prefix):
+    def update_mappings(src, prefix, instr_type):
         mapping_table.update(
             {prefix + k: v.lusid_instrument_id for k, v in src.items()}
         )
+        if resolution_cache is not None:
+            resolution_cache.put_many(
+                instr_type, {k: [v.lusid_instrument_id] for k, v in src.items()},
+            )
+
+    # applies the mappings held in the persistent cache
+    def apply_cached_mappings(instr_type, prefix, uniques):
+        # Only positive resolutions are used, unmapped instruments are added or reported as before
+        cached = resolution_cache.get_many(instr_type, list(uniques[WORKING].values))
+        mapping_table.update(
+            {prefix + k: v[0] for k, v in cached.items() if len(v) == 1}
+        )
+        return uniques[~uniques[column].isin(mapping_table.keys())]
 
     def batch_query(instr_type, prefix, outstanding):
         if len(outstanding) > 0:
@@ -86,7 +112,7 @@ def map_instruments(api, df, column):
                 get_failed = result.content.failed
 
                 # Update successfully found items
-                update_mappings(get_found, prefix)
+                update_mappings(get_found, prefix, instr_type)
 
                 if len(get_failed) > 0:
                     if instr_type == "ClientInternal":
@@ -101,7 +127,7 @@ def map_instruments(api, df, column):
                                 return Either.Left("Failed to add internal instruments")
 
                             # Update successfully added items
-                            update_mappings(add_worked, prefix)
+                            update_mappings(add_worked, prefix, instr_type)
 
                             # Kick off the next batch
                             return batch_query(instr_type, prefix, remainder)
@@ -141,6 +167,9 @@ def map_instruments(api, df, column):
             uniques = subset[[column]].drop_duplicates(column)
             uniques[WORKING] = uniques[column].str.slice(width)
 
+            if resolution_cache is not None:
+                uniques = apply_cached_mappings(instr_type, prefix, uniques)
+
             def map_success(v):
                 df.loc[subset.index, column] = subset[column].map(mapping_table)
                 return Either.Right(df)
@@ -1,5 +1,7 @@
 import pandas as pd
+import queue
 import re
+import threading
 import urllib.parse
 
 from lusidtools.lpt.either import Either
@@ -7,26 +9,100 @@ from lusidtools.lpt.either import Either
 rexp = re.compile(r".*page=([^=']{10,}).*")
 
 
-def page_all_results(fetch_page, page_handler):
-    results = []
+# Get the token of the next page from the NextPage link of a page
+def next_page_link(content):
+    links = [l for l in content.links if l.relation == "NextPage"]
 
-    def got_page(result):
-        results.append(page_handler(result))
+    if len(links) > 0:
+        match = rexp.match(links[0].href)
+        if match:
+            return urllib.parse.unquote(match.group(1))
+    return None
 
-        links = [l for l in result.content.links if l.relation == "NextPage"]
 
-        if len(links) > 0:
-            match = rexp.match(links[0].href)
-            if match:
-                return urllib.parse.unquote(match.group(1))
-        return None
+# Marks the end of the pages
+_done = object()
+
+
+# Generate the result of fetching each page, starting with the first.
+# The next page is fetched on a background thread while the current one is
+# processed, up to prefetch pages ahead (0 fetches each page when it is needed).
+# Stops after the first failed page.
+def prefetch_pages(fetch_page, next_page=next_page_link, prefetch=1):
+    if prefetch < 1:
+        page = None
+        while True:
+            result = fetch_page(page)
+            yield result
+            if result.is_left():
+                return
+            page = next_page(result.right.content)
+            if page is None:
+                return
+
+    pages = queue.Queue(maxsize=prefetch)
+    stopped = threading.Event()
+
+    # Put a page on the queue unless the pages are no longer wanted
+    def put(item):
+        while not stopped.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def fetch_all():
+        try:
+            page = None
+            while True:
+                result = fetch_page(page)
+                if not put(result) or result.is_left():
+                    break
+                page = next_page(result.right.content)
+                if page is None:
+                    break
+        except BaseException as e:
+            put(e)
+        put(_done)
+
+    thread = threading.Thread(target=fetch_all, daemon=True)
+    thread.start()
 
-    page = Either(None)
-    while True:
-        page = fetch_page(page.right).bind(got_page)
+    try:
+        while True:
+            item = pages.get()
+            if item is _done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stopped.set()
+
+
+# Fetch every page, converting each to a DataFrame with page_handler while the
+# next is being fetched. The DataFrames are concatenated, or passed to sink as
+# they are converted if one is given, stopping once the sink is full.
+def page_all_results(
+    fetch_page, page_handler, prefetch=1, sink=None, next_page=next_page_link
+):
+    results = []
+
+    for page in prefetch_pages(fetch_page, next_page, prefetch):
         if page.is_left():
             return page
-        if page.right == None:
-            break
+
+        df = page_handler(page.right)
+        if sink is not None:
+            sink(df)
+            if getattr(sink, "full", False):
+                break
+        else:
+            results.append(df)
+
+    if sink is not None:
+        return None
 
     return pd.concat(results, ignore_index=True, sort=False)
@@ -28,10 +28,24 @@ PVAL = "Mkt Val"
 
 def parse(extend=None, args=None):
     return (
-        stdargs.Parser("Get Aggregate Holdings", ["filename", "limit", "properties"])
-        .add("scope", help="Scope")
-        .add("portfolio", help="Portfolio id")
-        .add("dates", nargs="+", metavar="YYYY-MM_DD")
+        stdargs.Parser(
+            "Get Aggregate Holdings",
+            [
+                "filename",
+                "limit",
+                "properties",
+                "scope",
+                "portfolio",
+                "portfolios",
+                "parallel",
+            ],
+        )
+        .add(
+            "dates",
+            nargs="+",
+            metavar="YYYY-MM_DD",
+            help="dates, or date ranges as start:end[:freq]",
+        )
         .add("-m", "--monitor", action="store_true", help="monitor the run")
         .add("--group", action="store_true", help="group instead of portfolio")
         .add("--pricing-scope", dest="pricing_scope", help="scope for pricing")
@@ -42,6 +56,7 @@ def parse(extend=None, args=None):
 
 
 def process_args(api, args):
+    args.dates = lpt.expand_dates(args.dates)
 
     if len(args.dates) == 1:
         return run_query(api, args, args.dates[0]).bind(lambda x: x[1])
@@ -50,17 +65,19 @@ def process_args(api, args):
 
         records = []
 
-        dates = iter(args.dates)
-
-        def get_daily_record():
-            try:
-                active_date = next(dates)
-            except StopIteration:
-                print("It's All Over")
-                return finished()
+        # Query the dates concurrently, recording the results in date order
+        def get_daily_records():
+            results = lpt.ordered_map(
+                lambda date: (date, run_query(api, args, date)),
+                args.dates,
+                args.parallel,
+            )
+            for active_date, result in results:
+                if result.is_left():
+                    results.close()
+                    return finished(result.left)
 
-            def got_daily_record(result):
-                stats, df = result
+                stats, df = result.right
 
                 pv = df[PVAL].sum()
 
@@ -90,13 +107,11 @@ def process_args(api, args):
                 i[0] += 1
 
                 if 0 < args.limit < i[0]:
+                    results.close()
                     return finished()
 
-                return get_daily_record()
-
-            return run_query(api, args, active_date).match(
-                left=finished, right=got_daily_record
-            )
+            print("It's All Over")
+            return finished()
 
         def finished(error=None):
 
@@ -119,7 +134,7 @@ def process_args(api, args):
 
             return lpt.trim_df(df[leading_cols + other_cols], args.limit)
 
-    return get_daily_record()
+    return get_daily_records()
 
 
 def run_query(api, args, date):
@@ -195,4 +210,6 @@ def run_query(api, args, date):
 
 
 def main(parse=parse, display_df=lpt.display_df):
-    return lpt.standard_flow(parse, lse.connect, process_args, display_df)
+    return lpt.standard_flow(
+        parse, lse.connect, lpt.for_each_portfolio(process_args), display_df
+    )
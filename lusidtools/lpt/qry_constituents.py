@@ -15,6 +15,8 @@ def parse(extend=None, args=None):
                 "limit",
                 "scope",
                 "portfolio",
+                "portfolios",
+                "parallel",
                 "date",
                 "properties",
                 "asat",
@@ -50,4 +52,6 @@ def process_args(api, args):
 
 # Standalone tool
 def main(parse=parse, display_df=lpt.display_df):
-    return lpt.standard_flow(parse, lse.connect, process_args, display_df)
+    return lpt.standard_flow(
+        parse, lse.connect, lpt.for_each_portfolio(process_args), display_df
+    )
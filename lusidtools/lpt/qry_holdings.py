@@ -28,9 +28,23 @@ columns = [
 def parse(extend=None, args=None):
     return (
         stdargs.Parser(
-            "Get Holdings", ["filename", "limit", "scope", "portfolio", "asat"]
+            "Get Holdings",
+            [
+                "filename",
+                "limit",
+                "scope",
+                "portfolio",
+                "portfolios",
+                "asat",
+                "parallel",
+            ],
+        )
+        .add(
+            "dates",
+            nargs="*",
+            metavar="YYYY-MM-DD",
+            help="dates, or date ranges as start:end[:freq]",
         )
-        .add("dates", nargs="*", metavar="YYYY-MM-DD")
         .add("-i", "--instrument", metavar="instrument-id", help="filter an instrument")
         .add("-m", "--monitor", action="store_true", help="monitor the run")
         .add("-t", "--taxlots", action="store_true", help="view at tax-lot level")
@@ -41,6 +55,7 @@ def parse(extend=None, args=None):
 
 
 def process_args(api, args):
+    args.dates = lpt.expand_dates(args.dates)
 
     if len(args.dates) <= 1:
 
@@ -89,8 +104,13 @@ def process_args(api, args):
         def terminate(error):
             return True  # just terminate the loop
 
-        for d in args.dates:
-            if run_query(api, args, d).match(left=terminate, right=create_record):
+        # Query the dates concurrently, recording the results in date order
+        results = lpt.ordered_map(
+            lambda date: (date, run_query(api, args, date)), args.dates, args.parallel
+        )
+        for d, result in results:
+            if result.match(left=terminate, right=create_record):
+                results.close()
                 break
 
         if len(records) == 0:
@@ -150,4 +170,6 @@ def run_query(api, args, date):
 
 # Standalone tool
 def main(parse=parse, display_df=lpt.display_df):
-    return lpt.standard_flow(parse, lse.connect, process_args, display_df)
+    return lpt.standard_flow(
+        parse, lse.connect, lpt.for_each_portfolio(process_args), display_df
+    )
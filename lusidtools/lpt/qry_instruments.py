@@ -1,13 +1,10 @@
 import pandas as pd
 import dateutil
 from lusidtools.lpt import lse
+from lusidtools.lpt import sinks
 from lusidtools.lpt import stdargs
 from lusidtools.lpt import qry_instr_ids, lpt
-from .either import Either
-import re
-import urllib.parse
-
-rexp = re.compile(r".*page=([^=']{10,}).*")
+from lusidtools.lpt.pager import page_all_results
 
 TOOLNAME = "instr_list"
 TOOLTIP = "List all instruments"
@@ -15,9 +12,17 @@ TOOLTIP = "List all instruments"
 
 def parse(extend=None, args=None):
     return (
-        stdargs.Parser("Query Instruments", ["filename", "limit", "properties"])
+        stdargs.Parser(
+            "Query Instruments", ["filename", "stream", "limit", "properties"]
+        )
         .add("--batch", type=int, default=2000)
         .add("--filter")
+        .add(
+            "--prefetch",
+            type=int,
+            default=1,
+            help="number of pages to fetch ahead while processing",
+        )
         .extend(extend)
         .parse(args)
     )
@@ -35,37 +40,34 @@ def process_args(api, args):
                 filter=args.filter,
             )
 
-        results = []
+        pages = [0]
+        sink = sinks.sink_for(args)
 
         def got_page(result):
             columns = ["lusid_instrument_id", "name"]
             columns.extend(sorted(id_columns.keys()))
             columns.extend(f"P:{c}" for c in args.properties)
-            df = lpt.to_df(result, columns).dropna(axis=1, how="all")
+            df = lpt.to_df(result, columns)
+            # Every page written to a sink has the same columns
+            if sink is None:
+                df = df.dropna(axis=1, how="all")
             df.rename(columns=id_columns, inplace=True)
 
-            results.append(df)
+            pages[0] += 1
+            print("{} {}".format(pages[0], len(df)))
 
-            links = [l for l in result.content.links if l.relation == "NextPage"]
+            return df
 
-            if len(links) > 0:
-                match = rexp.match(links[0].href)
-                if match:
-                    print("{} {}".format(len(results), match.group(1)))
-                    return urllib.parse.unquote(match.group(1))
-            return None
+        # Write each page to the file as it is converted
+        if sink is not None:
+            with sink:
+                return page_all_results(fetch_page, got_page, args.prefetch, sink=sink)
 
-        page = Either(None)
-        while True:
-            page = fetch_page(page.right).bind(got_page)
-            if page.is_left():
-                return page
-            if page.right == None:
-                break
+        df = page_all_results(fetch_page, got_page, args.prefetch)
+        if not isinstance(df, pd.DataFrame):
+            return df
 
-        return lpt.trim_df(
-            pd.concat(results, ignore_index=True, sort=False), args.limit, sort="name"
-        )
+        return lpt.trim_df(df, args.limit, sort="name")
 
     return qry_instr_ids.process_args(api, args).bind(list_instruments)
 
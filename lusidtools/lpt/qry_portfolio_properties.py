@@ -10,7 +10,16 @@ TOOLTIP = "Show properties on a portfolio"
 def parse(extend=None, args=None):
     return (
         stdargs.Parser(
-            "Get Portfolios", ["filename", "limit", "portfolio", "scope", "asat"]
+            "Get Portfolios",
+            [
+                "filename",
+                "limit",
+                "portfolio",
+                "portfolios",
+                "scope",
+                "asat",
+                "parallel",
+            ],
         )
         .add("--date")
         .extend(extend)
@@ -43,4 +52,4 @@ def process_args(api, args):
 
 # Standalone tool
 def main(parse=parse, display_df=lpt.display_df):
-    return lpt.standard_flow(parse, lse.connect, process_args)
+    return lpt.standard_flow(parse, lse.connect, lpt.for_each_portfolio(process_args))
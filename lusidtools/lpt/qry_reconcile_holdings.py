@@ -1,8 +1,11 @@
+import itertools
+
 import lusid
 import pandas as pd
 from lusidtools.lpt import lpt
 from lusidtools.lpt import lse
 from lusidtools.lpt import stdargs
+from lusidtools.lpt.either import Either
 
 TOOLNAME = "rec"
 TOOLTIP = "Query Holdings Reconciliation"
@@ -13,7 +16,7 @@ AGG_UID = "Instrument/default/LusidInstrumentId"
 
 def parse(extend=None, args=None):
     return (
-        stdargs.Parser("Get Holdings Reconciliation", ["filename", "limit"])
+        stdargs.Parser("Get Holdings Reconciliation", ["filename", "limit", "parallel"])
         .add("scope_left", help="Scope - left")
         .add("portfolio_left", help="Portfolio id - left")
         .add("date_left", nargs="+", metavar="YYYY-MM_DD")
@@ -22,6 +25,14 @@ def parse(extend=None, args=None):
         .add("date_right", nargs="+", metavar="YYYY-MM_DD")
         .add("-m", "--monitor", action="store_true", help="monitor the run")
         .add("--group", action="store_true", help="group instead of portfolio")
+        .add(
+            "--local",
+            action="store_true",
+            help="fetch the holdings and reconcile them locally. The portfolios can be "
+            "comma separated lists and there can be many dates, paired by position",
+        )
+        .add("--units-tolerance", type=float, default=0.0, dest="units_tolerance")
+        .add("--cost-tolerance", type=float, default=0.0, dest="cost_tolerance")
         .extend(extend)
         .parse(args)
     )
@@ -63,6 +74,11 @@ def run_query(
 
 
 def process_args(api, args):
+    if args.local:
+        if args.group:
+            return Either.Left("--local cannot be used with --group")
+        return run_local(api, args)
+
     return run_query(
         api=api,
         args=args,
@@ -109,5 +125,136 @@ def parse_reconciled_holdings(result):
     return parse_breaks(result)
 
 
+# Get the holdings of a portfolio aggregated by instrument and sub-holding keys
+def get_holdings(api, scope, portfolio, date):
+    def success(result):
+        shks = sorted(
+            {k for h in result.content.values for k in (h.sub_holding_keys or {})}
+        )
+        columns = ["instrument_uid", "P:" + AGG_INSTR, "units"]
+        columns.extend(["cost.amount", "cost.currency"])
+        df = lpt.to_df(result, columns + ["SHK:" + k for k in shks])
+        df.columns = ["LUID", "Name", "units", "cost", "cost_ccy"] + shks
+        return df
+
+    return api.call.get_holdings(
+        scope=scope,
+        code=portfolio,
+        effective_at=lpt.to_date(date),
+        property_keys=[AGG_INSTR],
+    ).bind(success)
+
+
+# Reconcile two sets of holdings with a keyed merge on the instrument and
+# sub-holding keys, returning the breaks in the same form as reconcile_holdings
+def reconcile_holdings(left, right, units_tolerance=0.0, cost_tolerance=0.0):
+    shks = sorted(
+        (set(left.columns) | set(right.columns))
+        - {"LUID", "Name", "units", "cost", "cost_ccy"}
+    )
+    keys = ["LUID"] + shks
+
+    def aggregate(df):
+        df = df.reindex(columns=keys + ["Name", "units", "cost", "cost_ccy"])
+        # Missing keys are grouped together rather than dropped
+        df[shks] = df[shks].fillna("N/A")
+        return df.groupby(keys, sort=False).agg(
+            Name=("Name", "first"),
+            units=("units", "sum"),
+            cost=("cost", "sum"),
+            cost_ccy=("cost_ccy", "first"),
+        )
+
+    df = aggregate(left).join(
+        aggregate(right), how="outer", lsuffix="_left", rsuffix="_right"
+    )
+    for col in ["units_left", "units_right", "cost_left", "cost_right"]:
+        df[col] = df[col].fillna(0.0)
+
+    diff_units = df["units_right"] - df["units_left"]
+    diff_cost = df["cost_right"] - df["cost_left"]
+    breaks = (diff_units.abs() > units_tolerance) | (diff_cost.abs() > cost_tolerance)
+
+    df = pd.DataFrame(
+        {
+            "LUID": df.index.get_level_values("LUID"),
+            "Name": df["Name_left"].fillna(df["Name_right"]).values,
+            "diff_cost": diff_cost.values,
+            "diff_cost_ccy": df["cost_ccy_right"].fillna(df["cost_ccy_left"]).values,
+            "left_cost": df["cost_left"].values,
+            "left_cost_ccy": df["cost_ccy_left"].values,
+            "left_units": df["units_left"].values,
+            "right_cost": df["cost_right"].values,
+            "right_cost_ccy": df["cost_ccy_right"].values,
+            "right_units": df["units_right"].values,
+            **{shk: df.index.get_level_values(shk) for shk in shks},
+        }
+    )[breaks.values]
+
+    return df.fillna("N/A").reset_index(drop=True)
+
+
+# Reconcile the holdings locally for each pair of portfolios and dates. Each set
+# of holdings is fetched once, up to args.parallel at a time
+def run_local(api, args):
+    # A single value is paired with every value of the other list, None if the
+    # lists cannot be paired
+    def paired(*lists):
+        length = max(len(l) for l in lists)
+        if any(len(l) not in (1, length) for l in lists):
+            return None
+        return list(zip(*[l * length if len(l) == 1 else l for l in lists]))
+
+    portfolios = paired(args.portfolio_left.split(","), args.portfolio_right.split(","))
+    dates = paired(args.date_left, args.date_right)
+    if portfolios is None or dates is None:
+        return Either.Left(
+            "The left and right portfolios and dates must be lists of the same "
+            "length or a single value"
+        )
+    pairs = [
+        ((args.scope_left, pl, dl), (args.scope_right, pr, dr))
+        for (pl, pr), (dl, dr) in itertools.product(portfolios, dates)
+    ]
+
+    holdings = list(dict.fromkeys(side for pair in pairs for side in pair))
+    results = dict(
+        zip(
+            holdings,
+            lpt.ordered_map(lambda h: get_holdings(api, *h), holdings, args.parallel),
+        )
+    )
+    for result in results.values():
+        if result.is_left():
+            return result
+
+    reports = []
+    for left, right in pairs:
+        df = reconcile_holdings(
+            results[left].right,
+            results[right].right,
+            args.units_tolerance,
+            args.cost_tolerance,
+        )
+        if len(pairs) > 1:
+            df.insert(0, "date_right", right[2])
+            df.insert(0, "portfolio_right", right[1])
+            df.insert(0, "date_left", left[2])
+            df.insert(0, "portfolio_left", left[1])
+        if args.monitor:
+            print(
+                "{} {} v {} {}: {} breaks".format(
+                    left[1], left[2], right[1], right[2], len(df)
+                )
+            )
+        reports.append(df)
+
+    df = pd.concat(reports, ignore_index=True, sort=False)
+    if len(df) == 0:
+        return "No reconciliation breaks"
+
+    return lpt.trim_df(df, args.limit)
+
+
 def main(parse=parse, display_df=lpt.display_df):
     return lpt.standard_flow(parse, lse.connect, process_args, display_df)
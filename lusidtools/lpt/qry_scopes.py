@@ -2,6 +2,7 @@ import pandas as pd
 import dateutil
 from lusidtools.lpt import lpt
 from lusidtools.lpt import lse
+from lusidtools.lpt import sinks
 from lusidtools.lpt import stdargs
 from lusidtools.lpt.either import Either
 from lusidtools.lpt.pager import page_all_results
@@ -13,7 +14,7 @@ TOOLTIP = "List scopes"
 
 def parse(extend=None, args=None):
     return (
-        stdargs.Parser("Get Scopes", ["filename", "limit"])
+        stdargs.Parser("Get Scopes", ["filename", "stream", "limit"])
         .add("--portfolios", action="store_true")
         .add("--batch", type=int, default=1000)
         .add("--monitor", action="store_true")
@@ -44,6 +45,13 @@ def process_args(api, args):
             )
         return df
 
+    # The portfolios can be written to the file page by page, the scopes are
+    # counted across all the pages
+    sink = sinks.sink_for(args) if args.portfolios else None
+    if sink is not None:
+        with sink:
+            return page_all_results(fetch_page, got_page, sink=sink)
+
     df = page_all_results(fetch_page, got_page)
 
     if not args.portfolios:
@@ -13,7 +13,16 @@ def parse(extend=None, args=None):
     return (
         stdargs.Parser(
             "Get targets",
-            ["portfolio", "scope", "date_range", "filename", "limit", "asat"],
+            [
+                "portfolio",
+                "portfolios",
+                "parallel",
+                "scope",
+                "date_range",
+                "filename",
+                "limit",
+                "asat",
+            ],
         )
         .add("--date", help="YYYY-MM-DD - if provided will query the holdings")
         .extend(extend)
@@ -85,4 +94,6 @@ def process_args(api, args):
 
 # Standalone tool
 def main(parse=parse, display_df=lpt.display_df):
-    return lpt.standard_flow(parse, lse.connect, process_args, display_df)
+    return lpt.standard_flow(
+        parse, lse.connect, lpt.for_each_portfolio(process_args), display_df
+    )
@@ -2,8 +2,9 @@ import pandas as pd
 import datetime
 from lusidtools.lpt import lpt
 from lusidtools.lpt import lse
+from lusidtools.lpt import sinks
 from lusidtools.lpt import stdargs
-from itertools import chain
+from lusidtools.lpt.pager import page_all_results
 
 TOOLNAME = "txn"
 TOOLTIP = "Query transactions"
@@ -13,7 +14,17 @@ def parse(extend=None, args=None):
     return (
         stdargs.Parser(
             "Get Transactions",
-            ["filename", "limit", "scope", "portfolio", "date_range", "asat"],
+            [
+                "filename",
+                "stream",
+                "limit",
+                "scope",
+                "portfolio",
+                "portfolios",
+                "parallel",
+                "date_range",
+                "asat",
+            ],
         )
         .add("--properties", nargs="*", help="properties required for display")
         .add(
@@ -32,12 +43,23 @@ def parse(extend=None, args=None):
             default=5000,
             help="Number of transactions returned per page",
         )
+        .add(
+            "--fast",
+            action="store_true",
+            help="Read the transactions as JSON without deserialising them into models",
+        )
+        .add(
+            "--prefetch",
+            type=int,
+            default=1,
+            help="Number of pages to fetch ahead while processing",
+        )
         .extend(extend)
         .parse(args)
     )
 
 
-def convert_to_dataframe(args, txns):
+def convert_to_dataframe(args, txns, to_df=lpt.to_df):
     available_columns = [
         ("C", "transaction_status", "Status"),
         ("B", "transaction_id", "TxnId"),
@@ -72,7 +94,7 @@ def convert_to_dataframe(args, txns):
         ]
     )
 
-    df = lpt.to_df(txns, [c[1] for c in columns])
+    df = to_df(txns, [c[1] for c in columns])
 
     # Rename the column headings
     df.columns = [c[2] for c in columns]
@@ -86,6 +108,7 @@ def process_args(api, args):
 
     txn_fn = None
     txn_fn_args = None
+    model = "Transaction"
 
     if args.type != "input" or args.cancels == True:
         # Date range is required for build_transactions endpoint
@@ -95,6 +118,7 @@ def process_args(api, args):
             args.end_date = datetime.datetime.today()
 
         txn_fn = api.call.build_transactions
+        model = "OutputTransaction"
 
         txn_fn_args = dict(
             scope=args.scope,
@@ -119,20 +143,47 @@ def process_args(api, args):
             limit=args.pagesize,
         )
 
-    all_txns = []
-    while True:
-        result = txn_fn(**txn_fn_args)
-        if result.is_left():
-            return result
+    def fetch_page(page):
+        return txn_fn(raw=args.fast, page=page, **txn_fn_args)
+
+    # Each page is converted while the next is fetched
+    if args.fast:
+        # The content is the JSON of the page
+        def got_page(result):
+            return convert_to_dataframe(
+                args,
+                result.content["values"],
+                lambda txns, columns: api.json_to_df(txns, columns, model),
+            )
 
-        content = result.right.content
-        all_txns.append(content.values)
-        if content.next_page:
-            txn_fn_args["page"] = content.next_page
-        else:
-            return convert_to_dataframe(args, chain.from_iterable(all_txns))
+        def next_page(content):
+            return content.get("nextPage")
+
+    else:
+
+        def got_page(result):
+            return convert_to_dataframe(args, result.content.values)
+
+        def next_page(content):
+            return content.next_page
+
+    # Write each page to the file as it is converted
+    sink = sinks.sink_for(args)
+    if sink is not None:
+        with sink:
+            return page_all_results(
+                fetch_page, got_page, args.prefetch, sink=sink, next_page=next_page
+            )
+
+    df = page_all_results(fetch_page, got_page, args.prefetch, next_page=next_page)
+    if not isinstance(df, pd.DataFrame):
+        return df
+
+    return lpt.trim_df(df, args.limit)
 
 
 # Standalone tool
 def main(parse=parse, display_df=lpt.display_df):
-    return lpt.standard_flow(parse, lse.connect, process_args, display_df)
+    return lpt.standard_flow(
+        parse, lse.connect, lpt.for_each_portfolio(process_args), display_df
+    )
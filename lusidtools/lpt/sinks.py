@@ -0,0 +1,156 @@
+import gzip
+import os
+from abc import ABC, abstractmethod
+
+# Sinks to write a DataFrame to a file in parts, e.g. page by page, so that the
+# whole of the output never has to be held in memory. A sink can be passed to
+# pager.page_all_results, and stops accepting rows once it has reached its limit.
+# CSV and JSON Lines files are compressed when the name ends with .gz
+
+
+class Sink(ABC):
+    def __init__(self, filename, limit=0):
+        self.filename = filename
+        self.limit = limit
+        self.rows = 0
+        self.columns = None
+
+    # Whether the sink has written as many rows as its limit
+    @property
+    def full(self):
+        return 0 < self.limit <= self.rows
+
+    def write(self, df):
+        if self.full:
+            return
+        if self.limit > 0:
+            df = df[: self.limit - self.rows]
+
+        # Keep the columns of later parts aligned with the first
+        if self.columns is None:
+            self.columns = list(df.columns)
+        else:
+            df = df.reindex(columns=self.columns)
+
+        self.write_part(df, self.rows == 0)
+        self.rows += len(df)
+
+    # Write a part of the output, first is True for the first part
+    @abstractmethod
+    def write_part(self, df, first):
+        pass
+
+    # Open the file of a text sink to write the first part or append the others
+    def open(self, first):
+        if self.filename.lower().endswith(".gz"):
+            return gzip.open(self.filename, "wt" if first else "at", newline="")
+        return open(self.filename, "w" if first else "a", newline="")
+
+    def close(self):
+        pass
+
+    def __call__(self, df):
+        self.write(df)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class CsvSink(Sink):
+    def write_part(self, df, first):
+        with self.open(first) as f:
+            df.to_csv(f, index=False, header=first)
+
+
+class JsonLinesSink(Sink):
+    def write_part(self, df, first):
+        with self.open(first) as f:
+            if len(df) > 0:
+                # Some versions of pandas end the lines with a newline
+                lines = df.to_json(orient="records", lines=True, date_format="iso")
+                f.write(lines.rstrip("\n") + "\n")
+
+
+class ParquetSink(Sink):
+    def __init__(self, filename, limit=0):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Writing parquet files requires pyarrow to be installed")
+
+        super().__init__(filename, limit)
+        self.pa = pyarrow
+        self.writer = None
+
+    def write_part(self, df, first):
+        if self.writer is None:
+            table = self.pa.Table.from_pandas(df, preserve_index=False)
+            # Columns with no values in the first part are written as strings
+            schema = self.pa.schema(
+                [
+                    f.with_type(self.pa.string()) if f.type == self.pa.null() else f
+                    for f in table.schema
+                ]
+            )
+            self.writer = self.pa.parquet.ParquetWriter(self.filename, schema)
+            self.schema = schema
+
+        self.writer.write_table(
+            self.pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        )
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+sink_types = {
+    ".csv": CsvSink,
+    ".txt": CsvSink,
+    ".jsonl": JsonLinesSink,
+    ".ndjson": JsonLinesSink,
+    ".parquet": ParquetSink,
+    ".pq": ParquetSink,
+}
+
+
+# Text sinks which can be compressed
+compressible_sink_types = [CsvSink, JsonLinesSink]
+
+
+# Get the type of sink for a file from its extension, None if it cannot be
+# streamed to
+def sink_type(filename):
+    name, ext = os.path.splitext(filename.lower())
+    if ext == ".gz":
+        cls = sink_types.get(os.path.splitext(name)[1])
+        return cls if cls in compressible_sink_types else None
+    return sink_types.get(ext)
+
+
+# Whether a file can be written to with a sink
+def is_streamable(filename):
+    return sink_type(filename) is not None
+
+
+# Open a sink for the output file of a tool if it is to be streamed, else None
+def sink_for(args):
+    if not getattr(args, "stream", False) or not getattr(args, "filename", None):
+        return None
+    return open_sink(args.filename, getattr(args, "limit", 0))
+
+
+# Open a sink to write to a file, chosen by its extension
+def open_sink(filename, limit=0):
+    cls = sink_type(filename)
+    if cls is None:
+        raise ValueError(
+            "Cannot stream to {}, use one of {} or .csv.gz, .jsonl.gz".format(
+                filename, ", ".join(sink_types.keys())
+            )
+        )
+    return cls(filename, limit)
@@ -16,7 +16,15 @@ class Parser:
         if "scope" in sections:
             self.add("scope", help="Scope")
 
-        if "portfolio" in sections:
+        # Tools which can run for many portfolios, see lpt.for_each_portfolio
+        if "portfolio" in sections and "portfolios" in sections:
+            self.add(
+                "portfolio",
+                help="Portfolio id, a comma separated list of ids, * for every "
+                "portfolio in the scope, group:<id> for the portfolios in a group "
+                "or file:<filename> with an id or scope/id per line",
+            )
+        elif "portfolio" in sections:
             self.add("portfolio", help="Portfolio id")
 
         if "date" in sections:
@@ -33,6 +41,13 @@ class Parser:
                 "-f", "--filename", metavar="filename.csv", help="write to this file"
             )
 
+        if "stream" in sections:
+            self.add(
+                "--stream",
+                action="store_true",
+                help="write to the file page by page as results are fetched (unsorted)",
+            )
+
         if "limit" in sections:
             self.add(
                 "-l",
@@ -43,6 +58,15 @@ class Parser:
                 help="limit the number of results",
             )
 
+        if "parallel" in sections:
+            self.add(
+                "--parallel",
+                type=int,
+                default=1,
+                metavar="n",
+                help="number of queries to run concurrently",
+            )
+
         if "date_range" in sections:
             self.add("-s", "--start_date", dest="start_date", metavar="YYYY-MM-DD")
             self.add("-e", "--end_date", dest="end_date", metavar="YYYY-MM-DD")
@@ -29,6 +29,7 @@ setup(
         "IPython>=7.31.1",
         "lusid-sdk-preview>=0.11.4425, < 2",
     ],
+    extras_require={"parquet": ["pyarrow>=3.0.0"]},
     include_package_data=True,
     python_requires=">=3.7",
     entry_points={
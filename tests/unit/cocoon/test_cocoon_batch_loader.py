@@ -0,0 +1,364 @@
+import asyncio
+import concurrent.futures
+import json
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import lusid
+import pandas as pd
+
+from lusidtools.cocoon.async_tools import ThreadPool
+from lusidtools.cocoon.cocoon import (
+    BatchLoader,
+    list_existing_portfolios,
+    add_sub_holding_keys_to_portfolios,
+    _load_data,
+    _summarise_batch_response,
+    load_from_data_frame,
+)
+
+
+def portfolio(code):
+    return SimpleNamespace(id=SimpleNamespace(scope="scope", code=code))
+
+
+class CocoonBatchLoaderPortfolioTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.api_factory = MagicMock(spec=lusid.utilities.ApiClientFactory)
+        self.api = self.api_factory.build.return_value
+        self.thread_pool = ThreadPool(2).thread_pool
+
+    def test_list_existing_portfolios_pages_through_scope(self) -> None:
+        self.api.list_portfolios_for_scope.side_effect = [
+            SimpleNamespace(values=[portfolio("A"), portfolio("B")], next_page="abc"),
+            SimpleNamespace(values=[portfolio("C")], next_page=None),
+        ]
+
+        existing = list_existing_portfolios(self.api_factory, "scope", page_size=2)
+
+        self.assertEqual(sorted(existing.keys()), ["A", "B", "C"])
+        self.assertEqual(
+            self.api.list_portfolios_for_scope.call_args_list[1][1]["page"], "abc"
+        )
+
+    def test_list_existing_portfolios_returns_none_on_error(self) -> None:
+        self.api.list_portfolios_for_scope.side_effect = lusid.exceptions.ApiException(
+            status=403, reason="Forbidden"
+        )
+
+        self.assertIsNone(list_existing_portfolios(self.api_factory, "scope"))
+
+    def test_load_portfolio_batch_uses_prefetched_portfolios(self) -> None:
+        existing = {"A": portfolio("A")}
+
+        async def load(code):
+            return await BatchLoader.load_portfolio_batch(
+                self.api_factory,
+                [MagicMock()],
+                scope="scope",
+                code=code,
+                existing_portfolios=existing,
+                thread_pool=self.thread_pool,
+            )
+
+        self.assertIs(asyncio.run(load("A")), existing["A"])
+        self.api.create_portfolio.assert_not_called()
+
+        asyncio.run(load("B"))
+        self.api.get_portfolio.assert_not_called()
+        self.api.create_portfolio.assert_called_once()
+
+
+class CocoonBatchLoaderPortfolioGroupTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.api_factory = MagicMock(spec=lusid.utilities.ApiClientFactory)
+        self.api = self.api_factory.build.return_value
+        self.thread_pool = ThreadPool(2).thread_pool
+
+    def group_request(self, codes):
+        self.api.get_portfolio_group.return_value = lusid.models.PortfolioGroup(
+            id=lusid.models.ResourceId(scope="groups", code="group"),
+            display_name="group",
+            portfolios=[lusid.models.ResourceId(scope="scope", code="A")],
+            sub_groups=[],
+        )
+
+        def add_portfolio_to_group(resource_id, **kwargs):
+            if resource_id.code == "C":
+                raise lusid.exceptions.ApiException(status=404, reason="Not Found")
+
+        self.api.add_portfolio_to_group.side_effect = add_portfolio_to_group
+
+        return lusid.models.CreatePortfolioGroupRequest(
+            code="group",
+            display_name="group",
+            values=[
+                lusid.models.ResourceId(scope="scope", code=code) for code in codes
+            ],
+        )
+
+    def load_group(self, **kwargs):
+        request = self.group_request(["A", "B", "C", "B"])
+
+        async def load():
+            return await BatchLoader.load_portfolio_group_batch(
+                self.api_factory,
+                [request],
+                scope="groups",
+                code="group",
+                thread_pool=self.thread_pool,
+                **kwargs,
+            )
+
+        return asyncio.run(load())
+
+    def test_load_portfolio_group_batch_only_adds_new_members(self) -> None:
+        group, failed = self.load_group(thread_pool_max_workers=2)
+
+        added = sorted(
+            call[1]["resource_id"].code
+            for call in self.api.add_portfolio_to_group.call_args_list
+        )
+        self.assertEqual(added, ["B", "C"])
+        self.assertEqual([resource.code for resource in group.portfolios], ["A", "B"])
+        self.assertEqual(list(failed.keys()), ["scope/C"])
+        self.assertEqual(failed["scope/C"].type, "Not Found")
+
+    def test_load_portfolio_group_batch_adds_members_in_shared_pool(self) -> None:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            member_pool = MagicMock(wraps=executor)
+            group, failed = self.load_group(member_pool=member_pool)
+
+        member_pool.map.assert_called_once()
+        self.assertEqual([resource.code for resource in group.portfolios], ["A", "B"])
+        self.assertEqual(list(failed.keys()), ["scope/C"])
+
+    def test_load_data_summarises_failed_members(self) -> None:
+        request = self.group_request(["B", "C"])
+
+        async def load():
+            return await _load_data(
+                api_factory=self.api_factory,
+                single_requests=[request],
+                file_type="portfolio_group",
+                scope="groups",
+                code="group",
+                thread_pool=self.thread_pool,
+                summary_only=True,
+            )
+
+        summary = asyncio.run(load())
+
+        self.assertEqual(summary["failed"], {"scope/C": "Not Found"})
+
+
+class CocoonSubHoldingKeyTests(unittest.TestCase):
+    def test_add_sub_holding_keys_only_patches_portfolios_without_them(self) -> None:
+        api_factory = MagicMock(spec=lusid.utilities.ApiClientFactory)
+        api = api_factory.build.return_value
+        sub_holding_keys = ["Transaction/scope/Strategy", "Transaction/scope/Trader"]
+        details = {
+            "A": list(reversed(sub_holding_keys)),
+            "B": [],
+            "C": ["Transaction/scope/Strategy"],
+        }
+        api.get_details.side_effect = lambda scope, code: SimpleNamespace(
+            sub_holding_keys=details[code]
+        )
+
+        patched = add_sub_holding_keys_to_portfolios(
+            api_factory, "scope", ["A", "B", "C"], sub_holding_keys, max_workers=2
+        )
+
+        self.assertEqual(patched, ["B", "C"])
+        self.assertEqual(
+            sorted(call[0][1] for call in api.patch_portfolio_details.call_args_list),
+            ["B", "C"],
+        )
+
+
+class CocoonSummaryOnlyTests(unittest.TestCase):
+    def test_summarise_batch_response_with_values_and_failures(self) -> None:
+        response = SimpleNamespace(
+            values={"a": object(), "b": object()},
+            failed={"c": SimpleNamespace(type="InvalidInstrumentDefinition")},
+        )
+
+        summary = _summarise_batch_response(
+            response=response,
+            request_count=3,
+            response_headers=[{"lusid-meta-requestId": "request-1"}],
+            latency=0.5,
+        )
+
+        self.assertEqual(summary["success_count"], 2)
+        self.assertEqual(summary["failed_count"], 1)
+        self.assertEqual(summary["correlation_ids"], ["a", "b"])
+        self.assertEqual(summary["failed"], {"c": "InvalidInstrumentDefinition"})
+        self.assertEqual(summary["request_ids"], ["request-1"])
+
+    def test_summarise_batch_response_without_values(self) -> None:
+        summary = _summarise_batch_response(
+            response=SimpleNamespace(version=1, href="href"),
+            request_count=4,
+            response_headers=[],
+            latency=0.1,
+            code="portfolio",
+        )
+
+        self.assertEqual(summary["success_count"], 4)
+        self.assertEqual(summary["failed_count"], 0)
+        self.assertEqual(summary["code"], "portfolio")
+
+    def test_load_data_captures_request_ids(self) -> None:
+        api_factory = MagicMock(spec=lusid.utilities.ApiClientFactory)
+        api = api_factory.build.return_value
+
+        def upsert_quotes(scope, request_body, call_info):
+            call_info({"lusid-meta-requestId": "request-1"})
+            return SimpleNamespace(values={"q1": object()}, failed={})
+
+        api.upsert_quotes.side_effect = upsert_quotes
+        quote = lusid.models.UpsertQuoteRequest(
+            quote_id=lusid.models.QuoteId(
+                quote_series_id=lusid.models.QuoteSeriesId(
+                    provider="Lusid",
+                    instrument_id="BBG000BLNNH6",
+                    instrument_id_type="Figi",
+                    quote_type="Price",
+                    field="mid",
+                ),
+                effective_at="2020-01-01T00:00:00Z",
+            )
+        )
+
+        async def load():
+            return await _load_data(
+                api_factory=api_factory,
+                single_requests=[quote],
+                file_type="quote",
+                scope="scope",
+                thread_pool=ThreadPool(1).thread_pool,
+                summary_only=True,
+            )
+
+        summary = asyncio.run(load())
+
+        self.assertEqual(summary["correlation_ids"], ["q1"])
+        self.assertEqual(summary["request_ids"], ["request-1"])
+
+
+def transactions_data_frame():
+    return pd.DataFrame(
+        {
+            "portfolio": ["A", "A", "A", "B", "B"],
+            "txn_id": [f"txn{i}" for i in range(5)],
+            "type": "Buy",
+            "trade_date": "2020-01-01T00:00:00Z",
+            "settle_date": "2020-01-03T00:00:00Z",
+            "units": 10.0,
+            "price": 1.5,
+            "amount": 15.0,
+            "currency": "GBP",
+            "figi": "BBG000BLNNH6",
+        }
+    )
+
+
+transactions_mapping = {
+    "code": "portfolio",
+    "transaction_id": "txn_id",
+    "type": "type",
+    "transaction_date": "trade_date",
+    "settlement_date": "settle_date",
+    "units": "units",
+    "transaction_price.price": "price",
+    "transaction_price.type": "$Price",
+    "total_consideration.amount": "amount",
+    "total_consideration.currency": "currency",
+}
+
+
+class CocoonExplainTests(unittest.TestCase):
+    def test_explain_transactions_sends_nothing(self) -> None:
+        api_factory = MagicMock(spec=lusid.utilities.ApiClientFactory)
+        api = api_factory.build.return_value
+
+        plan = load_from_data_frame(
+            api_factory=api_factory,
+            scope="scope",
+            data_frame=transactions_data_frame(),
+            mapping_required=dict(transactions_mapping),
+            mapping_optional={},
+            file_type="transactions",
+            identifier_mapping={"Figi": "figi"},
+            batch_size=2,
+            explain=True,
+        )["transactions"]
+
+        self.assertEqual(plan["sync_batches"], 2)
+        self.assertEqual(plan["async_batches"], 3)
+        self.assertEqual(plan["requests_per_endpoint"], {"upsert_transactions": 3})
+        self.assertEqual(plan["widest_sync_batch"], 2)
+        self.assertEqual(plan["longest_portfolio_chain"], 2)
+        self.assertEqual(plan["expected_concurrency"], 2)
+        self.assertEqual(list(plan["batches"]["rows"]), [2, 2, 1])
+        self.assertEqual(
+            plan["estimated_payload_bytes"], plan["batches"]["payload_bytes"].sum()
+        )
+        api.upsert_transactions.assert_not_called()
+
+
+class CocoonConversionProcessesTests(unittest.TestCase):
+    def load_transactions(self, **kwargs):
+        api_factory = MagicMock(spec=lusid.utilities.ApiClientFactory)
+        api = api_factory.build.return_value
+        api.api_client = lusid.ApiClient()
+
+        responses = load_from_data_frame(
+            api_factory=api_factory,
+            scope="scope",
+            data_frame=transactions_data_frame(),
+            mapping_required=dict(transactions_mapping),
+            mapping_optional={},
+            file_type="transactions",
+            identifier_mapping={"Figi": "figi"},
+            batch_size=2,
+            **kwargs,
+        )
+
+        def payloads(body):
+            # Batches converted in other processes are sent as encoded raw payloads
+            if isinstance(body, bytes):
+                return json.loads(body)
+            return api.api_client.sanitize_for_serialization(body)
+
+        requests = sorted(
+            [
+                (call[1]["code"], request["transactionId"], request["units"])
+                for call in api.upsert_transactions.call_args_list
+                for request in payloads(call[1]["transaction_request"])
+            ]
+        )
+        return responses, requests
+
+    def test_conversion_in_processes_matches_conversion_in_process(self) -> None:
+        _, expected = self.load_transactions()
+        responses, requests = self.load_transactions(conversion_processes=2)
+
+        self.assertEqual(len(responses["transactions"]["success"]), 3)
+        self.assertEqual(requests, expected)
+        self.assertEqual(len(requests), 5)
+
+    def test_conversion_in_processes_not_supported_for_file_type(self) -> None:
+        with self.assertRaises(ValueError):
+            load_from_data_frame(
+                api_factory=MagicMock(spec=lusid.utilities.ApiClientFactory),
+                scope="scope",
+                data_frame=pd.DataFrame({"name": ["Portfolio"]}),
+                mapping_required={"code": "name", "display_name": "name"},
+                mapping_optional={},
+                file_type="portfolios",
+                conversion_processes=2,
+            )
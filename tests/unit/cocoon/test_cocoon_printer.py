@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 import lusid
 import lusid.models as models
@@ -13,6 +14,8 @@ from lusidtools.cocoon.cocoon_printer import (
     get_portfolio_from_href,
     format_reference_portfolios_response,
     CocoonPrinter,
+    RESPONSE_SCHEMAS,
+    ERROR_DETAIL_SCHEMA,
 )
 from parameterized import parameterized
 
@@ -849,6 +852,65 @@ class CocoonPrinterTests(unittest.TestCase):
             err_extended=False,
         )
 
+    def test_format_instruments_response_with_columns(self):
+        succ, err, failed = format_instruments_response(
+            responses, columns=RESPONSE_SCHEMAS["instruments"]
+        )
+
+        self.assertEqual(list(succ.columns), RESPONSE_SCHEMAS["instruments"])
+        self.assertEqual(["LUID_01234567"] * 2, list(succ["lusid_instrument_id"]))
+        self.assertEqual(["name1"] * 2, list(succ["name"]))
+        self.assertEqual(ERROR_DETAIL_SCHEMA, list(failed.columns))
+        self.assertEqual(2, len(failed))
+        self.assertEqual(["not found"] * 2, list(err["error_items"]))
+
+    def test_format_instruments_response_without_details_when_empty(self):
+        succ, err, failed = format_instruments_response(empty_response_with_full_shape)
+
+        self.assertTrue(succ.empty)
+        self.assertEqual(list(succ.columns), [])
+        self.assertEqual(list(failed.columns), [])
+
+    def test_format_quotes_response_with_columns(self):
+        succ, err, failed = format_quotes_response(
+            responses, columns=RESPONSE_SCHEMAS["quotes"]
+        )
+
+        self.assertEqual(list(succ.columns), RESPONSE_SCHEMAS["quotes"])
+        self.assertEqual(
+            ["BBG001MM1KV4"] * 2, list(succ["quote_id.quote_series_id.instrument_id"]),
+        )
+        self.assertEqual(ERROR_DETAIL_SCHEMA, list(failed.columns))
+
+    def test_format_quotes_response_extracts_every_field_by_default(self):
+        succ, err, failed = format_quotes_response(responses)
+
+        self.assertIn("quote_id.quote_series_id.instrument_id", succ.columns)
+        self.assertIn("metric_value", succ.columns)
+        self.assertNotIn("metric_value.value", succ.columns)
+
+    def test_write_response(self):
+        printer = self.create_printer(responses, "instruments")
+
+        with tempfile.TemporaryDirectory() as directory:
+            paths = printer.write_response(directory, file_format="csv")
+
+            self.assertEqual(
+                [
+                    os.path.join(directory, f"instruments_{name}.csv")
+                    for name in ["success", "errors", "failed"]
+                ],
+                paths,
+            )
+            for path in paths:
+                self.assertTrue(os.path.exists(path))
+
+    def test_write_response_invalid_format(self):
+        printer = self.create_printer(responses, "instruments")
+
+        with self.assertRaises(ValueError):
+            printer.write_response(tempfile.gettempdir(), file_format="xlsx")
+
     def create_printer(
         self, response, entity_type, extended_errors=False, data_entity_details=False
     ):
@@ -0,0 +1,93 @@
+import asyncio
+import time
+import unittest
+
+import lusid
+
+from lusidtools.cocoon.concurrency import AdaptiveConcurrency, is_throttled
+from lusidtools.cocoon.metrics import (
+    BatchMetrics,
+    HistogramAggregator,
+    to_prometheus_text,
+)
+
+
+class CocoonAdaptiveConcurrencyTests(unittest.TestCase):
+    def test_increases_additively_while_healthy(self) -> None:
+        controller = AdaptiveConcurrency(initial=2, max_limit=10)
+
+        # Roughly one limit's worth of healthy batches increases the limit by one
+        for _ in range(2):
+            controller.record(time.monotonic(), 0.1, throttled=False)
+        self.assertEqual(controller.level, 2)
+
+        controller.record(time.monotonic(), 0.1, throttled=False)
+        self.assertEqual(controller.level, 3)
+
+    def test_decreases_multiplicatively_when_throttled(self) -> None:
+        controller = AdaptiveConcurrency(initial=8)
+        started = time.monotonic()
+
+        controller.record(started, 0.1, throttled=True)
+        self.assertEqual(controller.level, 4)
+
+        # A batch which was in flight with the one which triggered the decrease does not decrease it again
+        controller.record(started, 0.1, throttled=True)
+        self.assertEqual(controller.level, 4)
+
+        controller.record(time.monotonic(), 0.1, throttled=True)
+        self.assertEqual(controller.level, 2)
+
+    def test_decreases_when_latency_rises(self) -> None:
+        controller = AdaptiveConcurrency(initial=8, smoothing=1.0)
+
+        controller.record(time.monotonic(), 0.1, throttled=False)
+        controller.record(time.monotonic(), 1.0, throttled=False)
+
+        self.assertEqual(controller.level, 4)
+
+    def test_stays_within_limits(self) -> None:
+        controller = AdaptiveConcurrency(initial=2, min_limit=2, max_limit=3)
+
+        for _ in range(20):
+            controller.record(time.monotonic(), 0.1, throttled=False)
+        self.assertEqual(controller.level, 3)
+
+        for _ in range(5):
+            controller.record(time.monotonic(), 0.1, throttled=True)
+        self.assertEqual(controller.level, 2)
+
+    def test_limits_batches_in_flight(self) -> None:
+        controller = AdaptiveConcurrency(initial=2, max_limit=2)
+        in_flight = []
+
+        async def batch():
+            started = await controller.acquire()
+            in_flight.append(controller.in_flight)
+            await asyncio.sleep(0.01)
+            await controller.release(started, 0.01, throttled=False)
+
+        async def load():
+            await asyncio.gather(*[batch() for _ in range(6)])
+
+        asyncio.run(load())
+
+        self.assertEqual(max(in_flight), 2)
+        self.assertEqual(controller.in_flight, 0)
+
+    def test_is_throttled(self) -> None:
+        self.assertTrue(is_throttled(lusid.exceptions.ApiException(status=429)))
+        self.assertTrue(is_throttled(lusid.exceptions.ApiException(status=503)))
+        self.assertFalse(is_throttled(lusid.exceptions.ApiException(status=400)))
+        self.assertFalse(is_throttled("response"))
+
+    def test_concurrency_reported_through_metrics(self) -> None:
+        aggregator = HistogramAggregator()
+        aggregator(BatchMetrics("quote", concurrency=4))
+        aggregator(BatchMetrics("quote", concurrency=6))
+
+        self.assertEqual(aggregator.concurrency(), {"quote": 6})
+        self.assertIn(
+            'lusidtools_cocoon_concurrency{file_type="quote"} 6',
+            to_prometheus_text(aggregator),
+        )
@@ -0,0 +1,114 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import lusid
+import pandas as pd
+
+from lusidtools.cocoon.instrument_cache import InstrumentResolutionCache
+from lusidtools.cocoon.instruments import resolve_instruments
+
+
+class InstrumentResolutionCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cache = InstrumentResolutionCache(":memory:")
+
+    def tearDown(self) -> None:
+        self.cache.close()
+
+    def test_put_and_get(self) -> None:
+        self.cache.put("Figi", "BBG1", ["LUID_1"])
+        self.cache.put("Instrument/default/Figi", "BBG2", [])
+
+        self.assertEqual(self.cache.get("Instrument/default/Figi", "BBG1"), ["LUID_1"])
+        self.assertEqual(self.cache.get("instrument/default/Figi", "BBG1"), ["LUID_1"])
+        self.assertEqual(self.cache.get("Figi", "BBG2"), [])
+        self.assertIsNone(self.cache.get("Figi", "BBG3"))
+        self.assertIsNone(self.cache.get("Isin", "BBG1"))
+
+    def test_entries_are_keyed_by_effective_date(self) -> None:
+        self.cache.put("Figi", "BBG1", ["LUID_1"], effective_at="2020-01-01")
+
+        self.assertIsNone(self.cache.get("Figi", "BBG1"))
+        self.assertEqual(
+            self.cache.get("Figi", "BBG1", effective_at="2020-01-01"), ["LUID_1"]
+        )
+
+    def test_negative_entries_expire_first(self) -> None:
+        cache = InstrumentResolutionCache(
+            ":memory:", ttl_seconds=100, negative_ttl_seconds=10
+        )
+        with patch("time.time", return_value=1000):
+            cache.put_many("Figi", {"BBG1": ["LUID_1"], "BBG2": []})
+
+        with patch("time.time", return_value=1050):
+            self.assertEqual(
+                cache.get_many("Figi", ["BBG1", "BBG2"]), {"BBG1": ["LUID_1"]}
+            )
+            self.assertEqual(cache.purge_expired(), 1)
+
+        with patch("time.time", return_value=1200):
+            self.assertEqual(cache.get_many("Figi", ["BBG1", "BBG2"]), {})
+
+    def test_cache_persists_to_disk(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache", "instruments.sqlite")
+
+            cache = InstrumentResolutionCache(path)
+            cache.put("Figi", "BBG1", ["LUID_1"])
+            cache.close()
+
+            cache = InstrumentResolutionCache(path)
+            self.assertEqual(cache.get("Figi", "BBG1"), ["LUID_1"])
+            cache.close()
+
+    def test_resolve_instruments_uses_cache(self) -> None:
+        api_factory = MagicMock(spec=lusid.utilities.ApiClientFactory)
+        search_api = api_factory.build.return_value
+        self.cache.put("Figi", "BBG1", ["LUID_1"])
+        self.cache.put("Figi", "BBG2", [])
+
+        result = resolve_instruments(
+            api_factory,
+            data_frame=pd.DataFrame({"figi": ["BBG1", "BBG2"], "currency": [None] * 2}),
+            identifier_mapping={"Figi": "figi", "Currency": "currency"},
+            resolution_cache=self.cache,
+        )
+
+        search_api.instruments_search.assert_not_called()
+        self.assertEqual(list(result["LusidInstrumentId"]), ["LUID_1", None])
+        self.assertEqual(list(result["resolvable"]), [True, False])
+
+    def test_resolve_instruments_at_effective_date(self) -> None:
+        api_factory = MagicMock(spec=lusid.utilities.ApiClientFactory)
+        search_api = api_factory.build.return_value
+        search_api.instruments_search.return_value = [
+            MagicMock(
+                mastered_instruments=[
+                    MagicMock(
+                        identifiers={"LusidInstrumentId": MagicMock(value="LUID_2")}
+                    )
+                ]
+            )
+        ]
+        self.cache.put("Figi", "BBG1", ["LUID_1"])
+
+        result = resolve_instruments(
+            api_factory,
+            data_frame=pd.DataFrame({"figi": ["BBG1"], "currency": [None]}),
+            identifier_mapping={"Figi": "figi", "Currency": "currency"},
+            resolution_cache=self.cache,
+            effective_at="2020-01-01",
+        )
+
+        # The entry cached for the latest date is not used
+        self.assertEqual(
+            search_api.instruments_search.call_args[1]["mastered_effective_at"],
+            "2020-01-01",
+        )
+        self.assertEqual(list(result["LusidInstrumentId"]), ["LUID_2"])
+        self.assertEqual(
+            self.cache.get("Figi", "BBG1", effective_at="2020-01-01"), ["LUID_2"]
+        )
+        self.assertEqual(self.cache.get("Figi", "BBG1"), ["LUID_1"])
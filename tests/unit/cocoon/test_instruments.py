@@ -1,8 +1,18 @@
+import asyncio
 import logging
 import os
 import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import lusid
+import pandas as pd
 from lusidtools import logger
-from lusidtools.cocoon.instruments import prepare_key
+from lusidtools.cocoon.instruments import (
+    prepare_key,
+    enrich_instruments,
+    resolve_instruments,
+)
 from parameterized import parameterized
 
 
@@ -61,3 +71,163 @@ class CocoonUtilitiesTests(unittest.TestCase):
         logging.info(output_key, expected_outcome)
 
         self.assertEqual(output_key, expected_outcome)
+
+
+class CocoonEnrichInstrumentsTests(unittest.TestCase):
+    @staticmethod
+    def search_response(names_by_value):
+        """
+        Creates a side effect for instruments_search which returns an external instrument for known values
+
+        :param dict names_by_value: The instrument name keyed by the identifier value
+
+        :return: callable: The side effect
+        """
+
+        def instruments_search(instrument_search_property, **kwargs):
+            value = instrument_search_property[0].value
+            external = (
+                [SimpleNamespace(name=names_by_value[value])]
+                if value in names_by_value
+                else []
+            )
+            return [SimpleNamespace(external_instruments=external)]
+
+        return instruments_search
+
+    def test_enrich_instruments_deduplicates_and_short_circuits(self) -> None:
+        """
+        Tests that each identifier value is searched for once and that later identifiers are only used for
+        instruments which have not been named yet
+
+        :return: None
+        """
+        data_frame = pd.DataFrame(
+            {
+                "figi": ["BBG1", "BBG1", "BBG2", None, "BBG3"],
+                "isin": ["GB1", "GB1", "GB2", "GB4", "GB3"],
+            }
+        )
+
+        with patch("lusid.api.SearchApi") as search_api:
+            search_api.return_value.instruments_search.side_effect = self.search_response(
+                {"BBG1": "First", "BBG2": "Second", "GB4": "Fourth"}
+            )
+
+            data_frame, mapping_required = asyncio.run(
+                enrich_instruments(
+                    api_factory=MagicMock(),
+                    data_frame=data_frame,
+                    instrument_identifier_mapping={"Figi": "figi", "Isin": "isin"},
+                    mapping_required={},
+                    max_concurrent_searches=2,
+                )
+            )
+
+            searched = [
+                call[1]["instrument_search_property"][0].value
+                for call in search_api.return_value.instruments_search.call_args_list
+            ]
+
+        self.assertEqual(sorted(searched), ["BBG1", "BBG2", "BBG3", "GB3", "GB4"])
+        self.assertEqual(
+            list(data_frame["LUSID.Name.Enriched"].fillna("")),
+            ["First", "First", "Second", "Fourth", ""],
+        )
+        self.assertEqual(mapping_required, {"name": "LUSID.Name.Enriched"})
+
+
+class CocoonResolveInstrumentsTests(unittest.TestCase):
+    @staticmethod
+    def search_response(luids_by_value):
+        """
+        Creates a side effect for instruments_search which returns a mastered instrument for known values
+
+        :param dict luids_by_value: The LUID of the instrument keyed by the identifier value
+
+        :return: callable: The side effect
+        """
+
+        def instruments_search(instrument_search_property, **kwargs):
+            return [
+                SimpleNamespace(
+                    mastered_instruments=[
+                        SimpleNamespace(
+                            identifiers={
+                                "LusidInstrumentId": SimpleNamespace(
+                                    value=luids_by_value[search.value]
+                                )
+                            }
+                        )
+                    ]
+                    if search.value in luids_by_value
+                    else []
+                )
+                for search in instrument_search_property
+            ]
+
+        return instruments_search
+
+    def test_resolve_instruments_searches_each_unique_instrument_once(self) -> None:
+        """
+        Tests that rows with identical identifiers are resolved with a single search
+
+        :return: None
+        """
+        api_factory = MagicMock(spec=lusid.utilities.ApiClientFactory)
+        search_api = api_factory.build.return_value
+        search_api.instruments_search.side_effect = self.search_response(
+            {"BBG1": "LUID_1", "BBG2": "LUID_2"}
+        )
+
+        data_frame = pd.DataFrame(
+            {
+                "figi": ["BBG1", "BBG2", "BBG1", "BBG9", None, "BBG2"],
+                "currency": [None, None, None, None, "GBP", None],
+            }
+        )
+
+        result = resolve_instruments(
+            api_factory,
+            data_frame=data_frame,
+            identifier_mapping={"Figi": "figi", "Currency": "currency"},
+        )
+
+        self.assertEqual(search_api.instruments_search.call_count, 4)
+        self.assertEqual(
+            list(result["LusidInstrumentId"]),
+            ["LUID_1", "LUID_2", "LUID_1", None, "GBP", "LUID_2"],
+        )
+        self.assertEqual(
+            list(result["resolvable"]), [True, True, True, False, True, True]
+        )
+        self.assertEqual(
+            list(result["foundWith"]),
+            [["Figi"], ["Figi"], ["Figi"], [], ["GBP"], ["Figi"]],
+        )
+        self.assertEqual(
+            result["comment"].iloc[3], "No instruments found for the given identifiers"
+        )
+
+    def test_resolve_instruments_retries_failed_searches(self) -> None:
+        """
+        Tests that a search which fails is retried and then succeeds
+
+        :return: None
+        """
+        api_factory = MagicMock(spec=lusid.utilities.ApiClientFactory)
+        search_api = api_factory.build.return_value
+        search_api.instruments_search.side_effect = [
+            lusid.exceptions.ApiException(status=429, reason="Too Many Requests"),
+            self.search_response({"BBG1": "LUID_1"})([SimpleNamespace(value="BBG1")]),
+        ]
+
+        result = resolve_instruments(
+            api_factory,
+            data_frame=pd.DataFrame({"figi": ["BBG1"], "currency": [None]}),
+            identifier_mapping={"Figi": "figi", "Currency": "currency"},
+            backoff_seconds=0,
+        )
+
+        self.assertEqual(search_api.instruments_search.call_count, 2)
+        self.assertEqual(result["LusidInstrumentId"].iloc[0], "LUID_1")
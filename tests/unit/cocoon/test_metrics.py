@@ -0,0 +1,116 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import lusid
+
+from lusidtools.cocoon.async_tools import ThreadPool
+from lusidtools.cocoon.cocoon import _load_data
+from lusidtools.cocoon.metrics import (
+    BatchMetrics,
+    HistogramAggregator,
+    to_prometheus_text,
+)
+
+
+class CocoonMetricsTests(unittest.TestCase):
+    def test_histogram_aggregator(self) -> None:
+        aggregator = HistogramAggregator(buckets=[1, 5])
+
+        aggregator(BatchMetrics("quote", rows=10, latency=0.5, queue_wait=0.1))
+        aggregator(BatchMetrics("quote", rows=20, latency=2, queue_wait=0.1))
+        aggregator(BatchMetrics("quote", rows=5, latency=10, outcome="error"))
+
+        series = aggregator.series()
+        self.assertEqual(series[("quote", "success")]["batches"], 2)
+        self.assertEqual(series[("quote", "success")]["rows"], 30)
+        self.assertEqual(series[("quote", "success")]["latency"]["buckets"], [1, 1, 0])
+        self.assertEqual(series[("quote", "error")]["latency"]["buckets"], [0, 0, 1])
+        # Batches without a server duration are not counted in its histogram
+        self.assertEqual(series[("quote", "success")]["server_duration"]["count"], 0)
+
+        summary = aggregator.summary()
+        self.assertEqual(list(summary["batches"]), [2, 1])
+        self.assertEqual(list(summary["mean_latency"]), [1.25, 10])
+
+    def test_to_prometheus_text(self) -> None:
+        aggregator = HistogramAggregator(buckets=[1, 5])
+        aggregator(BatchMetrics("quote", rows=10, latency=0.5))
+        aggregator(BatchMetrics("quote", rows=20, latency=2))
+
+        text = to_prometheus_text(aggregator)
+
+        labels = 'file_type="quote",outcome="success"'
+        self.assertIn("# TYPE lusidtools_cocoon_rows_total counter", text)
+        self.assertIn(f"lusidtools_cocoon_rows_total{{{labels}}} 30", text)
+        self.assertIn(
+            f'lusidtools_cocoon_batch_latency_seconds_bucket{{{labels},le="1"}} 1', text
+        )
+        self.assertIn(
+            f'lusidtools_cocoon_batch_latency_seconds_bucket{{{labels},le="+Inf"}} 2',
+            text,
+        )
+        self.assertIn(
+            f"lusidtools_cocoon_batch_latency_seconds_count{{{labels}}} 2", text
+        )
+
+    def load_quote(self):
+        api_factory = MagicMock(spec=lusid.utilities.ApiClientFactory)
+        api = api_factory.build.return_value
+
+        def upsert_quotes(scope, request_body, call_info):
+            call_info({"lusid-meta-duration": "250"})
+            return SimpleNamespace(
+                values={}, failed={"q1": SimpleNamespace(type="InvalidQuote")}
+            )
+
+        api.upsert_quotes.side_effect = upsert_quotes
+        quote = lusid.models.UpsertQuoteRequest(
+            quote_id=lusid.models.QuoteId(
+                quote_series_id=lusid.models.QuoteSeriesId(
+                    provider="Lusid",
+                    instrument_id="BBG000BLNNH6",
+                    instrument_id_type="Figi",
+                    quote_type="Price",
+                    field="mid",
+                ),
+                effective_at="2020-01-01T00:00:00Z",
+            )
+        )
+        reported = []
+
+        async def load():
+            return await _load_data(
+                api_factory=api_factory,
+                single_requests=[quote],
+                file_type="quote",
+                scope="scope",
+                thread_pool=ThreadPool(1).thread_pool,
+                metrics_hooks=[reported.append],
+            )
+
+        asyncio.run(load())
+        return reported
+
+    def test_load_data_reports_batch_metrics(self) -> None:
+        reported = self.load_quote()
+
+        self.assertEqual(len(reported), 1)
+        metrics = reported[0]
+        self.assertEqual(metrics.file_type, "quote")
+        self.assertEqual(metrics.rows, 1)
+        self.assertEqual(metrics.calls, 1)
+        self.assertEqual(metrics.server_duration, 0.25)
+        self.assertEqual(metrics.outcome, "partial_failure")
+        self.assertGreater(metrics.payload_bytes, 0)
+        self.assertGreaterEqual(metrics.queue_wait, 0)
+
+    def test_payload_bytes_reuses_one_client(self) -> None:
+        with patch("lusidtools.cocoon.cocoon._serialisation_client", None), patch(
+            "lusid.ApiClient", wraps=lusid.ApiClient
+        ) as api_client:
+            reported = self.load_quote() + self.load_quote()
+
+        self.assertEqual(api_client.call_count, 1)
+        self.assertEqual(reported[0].payload_bytes, reported[1].payload_bytes)
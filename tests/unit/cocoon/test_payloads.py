@@ -0,0 +1,277 @@
+import json
+import unittest
+from unittest.mock import MagicMock
+
+import lusid
+import pandas as pd
+from parameterized import parameterized
+
+from lusidtools import cocoon
+from lusidtools.cocoon.cocoon import _convert_batch_to_models, load_from_data_frame
+from lusidtools.cocoon.payloads import (
+    EncodedRESTClient,
+    compile_mapping,
+    convert_batch_to_payloads,
+    dumps,
+    encode_body,
+)
+
+domain_lookup = cocoon.utilities.load_json_file("config/domain_settings.json")
+
+transactions = pd.DataFrame(
+    {
+        "txn_id": ["txn1", "txn2"],
+        "type": ["Buy", "Sell"],
+        "trade_date": ["2020-01-01T00:00:00Z", "2020-01-02T00:00:00Z"],
+        "settle_date": ["2020-01-03T00:00:00Z", "2020-01-04T00:00:00Z"],
+        "units": [10.0, 20.0],
+        "price": [1.5, None],
+        "price_type": ["Price", None],
+        "amount": [15.0, 30.0],
+        "currency": ["GBP", "USD"],
+        "figi": ["BBG000BLNNH6", None],
+        "client_id": ["C1", "C2"],
+        "strategy": ["Income", None],
+        "rating": [1.0, 2.0],
+    }
+)
+
+transaction_mappings = {
+    "mapping_required": {
+        "transaction_id": "txn_id",
+        "type": "type",
+        "transaction_date": "trade_date",
+        "settlement_date": "settle_date",
+        "units": "units",
+        "total_consideration.amount": "amount",
+        "total_consideration.currency": "currency",
+    },
+    "mapping_optional": {
+        "transaction_price.price": "price",
+        "transaction_price.type": "price_type",
+    },
+}
+
+holdings = pd.DataFrame(
+    {
+        "figi": ["BBG000BLNNH6", "BBG000C6K6G9"],
+        "units": [100.0, 200.0],
+        "cost": [1000.0, None],
+        "currency": ["GBP", "GBP"],
+        "purchase_date": ["2020-01-01T00:00:00Z", "2020-01-02T00:00:00Z"],
+        "strategy": ["Income", "Growth"],
+    }
+)
+
+holding_mappings = {
+    "mapping_required": {"tax_lots.units": "units",},
+    "mapping_optional": {
+        "tax_lots.cost.amount": "cost",
+        "tax_lots.cost.currency": "currency",
+        "tax_lots.purchase_date": "purchase_date",
+        "currency": "currency",
+    },
+}
+
+quotes = pd.DataFrame(
+    {
+        "instrument": ["BBG000BLNNH6", "BBG000C6K6G9"],
+        "date": ["2020-01-01T00:00:00Z", "2020-01-02T00:00:00Z"],
+        "price": [101.5, 99.25],
+        "currency": ["GBP", "USD"],
+        "provider": "Lusid",
+        "id_type": "Figi",
+        "quote_type": "Price",
+        "field": "mid",
+    }
+)
+
+quote_mappings = {
+    "mapping_required": {
+        "quote_id.quote_series_id.provider": "provider",
+        "quote_id.quote_series_id.instrument_id": "instrument",
+        "quote_id.quote_series_id.instrument_id_type": "id_type",
+        "quote_id.quote_series_id.quote_type": "quote_type",
+        "quote_id.quote_series_id.field": "field",
+        "quote_id.effective_at": "date",
+        "metric_value.value": "price",
+    },
+    "mapping_optional": {"metric_value.unit": "currency"},
+}
+
+
+class CocoonPayloadsTests(unittest.TestCase):
+    @parameterized.expand(
+        [
+            [
+                "transactions",
+                transactions,
+                transaction_mappings,
+                "transaction",
+                {"Figi": "figi", "ClientInternal": "client_id"},
+                ["strategy", "rating"],
+                [],
+            ],
+            [
+                "holdings",
+                holdings,
+                holding_mappings,
+                "holding",
+                {"Figi": "figi"},
+                [],
+                ["strategy"],
+            ],
+            ["quotes", quotes, quote_mappings, "quote", {}, [], []],
+        ]
+    )
+    def test_payloads_match_serialised_models(
+        self,
+        _,
+        data_frame,
+        mappings,
+        file_type,
+        identifier_mapping,
+        property_columns,
+        sub_holding_keys,
+    ) -> None:
+        arguments = dict(
+            data_frame=data_frame,
+            property_columns=[
+                {"source": column, "target": column} for column in property_columns
+            ],
+            properties_scope="scope",
+            instrument_identifier_mapping=identifier_mapping,
+            file_type=file_type,
+            domain_lookup=domain_lookup,
+            sub_holding_keys=sub_holding_keys,
+            sub_holding_keys_scope="scope",
+            unique_identifiers=["Figi", "ClientInternal"],
+            full_key_format=domain_lookup[file_type]["full_key_format"],
+        )
+
+        models = _convert_batch_to_models(
+            mapping_required=dict(mappings["mapping_required"]),
+            mapping_optional=dict(mappings["mapping_optional"]),
+            **arguments,
+        )
+        payloads = convert_batch_to_payloads(
+            mapping_required=dict(mappings["mapping_required"]),
+            mapping_optional=dict(mappings["mapping_optional"]),
+            **arguments,
+        )
+
+        # The payloads are what the SDK sends for the models
+        self.assertEqual(
+            json.loads(
+                json.dumps(lusid.ApiClient().sanitize_for_serialization(models))
+            ),
+            payloads,
+        )
+
+    def test_compile_mapping_is_cached(self) -> None:
+        compiled = compile_mapping(
+            "TransactionRequest",
+            transaction_mappings["mapping_required"],
+            transaction_mappings["mapping_optional"],
+        )
+
+        self.assertIs(
+            compile_mapping(
+                "TransactionRequest",
+                dict(transaction_mappings["mapping_required"]),
+                dict(transaction_mappings["mapping_optional"]),
+            ),
+            compiled,
+        )
+
+    def test_compile_mapping_checks_required_attributes(self) -> None:
+        with self.assertRaises(ValueError) as context:
+            compile_mapping(
+                "TransactionRequest",
+                {"transaction_id": "txn_id", "total_consideration.amount": "amount"},
+                {},
+            )
+
+        self.assertIn("currency", str(context.exception))
+
+    def test_row_missing_required_value_raises(self) -> None:
+        data_frame = transactions.copy()
+        data_frame.loc[1, "units"] = None
+
+        with self.assertRaises(ValueError) as context:
+            convert_batch_to_payloads(
+                data_frame=data_frame,
+                mapping_required=transaction_mappings["mapping_required"],
+                mapping_optional={},
+                property_columns=[],
+                properties_scope="scope",
+                instrument_identifier_mapping={"Figi": "figi"},
+                file_type="transaction",
+                domain_lookup=domain_lookup,
+                sub_holding_keys=[],
+                sub_holding_keys_scope="scope",
+                full_key_format=True,
+            )
+
+        self.assertIn("index 1", str(context.exception))
+
+    def test_load_quotes_from_raw_payloads(self) -> None:
+        api_factory = MagicMock(spec=lusid.utilities.ApiClientFactory)
+        api = api_factory.build.return_value
+        api.api_client = lusid.ApiClient()
+
+        load_from_data_frame(
+            api_factory=api_factory,
+            scope="scope",
+            data_frame=quotes,
+            mapping_required=dict(quote_mappings["mapping_required"]),
+            mapping_optional=dict(quote_mappings["mapping_optional"]),
+            file_type="quotes",
+            raw_payloads=True,
+        )
+
+        # The payloads are sent already encoded, through a client which leaves them as they are
+        self.assertIsInstance(api.api_client.rest_client, EncodedRESTClient)
+        request_body = json.loads(api.upsert_quotes.call_args[1]["request_body"])
+        self.assertEqual(
+            list(request_body.keys()),
+            [
+                "BBG000BLNNH6_Figi_2020-01-01T00:00:00Z",
+                "BBG000C6K6G9_Figi_2020-01-02T00:00:00Z",
+            ],
+        )
+        self.assertEqual(
+            request_body["BBG000BLNNH6_Figi_2020-01-01T00:00:00Z"]["metricValue"],
+            {"value": 101.5, "unit": "GBP"},
+        )
+
+    def test_encoded_body_sent_as_it_is(self) -> None:
+        api = lusid.api.TransactionPortfoliosApi(lusid.ApiClient())
+        payloads = [{"transactionId": "txn1", "units": 10.0}]
+        body = encode_body(api, payloads)
+        pool_manager = api.api_client.rest_client.pool_manager = MagicMock()
+        pool_manager.request.return_value.status = 200
+
+        api.upsert_transactions(
+            scope="scope",
+            code="code",
+            transaction_request=body,
+            _preload_content=False,
+        )
+
+        self.assertEqual(pool_manager.request.call_args[1]["body"], dumps(payloads))
+        self.assertIn(
+            "json", pool_manager.request.call_args[1]["headers"]["Content-Type"]
+        )
+
+    def test_raw_payloads_not_supported_for_file_type(self) -> None:
+        with self.assertRaises(ValueError):
+            load_from_data_frame(
+                api_factory=MagicMock(spec=lusid.utilities.ApiClientFactory),
+                scope="scope",
+                data_frame=pd.DataFrame({"name": ["Portfolio"]}),
+                mapping_required={"code": "name", "display_name": "name"},
+                mapping_optional={},
+                file_type="portfolios",
+                raw_payloads=True,
+            )
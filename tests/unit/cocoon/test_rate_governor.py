@@ -0,0 +1,130 @@
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+import lusid
+from parameterized import parameterized
+
+from lusidtools.cocoon.rate_governor import (
+    RateGovernor,
+    GovernedApiFactory,
+    endpoint_family,
+)
+
+
+def throttled(retry_after="0.01"):
+    error = lusid.exceptions.ApiException(status=429, reason="Too Many Requests")
+    error.headers = {"Retry-After": retry_after}
+    return error
+
+
+class CocoonRateGovernorTests(unittest.TestCase):
+    @parameterized.expand(
+        [
+            ["upsert_instruments", "write"],
+            ["batch_upsert_transactions", "write"],
+            ["instruments_search", "search"],
+            ["get_portfolio", "read"],
+            ["list_portfolios_for_scope", "read"],
+        ]
+    )
+    def test_endpoint_family(self, endpoint, family) -> None:
+        self.assertEqual(endpoint_family(endpoint), family)
+
+    def test_retries_throttled_call_after_retry_after(self) -> None:
+        governor = RateGovernor()
+        function = MagicMock(side_effect=[throttled("0.05"), "response"])
+        retries = []
+
+        start = time.monotonic()
+        response = governor.call("upsert_quotes", function, on_retry=retries.append)
+
+        self.assertEqual(response, "response")
+        self.assertEqual(len(retries), 1)
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+
+    def test_raises_once_retries_exhausted(self) -> None:
+        governor = RateGovernor(max_retries=1)
+        function = MagicMock(side_effect=[throttled(), throttled()])
+
+        with self.assertRaises(lusid.exceptions.ApiException):
+            governor.call("upsert_quotes", function)
+
+        self.assertEqual(function.call_count, 2)
+
+    def test_does_not_retry_other_errors(self) -> None:
+        governor = RateGovernor()
+        function = MagicMock(
+            side_effect=lusid.exceptions.ApiException(status=400, reason="Bad Request")
+        )
+
+        with self.assertRaises(lusid.exceptions.ApiException):
+            governor.call("upsert_quotes", function)
+
+        self.assertEqual(function.call_count, 1)
+
+    def test_limits_rate_of_family(self) -> None:
+        governor = RateGovernor(limits={"write": {"rate": 50, "burst": 1}})
+
+        start = time.monotonic()
+        for _ in range(4):
+            governor.call("upsert_quotes", lambda: None)
+
+        # The first call uses the burst, the remaining three wait for a token each
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+
+    def test_governed_api_factory_counts_retries(self) -> None:
+        api_factory = MagicMock(spec=lusid.utilities.ApiClientFactory)
+        api_factory.build.return_value.upsert_quotes.side_effect = [
+            throttled(),
+            "response",
+        ]
+        governed = GovernedApiFactory(api_factory, RateGovernor())
+
+        response = governed.build(lusid.api.QuotesApi).upsert_quotes(scope="scope")
+
+        self.assertEqual(response, "response")
+        self.assertEqual(governed.retries, 1)
+        self.assertIsInstance(governed, lusid.utilities.ApiClientFactory)
+
+    def test_governor_owns_the_retries_of_built_apis(self) -> None:
+        api_factory = lusid.utilities.ApiClientFactory(
+            token="token", api_url="http://localhost"
+        )
+        governed = GovernedApiFactory(api_factory, RateGovernor(max_retries=2))
+
+        def request(*args, **kwargs):
+            error = throttled("0")
+            error.body = b""
+            raise error
+
+        with patch.object(
+            lusid.rest.RESTClientObject, "request", side_effect=request
+        ) as request:
+            with self.assertRaises(lusid.exceptions.ApiException):
+                governed.build(lusid.api.PortfoliosApi).get_portfolio(
+                    scope="scope", code="code"
+                )
+
+        # One call and two retries by the governor, none by @lusidretry
+        self.assertEqual(request.call_count, 3)
+        self.assertEqual(governed.retries, 2)
+
+    def test_governed_api_passes_call_info(self) -> None:
+        api_factory = lusid.utilities.ApiClientFactory(
+            token="token", api_url="http://localhost"
+        )
+        governed = GovernedApiFactory(api_factory, RateGovernor())
+        api = governed.build(lusid.api.PortfoliosApi)
+        headers = {"lusid-meta-requestId": "request"}
+        call_info = MagicMock()
+
+        with patch.object(
+            lusid.ApiClient, "call_api", return_value=("portfolio", 200, headers)
+        ):
+            response = api.get_portfolio(
+                scope="scope", code="code", call_info=lambda info: call_info(info)
+            )
+
+        self.assertEqual(response, "portfolio")
+        call_info.assert_called_once_with(headers)
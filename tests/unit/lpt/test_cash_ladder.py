@@ -0,0 +1,106 @@
+import datetime
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from parameterized import parameterized
+
+from lusidtools.lpt import cash_ladder
+from lusidtools.lpt.either import Either
+from lusidtools.lpt.record import Rec
+
+
+def holding(uid, holding_type, units, settlement_date=None):
+    return SimpleNamespace(
+        instrument_uid=uid,
+        holding_type=holding_type,
+        units=units,
+        transaction=SimpleNamespace(
+            type="Buy",
+            settlement_date=datetime.datetime(
+                *settlement_date, tzinfo=datetime.timezone.utc
+            ),
+        )
+        if settlement_date
+        else None,
+    )
+
+
+def holdings_api():
+    holdings = [
+        holding("CCY_GBP", "B", 1000.0),
+        holding("LUID_X", "P", 5.0),
+        holding("CCY_GBP", "C", -100.0, (2020, 1, 3)),
+        holding("CCY_USD", "R", 50.0, (2020, 1, 2)),
+        holding("CCY_GBP", "A", 10.0, (2020, 1, 3)),
+    ]
+
+    def get_holdings(scope, code, effective_at):
+        values = holdings if code != "empty" else []
+        return Either.Right(Rec(content=SimpleNamespace(values=values)))
+
+    api = MagicMock()
+    api.call.get_holdings.side_effect = get_holdings
+    return api
+
+
+class CashLadderTests(unittest.TestCase):
+    def test_cash_ladder(self) -> None:
+        df = cash_ladder.cash_ladder(holdings_api(), "s", "p1", "2020-01-01").right
+
+        self.assertEqual(
+            [str(d) for d in df.columns], ["2020-01-01", "2020-01-02", "2020-01-03"]
+        )
+        self.assertEqual(
+            df.loc[("CCY_GBP", 6, "GBP Summary")].tolist(), [1000.0, 1000.0, 910.0]
+        )
+        self.assertEqual(
+            df.loc[("CCY_USD", 1, "Opening Cash Balance")].tolist(), [0.0, 0.0, 50.0]
+        )
+        self.assertEqual(
+            df.loc[("CCY_GBP", 2, "Trades to settle")].tolist(), [0.0, 0.0, -100.0]
+        )
+
+    @parameterized.expand([["serial", 1], ["parallel", 4]])
+    def test_cash_ladders_for_horizon(self, _, parallel) -> None:
+        api = holdings_api()
+
+        df = cash_ladder.cash_ladders(
+            api, [("s", "p1"), ("s", "p2")], "2020-01-01", days=5, parallel=parallel
+        ).right
+
+        self.assertEqual(api.call.get_holdings.call_count, 2)
+        self.assertEqual(len(df.columns), 5)
+        self.assertEqual(
+            list(df.index.get_level_values("portfolio").unique()), ["p1", "p2"]
+        )
+        self.assertEqual(
+            df.loc[("s", "p2", "CCY_GBP", 6, "GBP Summary")].tolist(),
+            [1000.0, 1000.0, 910.0, 910.0, 910.0],
+        )
+
+    def test_process_args(self) -> None:
+        args = cash_ladder.parse(args=["s", "p1,empty", "2020-01-01", "--days", "2"])
+
+        df = cash_ladder.process_args(holdings_api(), args).right
+
+        self.assertEqual(
+            list(df.columns),
+            [
+                "scope",
+                "portfolio",
+                "instrument_uid",
+                "sort",
+                "holding_type",
+                "2020-01-01",
+                "2020-01-02",
+            ],
+        )
+        self.assertEqual(set(df["portfolio"]), {"p1"})
+
+    def test_no_cash_holdings(self) -> None:
+        args = cash_ladder.parse(args=["s", "empty", "2020-01-01"])
+
+        self.assertEqual(
+            cash_ladder.process_args(holdings_api(), args).right, "No cash holdings"
+        )
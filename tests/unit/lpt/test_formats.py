@@ -0,0 +1,92 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+from parameterized import parameterized
+
+from lusidtools.lpt import formats
+from lusidtools.lpt import lpt
+
+
+def holdings():
+    return pd.DataFrame(
+        {
+            "instrument": ["BBG000BLNNH6", "BBG000C6K6G9", "BBG000BVPXP1"],
+            "units": [100.0, None, 300.0],
+            "count": [1, 2, 3],
+            "effective_date": pd.to_datetime(["2020-01-01", "2020-01-02", None]),
+        }
+    )
+
+
+def has_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        return False
+    return True
+
+
+class LptFormatsTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.folder)
+
+    @parameterized.expand(
+        [
+            ["holdings.csv", "csv"],
+            ["holdings.csv.gz", "csv"],
+            ["holdings.csv.zst", "csv"],
+            ["holdings.txt", "csv"],
+            ["holdings.xlsx", "excel"],
+            ["holdings.xlsx:Sheet1", "excel"],
+            ["holdings.pk", "pickle"],
+            ["holdings.parquet", "parquet"],
+            ["HOLDINGS.PQ", "parquet"],
+            ["holdings.feather", "feather"],
+            ["holdings.arrow", "feather"],
+        ]
+    )
+    def test_file_format(self, path, expected) -> None:
+        self.assertEqual(formats.file_format(path), expected)
+
+    def test_compressed_csv_round_trip(self) -> None:
+        path = os.path.join(self.folder, "holdings.csv.gz")
+
+        formats.write_frame(holdings(), path)
+
+        with gzip.open(path, "rt") as f:
+            self.assertTrue(f.readline().startswith("instrument,units"))
+        df = lpt.read_input(path)
+        self.assertEqual(list(df["instrument"]), list(holdings()["instrument"]))
+
+    @parameterized.expand(
+        [
+            ["pickle", "holdings.pk"],
+            ["parquet", "holdings.parquet"],
+            ["feather", "holdings.feather"],
+        ]
+    )
+    def test_typed_round_trip(self, fmt, filename) -> None:
+        if fmt != "pickle" and not has_pyarrow():
+            self.skipTest("pyarrow is not installed")
+        path = os.path.join(self.folder, filename)
+
+        formats.write_frame(holdings(), path)
+
+        pd.testing.assert_frame_equal(lpt.read_input(path), holdings())
+
+    def test_columnar_read_converts_dtype(self) -> None:
+        with patch("pandas.read_parquet", return_value=holdings()) as read_parquet:
+            df = formats.read_frame("holdings.parquet", dtype=str, nrows=2)
+
+        read_parquet.assert_called_once_with("holdings.parquet", columns=None)
+        self.assertEqual(list(df["count"]), ["1", "2"])
+        self.assertEqual(df["units"][0], "100.0")
+        self.assertTrue(pd.isna(df["units"][1]))
@@ -1,9 +1,19 @@
+import argparse
+import io
+import os
+import tempfile
+import time
 import unittest
-from unittest.mock import patch
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
 
+import lusid
+import pandas as pd
 from parameterized import parameterized
 
 from lusidtools.lpt import lpt
+from lusidtools.lpt.either import Either
+from lusidtools.lpt.record import Rec
 
 
 class LptTests(unittest.TestCase):
@@ -242,3 +252,357 @@ class LptTests(unittest.TestCase):
             lpt.is_path_supported_excel_with_sheet(input_path),
             input_path + " should not be a valid excel path with a sheet.",
         )
+
+
+transaction_json = {
+    "transactionId": "txn1",
+    "type": "Buy",
+    "instrumentUid": "LUID_1",
+    "transactionDate": "2020-01-01T00:00:00.0000000+00:00",
+    "settlementDate": "2020-01-03T00:00:00.0000000+00:00",
+    "units": 10.0,
+    "transactionPrice": {"price": 1.5, "type": "Price"},
+    "totalConsideration": {"amount": 15.0, "currency": "GBP"},
+    "properties": {
+        "Instrument/default/Name": {
+            "key": "Instrument/default/Name",
+            "value": {"labelValue": "Acme"},
+        },
+        "Transaction/default/Rate": {
+            "key": "Transaction/default/Rate",
+            "value": {"metricValue": {"value": 1.25}},
+        },
+    },
+}
+
+
+class LptJsonTests(unittest.TestCase):
+    columns = [
+        "transaction_id",
+        "instrument_uid",
+        "transaction_date",
+        "units",
+        "transaction_price.price",
+        "total_consideration.currency",
+        "exchange_rate",
+        "P:Instrument/default/Name",
+        "P:Transaction/default/Rate",
+        "P:Transaction/default/Missing",
+    ]
+
+    def test_json_to_df_matches_to_df(self):
+        data = {"values": [transaction_json, {**transaction_json, "properties": {}}]}
+        models = lusid.ApiClient()._ApiClient__deserialize(
+            data, "ResourceListOfTransaction"
+        )
+
+        df = lpt.json_to_df(
+            data, self.columns, lusid.models.Transaction, lusid.models.__dict__
+        )
+        expected = lpt.to_df(models.values, self.columns)
+
+        self.assertEqual(list(df.columns), self.columns)
+        pd.testing.assert_frame_equal(
+            df.drop(columns="transaction_date"),
+            expected.drop(columns="transaction_date"),
+        )
+        self.assertEqual(
+            list(df["transaction_date"]),
+            list(lpt.to_date(expected["transaction_date"])),
+        )
+
+    def test_json_to_columns_without_schema(self):
+        columns = lpt.json_to_columns(
+            [transaction_json], ["total_consideration.amount", "P:Missing"], None, {}
+        )
+
+        self.assertEqual(
+            columns, {"total_consideration.amount": [15.0], "P:Missing": [None]}
+        )
+
+
+class LptToDfTests(unittest.TestCase):
+    def test_to_df_accessors(self):
+        version = lusid.models.Version(
+            effective_from="2020-01-01T00:00:00Z", as_at_date="2020-01-01T00:00:00Z"
+        )
+        instruments = [
+            lusid.models.Instrument(
+                lusid_instrument_id="LUID_1",
+                version=version,
+                name="Acme",
+                identifiers={"Figi": "BBG000BLNNH6"},
+                state="Active",
+                properties=[
+                    lusid.models.ModelProperty(
+                        key="Instrument/default/Sector",
+                        value=lusid.models.PropertyValue(label_value="Tech"),
+                    ),
+                    lusid.models.ModelProperty(
+                        key="Instrument/default/Rating",
+                        value=lusid.models.PropertyValue(
+                            metric_value=lusid.models.MetricValue(value=2.0)
+                        ),
+                    ),
+                ],
+            ),
+            lusid.models.Instrument(
+                lusid_instrument_id="LUID_2",
+                version=version,
+                name="Widgets",
+                identifiers={},
+                state="Active",
+            ),
+        ]
+
+        df = lpt.to_df(
+            instruments,
+            [
+                "name",
+                "identifiers.KEY:Figi",
+                "P:Instrument/default/Sector",
+                "P:Instrument/default/Rating",
+                "P:Instrument/default/Missing",
+                "SHK:Transaction/default/Strategy",
+            ],
+        )
+
+        self.assertEqual(df["P:Instrument/default/Rating"][0], 2.0)
+        self.assertTrue(pd.isna(df["P:Instrument/default/Rating"][1]))
+        self.assertEqual(
+            df.drop(columns="P:Instrument/default/Rating").to_dict("list"),
+            {
+                "name": ["Acme", "Widgets"],
+                "identifiers.KEY:Figi": ["BBG000BLNNH6", None],
+                "P:Instrument/default/Sector": ["Tech", None],
+                "P:Instrument/default/Missing": [None, None],
+                "SHK:Transaction/default/Strategy": [None, None],
+            },
+        )
+
+    def test_to_df_empty(self):
+        df = lpt.to_df([], ["name", "P:Instrument/default/Name"])
+
+        self.assertEqual(list(df.columns), ["name", "P:Instrument/default/Name"])
+        self.assertEqual(len(df), 0)
+
+
+class LptFromDfTests(unittest.TestCase):
+    uids = [
+        "CCY_GBP",
+        "Ccy:USD",
+        "Currency:EUR",
+        "ClientInternal:C1",
+        "Figi:BBG000BLNNH6",
+        "RIC:VOD.L",
+        "Instrument/custom/Isin:GB0001",
+        "LUID_1",
+        "Instrument:a:b",
+    ]
+
+    def test_to_instrument_identifiers_list(self):
+        self.assertEqual(
+            lpt.to_instrument_identifiers_list(self.uids),
+            [lpt.to_instrument_identifiers(uid) for uid in self.uids],
+        )
+
+    def test_from_df(self):
+        df = pd.DataFrame(
+            {
+                "transaction_id": ["txn1", "txn2"],
+                "type": ["Buy", "Sell"],
+                "instrument_uid": ["Figi:BBG000BLNNH6", "CCY_GBP"],
+                "transaction_date": ["2020-01-01", "2020-01-02"],
+                "settlement_date": ["2020-01-03", "2020-01-04"],
+                "units": [10, 20],
+                "total_consideration.amount": [15.0, 30.0],
+                "total_consideration.currency": ["GBP", "GBP"],
+                "P:Transaction/default/Strategy": ["Income", None],
+                "P:Transaction/default/Rate": [1.25, None],
+            }
+        )
+
+        # related can replace the values built from the row
+        def related(i, row, fields):
+            if row["type"] == "Sell":
+                fields["instrument_uid"] = "RIC:VOD.L"
+            return fields
+
+        requests = lpt.from_df(
+            df, lusid.models.TransactionRequest, lusid.models.__dict__, related
+        )
+
+        self.assertEqual(
+            [r.instrument_identifiers for r in requests],
+            [
+                {"Instrument/default/Figi": "BBG000BLNNH6"},
+                {"Instrument/default/RIC": "VOD.L"},
+            ],
+        )
+        self.assertEqual([r.units for r in requests], [10, 20])
+        self.assertEqual(
+            requests[0].total_consideration,
+            lusid.models.CurrencyAndAmount(amount=15.0, currency="GBP"),
+        )
+        self.assertEqual(
+            requests[0].properties["Transaction/default/Strategy"].value.label_value,
+            "Income",
+        )
+        self.assertEqual(
+            requests[0].properties["Transaction/default/Rate"].value.metric_value.value,
+            1.25,
+        )
+        self.assertEqual(requests[1].properties, {})
+
+
+class LptDatesTests(unittest.TestCase):
+    @parameterized.expand(
+        [
+            ["single", ["2020-01-01"], ["2020-01-01"]],
+            [
+                "daily_range",
+                ["2020-01-30:2020-02-02"],
+                ["2020-01-30", "2020-01-31", "2020-02-01", "2020-02-02"],
+            ],
+            [
+                "month_ends",
+                ["2020-01-01:2020-03-31:M", "2020-04-15"],
+                ["2020-01-31", "2020-02-29", "2020-03-31", "2020-04-15"],
+            ],
+            ["timestamp", ["2020-01-01T10:00:00"], ["2020-01-01T10:00:00"]],
+        ]
+    )
+    def test_expand_dates(self, _, dates, expected) -> None:
+        self.assertEqual(lpt.expand_dates(dates), expected)
+
+    @parameterized.expand([["serial", 1], ["parallel", 4]])
+    def test_ordered_map_keeps_order(self, _, parallel) -> None:
+        # Later items finish first
+        def fn(i):
+            time.sleep((10 - i) / 1000)
+            return i * 2
+
+        self.assertEqual(
+            list(lpt.ordered_map(fn, range(10), parallel)), [i * 2 for i in range(10)]
+        )
+
+    def test_ordered_map_stops_early(self) -> None:
+        called = []
+
+        def fn(i):
+            called.append(i)
+            return i
+
+        results = lpt.ordered_map(fn, range(100), 3)
+        self.assertEqual(next(results), 0)
+        results.close()
+
+        self.assertLessEqual(len(called), 4)
+
+
+class LptPortfolioFanOutTests(unittest.TestCase):
+    def args(self, portfolio, **kwargs):
+        return argparse.Namespace(scope="scope", portfolio=portfolio, **kwargs)
+
+    @parameterized.expand(
+        [
+            ["single", "p1", None],
+            ["list", "p1, p2,p3", [("scope", "p1"), ("scope", "p2"), ("scope", "p3")]],
+        ]
+    )
+    def test_selected_portfolios(self, _, portfolio, expected) -> None:
+        selected = lpt.selected_portfolios(MagicMock(), self.args(portfolio))
+
+        if expected is None:
+            self.assertIsNone(selected)
+        else:
+            self.assertEqual(selected.right, expected)
+
+    def test_selected_portfolios_from_file(self) -> None:
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            f.write("p1\n\n# comment\nother/p2\n")
+
+        try:
+            selected = lpt.selected_portfolios(MagicMock(), self.args(f"file:{f.name}"))
+        finally:
+            os.remove(f.name)
+
+        self.assertEqual(selected.right, [("scope", "p1"), ("other", "p2")])
+
+    def test_selected_portfolios_in_scope(self) -> None:
+        api = MagicMock()
+        api.call.list_portfolios_for_scope.return_value = Either.Right(
+            Rec(
+                content=SimpleNamespace(
+                    values=[
+                        SimpleNamespace(id=SimpleNamespace(scope="scope", code=code))
+                        for code in ["p1", "p2"]
+                    ],
+                    links=[],
+                )
+            )
+        )
+
+        selected = lpt.selected_portfolios(api, self.args("*"))
+
+        self.assertEqual(selected.right, [("scope", "p1"), ("scope", "p2")])
+
+    def test_selected_portfolios_in_group(self) -> None:
+        def resource(scope, code):
+            return SimpleNamespace(scope=scope, code=code)
+
+        groups = {
+            ("scope", "g1"): ([resource("scope", "p1")], [resource("other", "g2")]),
+            ("other", "g2"): (
+                [resource("other", "p2"), resource("scope", "p1")],
+                [resource("scope", "g1")],
+            ),
+        }
+
+        def get_portfolio_group(scope, code):
+            portfolios, sub_groups = groups[(scope, code)]
+            return Either.Right(
+                Rec(
+                    content=SimpleNamespace(
+                        portfolios=portfolios, sub_groups=sub_groups
+                    )
+                )
+            )
+
+        api = MagicMock()
+        api.call.get_portfolio_group.side_effect = get_portfolio_group
+
+        selected = lpt.selected_portfolios(api, self.args("group:g1"))
+
+        self.assertEqual(selected.right, [("scope", "p1"), ("other", "p2")])
+
+    @parameterized.expand([["serial", 1], ["parallel", 4]])
+    def test_for_each_portfolio(self, _, parallel) -> None:
+        called = []
+
+        def executor(api, args):
+            called.append(args.parallel)
+            if args.portfolio == "bad":
+                return Either.Left(Rec(status=404, reason="Not Found", code=1))
+            return pd.DataFrame({"value": [args.portfolio, args.portfolio]})
+
+        with patch("sys.stderr", new_callable=io.StringIO) as stderr, patch(
+            "sys.stdout", new_callable=io.StringIO
+        ) as stdout:
+            df = lpt.for_each_portfolio(executor)(
+                MagicMock(), self.args("p1,bad,p2", parallel=parallel, stream=True)
+            )
+
+        self.assertEqual(called, [1, 1, 1])
+        self.assertTrue(stderr.getvalue().startswith("scope/bad:\nERROR: 404"))
+        self.assertEqual(stdout.getvalue(), "")
+        self.assertEqual(list(df.columns), ["Scope", "Portfolio", "value"])
+        self.assertEqual(list(df["Portfolio"]), ["p1", "p1", "p2", "p2"])
+        self.assertEqual(list(df["value"]), ["p1", "p1", "p2", "p2"])
+
+    def test_for_each_portfolio_single(self) -> None:
+        executor = MagicMock(return_value="result")
+        args = self.args("p1")
+
+        self.assertEqual(lpt.for_each_portfolio(executor)(None, args), "result")
+        executor.assert_called_once_with(None, args)
@@ -0,0 +1,138 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import lusid
+
+from lusidtools.lpt.call_stats import CallStats
+from lusidtools.lpt.lse import Caller
+from lusidtools.lpt.record import Rec
+
+
+class CallerTests(unittest.TestCase):
+    def test_raw_call_returns_json(self):
+        body = {"values": [{"transactionId": "txn1"}], "nextPage": None}
+        get_transactions = MagicMock(
+            return_value=SimpleNamespace(
+                data=json.dumps(body).encode("utf-8"),
+                status=200,
+                headers={
+                    "lusid-meta-success": "True",
+                    "lusid-meta-requestId": "request",
+                },
+            )
+        )
+        caller = Caller(Rec(get_transactions=get_transactions), [], Exception)
+
+        result = caller.get_transactions(scope="scope", code="code", raw=True)
+
+        self.assertTrue(result.is_right())
+        self.assertEqual(result.right.content, body)
+        self.assertEqual(result.right.stats.requestId, "request")
+        get_transactions.assert_called_once_with(
+            scope="scope", code="code", _preload_content=False
+        )
+
+
+def call(name, duration, status=200, elapsed=0.0):
+    return Rec(
+        name=name,
+        startTime="start",
+        endTime="end",
+        duration=duration,
+        elapsed=elapsed,
+        status=status,
+        requestId="request",
+        retries=0,
+    )
+
+
+class CallStatsTests(unittest.TestCase):
+    def test_summary(self):
+        stats = CallStats()
+        for i in range(1, 101):
+            stats.append(call("get_holdings", i / 100, elapsed=i / 200))
+        stats.append(call("get_transactions", 1.0, status=404))
+
+        df = stats.summary().set_index("name")
+
+        self.assertEqual(len(stats), 101)
+        self.assertEqual(df.loc["get_holdings", "count"], 100)
+        self.assertEqual(df.loc["get_holdings", "errors"], 0)
+        self.assertAlmostEqual(df.loc["get_holdings", "duration_p50"], 0.505)
+        self.assertAlmostEqual(df.loc["get_holdings", "elapsed_p99"], 0.49505)
+        self.assertEqual(df.loc["get_transactions", "errors"], 1)
+
+    def test_sample_is_bounded(self):
+        stats = CallStats(sample_size=10)
+        for i in range(1000):
+            stats.append(call("get_holdings", i))
+
+        endpoint = stats.endpoints["get_holdings"]
+        self.assertEqual(endpoint.count, 1000)
+        self.assertEqual(len(endpoint.durations), 10)
+        # The sample is spread over all of the calls
+        self.assertGreater(max(endpoint.durations), 100)
+
+    def test_calls_are_streamed_to_file(self):
+        folder = tempfile.mkdtemp()
+        filename = os.path.join(folder, "stats.csv")
+        try:
+            stats = CallStats(filename, ["name", "duration", "status"])
+            stats.append(call("get_holdings", 0.5))
+            stats.append(call("get_transactions", 1.5, status=404))
+            stats.close()
+
+            with open(filename) as f:
+                self.assertEqual(
+                    f.read().splitlines(),
+                    [
+                        "name,duration,status",
+                        "get_holdings,0.5,200",
+                        "get_transactions,1.5,404",
+                    ],
+                )
+        finally:
+            shutil.rmtree(folder)
+
+    def test_caller_records_stats(self):
+        stats = CallStats()
+        get_holdings = MagicMock(
+            return_value=(
+                [],
+                200,
+                {"lusid-meta-success": "True", "lusid-meta-duration": "250"},
+            )
+        )
+        caller = Caller(Rec(get_holdings=get_holdings), stats, Exception)
+
+        caller.get_holdings(scope="scope", code="code")
+
+        df = stats.summary()
+        self.assertEqual(list(df["name"]), ["get_holdings"])
+        self.assertEqual(df["elapsed_p50"][0], 0.25)
+
+    def test_caller_records_elapsed_of_failed_calls(self):
+        def failure(headers):
+            error = lusid.ApiException(status=404, reason="Not Found")
+            error.body = b""
+            error.headers = headers
+            return error
+
+        stats = CallStats()
+        get_holdings = MagicMock(
+            side_effect=[failure({"lusid-meta-duration": "120"}), failure(None)]
+        )
+        caller = Caller(Rec(get_holdings=get_holdings), stats, lusid.ApiException)
+
+        self.assertTrue(caller.get_holdings(scope="scope", code="code").is_left())
+        self.assertTrue(caller.get_holdings(scope="scope", code="code").is_left())
+
+        endpoint = stats.endpoints["get_holdings"]
+        self.assertEqual(endpoint.errors, 2)
+        # Without the duration from LUSID the duration of the call is used
+        self.assertEqual(endpoint.elapsed, [0.12, endpoint.durations[1]])
@@ -0,0 +1,100 @@
+import threading
+import unittest
+from types import SimpleNamespace
+
+import pandas as pd
+from parameterized import parameterized
+
+from lusidtools.lpt.either import Either
+from lusidtools.lpt.pager import page_all_results
+from lusidtools.lpt.record import Rec
+
+
+def pages(count):
+    fetched = []
+
+    def fetch_page(page):
+        page = page or 0
+        fetched.append(page)
+        return Either.Right(
+            Rec(
+                content=SimpleNamespace(
+                    values=[page * 10, page * 10 + 1],
+                    next_page=page + 1 if page + 1 < count else None,
+                )
+            )
+        )
+
+    return fetch_page, fetched
+
+
+def to_df(result):
+    return pd.DataFrame({"value": result.content.values})
+
+
+def next_page(content):
+    return content.next_page
+
+
+class PagerTests(unittest.TestCase):
+    @parameterized.expand(
+        [["sequential", 0], ["prefetch_one", 1], ["prefetch_three", 3]]
+    )
+    def test_page_all_results(self, _, prefetch):
+        fetch_page, fetched = pages(4)
+
+        df = page_all_results(fetch_page, to_df, prefetch, next_page=next_page)
+
+        self.assertEqual(list(df["value"]), [0, 1, 10, 11, 20, 21, 30, 31])
+        self.assertEqual(fetched, [0, 1, 2, 3])
+
+    def test_next_page_fetched_while_processing(self):
+        fetch_page, fetched = pages(2)
+        second_page_fetched = threading.Event()
+
+        def fetch(page):
+            result = fetch_page(page)
+            if page == 1:
+                second_page_fetched.set()
+            return result
+
+        def handler(result):
+            # The first page is only processed once the second has been fetched
+            if result.content.values[0] == 0:
+                self.assertTrue(second_page_fetched.wait(timeout=5))
+            return to_df(result)
+
+        df = page_all_results(fetch, handler, 1, next_page=next_page)
+
+        self.assertEqual(len(df), 4)
+
+    def test_sink(self):
+        fetch_page, _ = pages(3)
+        sunk = []
+
+        result = page_all_results(
+            fetch_page, to_df, 2, sink=sunk.append, next_page=next_page
+        )
+
+        self.assertIsNone(result)
+        self.assertEqual(
+            [list(df["value"]) for df in sunk], [[0, 1], [10, 11], [20, 21]]
+        )
+
+    def test_failed_page(self):
+        fetch_page, fetched = pages(4)
+
+        def fetch(page):
+            return Either.Left("failed") if page == 2 else fetch_page(page)
+
+        result = page_all_results(fetch, to_df, 2, next_page=next_page)
+
+        self.assertTrue(result.is_left())
+        self.assertEqual(result.left, "failed")
+
+    def test_error_raised(self):
+        def fetch(page):
+            raise ValueError("broken")
+
+        with self.assertRaises(ValueError):
+            page_all_results(fetch, to_df, 1, next_page=next_page)
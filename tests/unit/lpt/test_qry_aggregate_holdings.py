@@ -0,0 +1,74 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+from parameterized import parameterized
+
+from lusidtools.lpt import qry_aggregate_holdings as agg
+from lusidtools.lpt import qry_holdings as hld
+from lusidtools.lpt.either import Either
+
+
+def stats(date):
+    return SimpleNamespace(
+        duration=1, elapsed=1, requestId=f"request-{date}", startTime=date
+    )
+
+
+def valuation(api, args, date):
+    df = pd.DataFrame(
+        {agg.TYPE: ["Position", "Cash"], agg.UNITS: [1, 2], agg.PVAL: [10.0, 20.0]}
+    )
+    return Either.Right((stats(date), df))
+
+
+def holdings(api, args, date):
+    df = pd.DataFrame({hld.TYPE_COL: ["P", "P", "B"]})
+    return Either.Right((stats(date), df))
+
+
+class MultiDateQueryTests(unittest.TestCase):
+    @parameterized.expand([["serial", 1], ["parallel", 8]])
+    def test_aggregate_date_range(self, _, parallel) -> None:
+        args = SimpleNamespace(
+            dates=["2019-01-01:2020-12-31"], parallel=parallel, limit=0, monitor=False
+        )
+
+        # A range longer than the recursion limit
+        with patch.object(agg, "run_query", side_effect=valuation):
+            df = agg.process_args(MagicMock(), args)
+
+        self.assertEqual(len(df), 731)
+        self.assertEqual(list(df["Date"][:2]), ["2019-01-01", "2019-01-02"])
+        self.assertEqual(list(df["#"]), list(range(1, 732)))
+        self.assertEqual(df["PV"][0], 30.0)
+
+    def test_aggregate_limit(self) -> None:
+        args = SimpleNamespace(
+            dates=["2020-01-01:2020-01-31"], parallel=4, limit=3, monitor=False
+        )
+
+        with patch.object(agg, "run_query", side_effect=valuation):
+            df = agg.process_args(MagicMock(), args)
+
+        self.assertEqual(list(df["Date"]), ["2020-01-01", "2020-01-02", "2020-01-03"])
+
+    @parameterized.expand([["serial", 1], ["parallel", 4]])
+    def test_holdings_dates(self, _, parallel) -> None:
+        args = SimpleNamespace(
+            dates=["2020-01-01:2020-01-10", "2020-02-01"],
+            parallel=parallel,
+            limit=0,
+            monitor=False,
+        )
+
+        with patch.object(hld, "run_query", side_effect=holdings):
+            df = hld.process_args(MagicMock(), args)
+
+        self.assertEqual(len(df), 11)
+        self.assertEqual(df["Date"].iloc[-1], "2020-02-01")
+        self.assertEqual(list(df["P"].unique()), [2])
+        self.assertEqual(
+            list(df["Id"][:2]), ["request-2020-01-01", "request-2020-01-02"]
+        )
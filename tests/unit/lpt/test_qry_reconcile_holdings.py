@@ -1,4 +1,6 @@
 import unittest
+from argparse import Namespace
+from unittest.mock import MagicMock, patch
 
 import pandas
 from parameterized import parameterized
@@ -12,7 +14,13 @@ from lusid import (
 )
 from pandas._testing import assert_frame_equal
 
-from lusidtools.lpt.qry_reconcile_holdings import parse_reconciled_holdings
+from lusidtools.lpt.either import Either
+from lusidtools.lpt.qry_reconcile_holdings import (
+    parse_reconciled_holdings,
+    process_args,
+    reconcile_holdings,
+    run_local,
+)
 from lusidtools.lpt.record import Rec
 
 
@@ -197,3 +205,117 @@ class QueryReconcileHoldingsTests(unittest.TestCase):
         expected_df = pandas.DataFrame(expected)
 
         assert_frame_equal(expected_df, df)
+
+
+SHK = "Transaction/default/Strategy"
+
+
+def holdings(rows):
+    return pandas.DataFrame(
+        rows, columns=["LUID", "Name", "units", "cost", "cost_ccy", SHK]
+    )
+
+
+class LocalReconcileHoldingsTests(unittest.TestCase):
+    left = holdings(
+        [
+            ["LUID_A", "A", 10.0, 100.0, "GBP", "Income"],
+            ["LUID_A", "A", 5.0, 50.0, "GBP", "Growth"],
+            ["LUID_B", "B", 1.0, 10.0, "USD", "Income"],
+        ]
+    )
+    right = holdings(
+        [
+            ["LUID_A", "A", 10.0, 100.0, "GBP", "Income"],
+            ["LUID_B", "B", 1.001, 10.0, "USD", "Income"],
+            ["LUID_C", "C", 2.0, 20.0, "EUR", "Income"],
+        ]
+    )
+
+    @parameterized.expand(
+        [
+            ["exact", 0.0, ["LUID_A", "LUID_B", "LUID_C"]],
+            ["tolerance", 0.01, ["LUID_A", "LUID_C"]],
+        ]
+    )
+    def test_reconcile_holdings(self, _, units_tolerance, expected_luids):
+        df = reconcile_holdings(self.left, self.right, units_tolerance=units_tolerance)
+
+        self.assertEqual(list(df["LUID"]), expected_luids)
+        missing = df[df["LUID"] == "LUID_A"].iloc[0]
+        self.assertEqual(missing[SHK], "Growth")
+        self.assertEqual(missing["diff_cost"], -50.0)
+        self.assertEqual(missing["right_units"], 0.0)
+        self.assertEqual(missing["right_cost_ccy"], "N/A")
+        added = df[df["LUID"] == "LUID_C"].iloc[0]
+        self.assertEqual(added["diff_cost"], 20.0)
+        self.assertEqual(added["diff_cost_ccy"], "EUR")
+        self.assertEqual(added["left_cost_ccy"], "N/A")
+
+    def test_local_reconciles_each_pair(self):
+        fetched = []
+
+        def get_holdings(api, scope, portfolio, date):
+            fetched.append((scope, portfolio, date))
+            return Either.Right(self.left if portfolio.startswith("L") else self.right)
+
+        args = Namespace(
+            scope_left="s",
+            portfolio_left="L1,L2",
+            date_left=["2020-01-01", "2020-01-02"],
+            scope_right="s",
+            portfolio_right="R",
+            date_right=["2020-01-02"],
+            units_tolerance=0.0,
+            cost_tolerance=0.0,
+            parallel=2,
+            monitor=False,
+            limit=0,
+        )
+
+        with patch(
+            "lusidtools.lpt.qry_reconcile_holdings.get_holdings",
+            side_effect=get_holdings,
+        ):
+            df = run_local(MagicMock(), args)
+
+        # Each set of holdings is fetched once
+        self.assertEqual(len(fetched), 5)
+        self.assertEqual(len(df), 12)
+        pairs = df[["portfolio_left", "date_left"]].drop_duplicates()
+        self.assertEqual(
+            list(pairs.itertuples(index=False, name=None)),
+            [
+                ("L1", "2020-01-01"),
+                ("L1", "2020-01-02"),
+                ("L2", "2020-01-01"),
+                ("L2", "2020-01-02"),
+            ],
+        )
+
+    @parameterized.expand(
+        [
+            ["portfolios", "L1,L2", "R1,R2,R3", ["2020-01-01"], ["2020-01-02"]],
+            ["dates", "L", "R", ["2020-01-01", "2020-01-02"], ["2020-01-01"] * 3],
+        ]
+    )
+    def test_local_rejects_lists_which_cannot_be_paired(
+        self, _, portfolio_left, portfolio_right, date_left, date_right
+    ):
+        args = Namespace(
+            scope_left="s",
+            portfolio_left=portfolio_left,
+            date_left=date_left,
+            scope_right="s",
+            portfolio_right=portfolio_right,
+            date_right=date_right,
+        )
+
+        self.assertTrue(run_local(MagicMock(), args).is_left())
+
+    def test_local_rejects_groups(self):
+        api = MagicMock()
+
+        self.assertTrue(process_args(api, Namespace(local=True, group=True)).is_left())
+
+        api.call.reconcile_holdings.assert_not_called()
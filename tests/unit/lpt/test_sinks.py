@@ -0,0 +1,133 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import pandas as pd
+from parameterized import parameterized
+
+from lusidtools.lpt import sinks
+from lusidtools.lpt.either import Either
+from lusidtools.lpt.pager import page_all_results
+from lusidtools.lpt.record import Rec
+
+
+def page_frames():
+    return [
+        pd.DataFrame({"id": [1, 2], "name": ["a", "b"], "value": [1.5, None]}),
+        # Later pages can have their columns in a different order or missing
+        pd.DataFrame({"name": ["c", "d"], "id": [3, 4]}),
+        pd.DataFrame({"id": [5], "name": ["e"], "value": [2.5]}),
+    ]
+
+
+def read_file(filename):
+    if filename.endswith(".jsonl.gz"):
+        with gzip.open(filename, "rt") as f:
+            return pd.DataFrame([json.loads(line) for line in f])
+    if filename.endswith(".jsonl"):
+        with open(filename) as f:
+            return pd.DataFrame([json.loads(line) for line in f])
+    if filename.endswith(".parquet"):
+        return pd.read_parquet(filename)
+    return pd.read_csv(filename)
+
+
+class LptSinksTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.folder)
+
+    def write_pages(self, filename, limit=0):
+        with sinks.open_sink(os.path.join(self.folder, filename), limit) as sink:
+            for df in page_frames():
+                sink(df)
+        return sink
+
+    @parameterized.expand(
+        [
+            ["csv", "out.csv"],
+            ["jsonl", "out.jsonl"],
+            ["csv_gz", "out.csv.gz"],
+            ["jsonl_gz", "out.jsonl.gz"],
+        ]
+    )
+    def test_pages_are_appended(self, _, filename) -> None:
+        sink = self.write_pages(filename)
+
+        self.assertEqual(sink.rows, 5)
+        df = read_file(sink.filename)
+        self.assertEqual(list(df.columns), ["id", "name", "value"])
+        self.assertEqual(list(df["id"]), [1, 2, 3, 4, 5])
+        self.assertEqual(list(df["name"]), ["a", "b", "c", "d", "e"])
+        self.assertEqual(list(df["value"].isna()), [False, True, True, True, False])
+
+    @parameterized.expand([["csv", "out.csv"], ["jsonl", "out.jsonl"]])
+    def test_limit_stops_writing(self, _, filename) -> None:
+        sink = self.write_pages(filename, limit=3)
+
+        self.assertTrue(sink.full)
+        self.assertEqual(list(read_file(sink.filename)["id"]), [1, 2, 3])
+
+    def test_parquet(self) -> None:
+        try:
+            import pyarrow
+        except ImportError:
+            self.skipTest("pyarrow is not installed")
+
+        sink = self.write_pages("out.parquet")
+
+        self.assertEqual(list(read_file(sink.filename)["id"]), [1, 2, 3, 4, 5])
+
+    @parameterized.expand([["excel", "out.xlsx"], ["parquet_gz", "out.parquet.gz"]])
+    def test_unsupported_extension(self, _, filename) -> None:
+        with self.assertRaises(ValueError):
+            sinks.open_sink(os.path.join(self.folder, filename))
+
+    @parameterized.expand(
+        [
+            ["not_streamed", False, "out.csv", None],
+            ["no_file", True, None, None],
+            ["streamed", True, "out.csv", sinks.CsvSink],
+        ]
+    )
+    def test_sink_for(self, _, stream, filename, sink_type) -> None:
+        args = SimpleNamespace(
+            stream=stream,
+            filename=filename and os.path.join(self.folder, filename),
+            limit=0,
+        )
+
+        sink = sinks.sink_for(args)
+
+        if sink_type is None:
+            self.assertIsNone(sink)
+        else:
+            self.assertIsInstance(sink, sink_type)
+
+    def test_pager_stops_when_sink_is_full(self) -> None:
+        frames = page_frames()
+        fetched = []
+
+        def fetch_page(page):
+            page = page or 0
+            fetched.append(page)
+            return Either.Right(Rec(content=page))
+
+        with sinks.open_sink(os.path.join(self.folder, "out.csv"), 2) as sink:
+            result = page_all_results(
+                fetch_page,
+                lambda result: frames[result.content],
+                prefetch=0,
+                sink=sink,
+                next_page=lambda page: page + 1 if page + 1 < len(frames) else None,
+            )
+
+        self.assertIsNone(result)
+        self.assertEqual(fetched, [0])
+        self.assertEqual(list(read_file(sink.filename)["id"]), [1, 2])